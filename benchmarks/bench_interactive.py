@@ -0,0 +1,185 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import numpy as np
+
+# headless by default, set QT_QPA_PLATFORM to override
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6 import QtWidgets
+import Dans_Diffraction as dif
+import xrdPlanner
+from xrdPlanner import geometry
+
+#########################
+#  INTERACTIVE BENCHMARK #
+#########################
+# Times the hot paths of the GUI for every settings profile
+# (settings/*.json) and tracks regressions across releases.
+#  - calc_conic_<type>: one conic section of every type
+#  - calc_overlays_<res>: overlay maps at several resolutions (synchronous)
+#  - draw_conics: conics, labels and the overlay request
+#  - draw_reference: 250 reference contours
+#  - update_screen: full screen update including the repaint
+#  - calc_hkld_small/large: hkl and d-spacings of a small and a large cell
+#  - calc_ref_from_cif: reference from a cif (Dans_Diffraction KCl)
+#  - win_pxrd_update: PXRD pattern of the cif reference
+#
+# The median of the repeats is reported in [ms]. The results are
+# written as json (-o) and compared against a previous run (--compare),
+# the exit code is 1 if a case is slower than the threshold allows.
+#
+# The MainWindow works on copies of the profiles in a temporary folder,
+# the shipped settings files are not changed.
+#
+# usage: python benchmarks/bench_interactive.py [-o results.json] [--compare old.json]
+
+# conic sections, (omega, theta) [rad] yielding each type
+CONIC_TYPES = {'circle':(0.0, 0.3),
+               'ellipse':(-0.3, 0.3),
+               'parabola':(-0.5, np.pi/2 - 0.5),
+               'hyperbola':(-0.5, 1.3),
+               'line':(-0.5, np.pi/2 - 1e-3)}
+# overlay resolutions
+OVERLAY_RES = (150, 300, 1000)
+# unit cells for calc_hkld, [a, b, c, alpha, beta, gamma]
+CELLS = {'small':[4.2, 4.2, 4.2, 90, 90, 90],
+         'large':[25.0, 30.0, 35.0, 90, 100, 90]}
+# number of reference contours
+REF_NUM = 250
+
+def timeit(func, repeat, after=None):
+    """
+    Returns the median runtime of func [ms], after is
+    called (untimed) after every call.
+    """
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+        if after is not None:
+            after()
+    return float(np.median(times)) * 1e3
+
+def bench_profile(app, win, repeat):
+    """
+    Runs all cases with the currently loaded profile of win.
+    """
+    results = {}
+    wait = win.overlay_worker.wait
+    _omega = -np.deg2rad(win.geo.tilt + win.geo.rota)
+
+    # conic sections
+    for name, (omega, theta) in CONIC_TYPES.items():
+        par = geometry.conic_params(omega, theta, win.geo.dist, win.geo.voff, win.geo.hoff, win.geo.tilt)
+        assert par is not None and par['type'] == name, f'no {name} for this geometry'
+        results[f'calc_conic_{name}'] = timeit(lambda: win.calc_conic(omega, theta, steps=win.plo.conic_steps, clip=True), repeat)
+
+    # overlays
+    for res in OVERLAY_RES:
+        results[f'calc_overlays_{res}'] = timeit(lambda: win.calc_overlays(_omega, res=res, pol=win.plo.polarisation_fac), repeat)
+
+    # conics and reference contours
+    win.plo.conic_ref_num = REF_NUM
+    win.redraw_canvas()
+    wait()
+    results['calc_hkld_small'] = timeit(lambda: win.calc_hkld(CELLS['small']), repeat)
+    results['calc_hkld_large'] = timeit(lambda: win.calc_hkld(CELLS['large']), repeat)
+    hkld = win.calc_hkld(CELLS['large'])
+    # strongest ring first in the gui, here: largest d-spacings
+    hkld = hkld[np.argsort(hkld[:,3])[::-1]][:REF_NUM]
+    win.cont_ref_dsp = hkld[:,3]
+    win.cont_ref_hkl = list(zip(hkld[:,0], hkld[:,1], hkld[:,2], np.zeros(len(hkld)), np.zeros(len(hkld))))
+    results['draw_reference'] = timeit(win.draw_reference, repeat, app.processEvents)
+    results['draw_conics'] = timeit(win.draw_conics, repeat, wait)
+    results['update_screen'] = timeit(lambda: (win.update_screen(), app.processEvents()), repeat, wait)
+
+    # cif reference and PXRD pattern
+    cif = glob.glob(os.path.join(os.path.dirname(dif.__file__), 'Structures', 'KCl.cif'))[0]
+    results['calc_ref_from_cif'] = timeit(lambda: win.calc_ref_from_cif(cif, open_pxrd=False), repeat, app.processEvents)
+    win.win_pxrd_plot(keep=True)
+    results['win_pxrd_update'] = timeit(win.win_pxrd_update, repeat, app.processEvents)
+    win.pxrd_win.close()
+    return results
+
+def compare(results, previous, threshold):
+    """
+    Prints the ratio to a previous run, returns the
+    number of cases that are slower than threshold.
+    """
+    print(f'\nComparison to xrdPlanner {previous["version"]} (ratio new/old, threshold {threshold})')
+    slower = 0
+    for profile, cases in results.items():
+        for case, t in cases.items():
+            old = previous['results'].get(profile, {}).get(case)
+            if old is None or old <= 0:
+                continue
+            ratio = t / old
+            flag = ''
+            if ratio > threshold:
+                flag = '  <- slower'
+                slower += 1
+            print(f'{profile:>36} {case:>22} {old:9.2f} {t:9.2f} {ratio:6.2f}{flag}')
+    return slower
+
+def main(argv=None):
+    path_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Benchmark the interactive hot paths of xrdPlanner.')
+    parser.add_argument('profiles', nargs='*', help='settings files (.json), default settings/*.json')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed calls per case, default 5')
+    parser.add_argument('-o', '--output', default=None, help='write the results to a json file')
+    parser.add_argument('--compare', default=None, help='compare to the results of a previous run (.json)')
+    parser.add_argument('--threshold', type=float, default=1.2, help='flag cases slower than threshold * previous, default 1.2')
+    args = parser.parse_args(argv)
+    profiles = args.profiles or sorted(glob.glob(os.path.join(path_root, 'settings', '*.json')))
+
+    app = QtWidgets.QApplication(sys.argv)
+    from xrdPlanner.classes import MainWindow
+    win = MainWindow()
+    win.show()
+    app.processEvents()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # keep the cif db of the user untouched
+        win.path_cif_db = os.path.join(tmp, 'cif_db.json')
+        for profile in profiles:
+            name = os.path.basename(profile)
+            win.path_settings_current = shutil.copy(profile, os.path.join(tmp, name))
+            win.settings_reload()
+            app.processEvents()
+            win.overlay_worker.wait()
+            results[name] = bench_profile(app, win, args.repeat)
+            for case, t in results[name].items():
+                print(f'{name:>36} {case:>22} {t:9.2f} ms')
+    # the MainWindow removed the active settings token
+    # of the user on startup, put it back
+    win.settings_set_active()
+
+    data = {'version':xrdPlanner.__version__,
+            'python':platform.python_version(),
+            'numpy':np.__version__,
+            'numexpr':geometry.numexpr is not None,
+            'machine':platform.machine(),
+            'cpus':os.cpu_count(),
+            'repeat':args.repeat,
+            'results':results}
+    if args.output is not None:
+        with open(args.output, 'w') as wf:
+            json.dump(data, wf, indent=4)
+
+    slower = 0
+    if args.compare is not None:
+        with open(args.compare, 'r') as rf:
+            slower = compare(results, json.load(rf), args.threshold)
+    return 1 if slower > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from xrdPlanner import geometry, defaults
+
+######################
+#  OVERLAY BENCHMARK #
+#   QT-INDEPENDENT   #
+######################
+# Compares the NumPy and the fused (numexpr) overlay kernels of
+# geometry.calc_overlays for 300^2, 1000^2 and the full detector grid.
+#  - time: median runtime of a call with warm buffers [ms]
+#  - temp: peak temporary allocation during a call [MB]
+#  - out: size of the returned maps [MB]
+#
+# The temporaries are the memory traffic that comes on top of
+# reading and writing the output maps, they are measured with
+# tracemalloc (NumPy reports its data allocations).
+#
+# usage: python benchmarks/bench_overlays.py [settings.json] [--repeat N] [--workers N]
+
+def overlay_pars(geo, plo, det, shape):
+    # all maps, as with every overlay switched on in the GUI
+    xdim, ydim = geometry.calc_det_dims(det, plo.plot_padding)
+    fwhm = {'dia':plo.scattering_diameter,
+            'thk':plo.sensor_thickness,
+            'mat':plo.sensor_material,
+            'pxs':det.pxs * 1e-3,
+            'ener':geo.ener,
+            'div':plo.beam_divergence,
+            'dEE':plo.energy_resolution}
+    return {'omega':-np.deg2rad(geo.tilt + geo.rota),
+            'xdim':xdim,
+            'ydim':ydim,
+            'dist':geo.dist,
+            'voff':geo.voff,
+            'hoff':geo.hoff,
+            'tilt':geo.tilt,
+            'shape':shape,
+            'pol':plo.polarisation_fac,
+            'show_tth':True,
+            'show_azi':True,
+            'show_pol':True,
+            'show_sa':True,
+            'fwhm':fwhm}
+
+def measure(pars, fused, workers, repeat):
+    buf = {}
+    # warm up, allocates the buffers
+    maps = geometry.calc_overlays(**pars, buf=buf, workers=workers, fused=fused)
+    out = sum(m.nbytes for m in maps if isinstance(m, np.ndarray))
+    tracemalloc.start()
+    geometry.calc_overlays(**pars, buf=buf, workers=workers, fused=fused)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        geometry.calc_overlays(**pars, buf=buf, workers=workers, fused=fused)
+        times.append(time.perf_counter() - t)
+    return np.median(times) * 1e3, peak / 2**20, out / 2**20
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the overlay kernels.')
+    parser.add_argument('settings', nargs='?', default=None, help='xrdPlanner settings file (.json), default settings')
+    parser.add_argument('--repeat', type=int, default=10, help='number of timed calls, default 10')
+    parser.add_argument('--workers', type=int, default=0, help='number of threads, default 0 (all CPUs)')
+    args = parser.parse_args(argv)
+
+    geo, plo, thm, lmt = defaults.load_settings(args.settings)
+    det = defaults.get_det_params(defaults.load_det_library(), geo.det_type, geo.det_size)
+    xdim, ydim = geometry.calc_det_dims(det, plo.plot_padding)
+    grids = [('300^2', geometry.overlay_shape(xdim, ydim, 300)),
+             ('1000^2', geometry.overlay_shape(xdim, ydim, 1000)),
+             (det.name, geometry.overlay_shape(xdim, ydim, None, det))]
+    kernels = [('numpy', False)]
+    if geometry.numexpr is not None:
+        kernels.append(('numexpr', True))
+    else:
+        print('numexpr is not installed, only the NumPy kernels are measured.')
+
+    print(f'{"grid":>16} {"shape":>12} {"kernel":>8} {"time [ms]":>10} {"temp [MB]":>10} {"out [MB]":>9}')
+    for name, shape in grids:
+        pars = overlay_pars(geo, plo, det, shape)
+        for kernel, fused in kernels:
+            t, temp, out = measure(pars, fused, args.workers, args.repeat)
+            print(f'{name:>16} {str(shape):>12} {kernel:>8} {t:10.1f} {temp:10.1f} {out:9.1f}')
+
+if __name__ == '__main__':
+    main()
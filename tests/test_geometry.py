@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from xrdPlanner import geometry
+
+# (rota, tilt, voff, hoff, dist) [deg, deg, mm, mm, mm]
+OVERLAY_CASES = [(0, 0, 0, 0, 100),
+                 (30, 0, 20, 0, 150),
+                 (0, 15, -40, 25, 200),
+                 (45, -10, 60, -30, 80)]
+
+@pytest.mark.parametrize('rota, tilt, voff, hoff, dist', OVERLAY_CASES)
+@pytest.mark.parametrize('workers', [1, 2])
+def test_overlay_fused_matches_numpy(rota, tilt, voff, hoff, dist, workers):
+    pytest.importorskip('numexpr')
+    omega = -np.deg2rad(tilt + rota)
+    fwhm = {'dia':100e-6, 'thk':1000e-6, 'mat':'CdTe', 'pxs':75e-6, 'ener':25, 'div':10e-6, 'dEE':1.4e-4}
+    # large enough for the row blocks (OVERLAY_PARALLEL_MIN)
+    kwargs = dict(shape=(256, 320), pol=0.99, show_tth=True, show_azi=True, show_pol=True,
+                  show_sa=True, fwhm=fwhm, workers=workers)
+    ref = geometry.calc_overlays(omega, 80.0, 60.0, dist, voff, hoff, tilt, fused=False, **kwargs)
+    out = geometry.calc_overlays(omega, 80.0, 60.0, dist, voff, hoff, tilt, fused=True, **kwargs)
+    # tth, azi, pc, sa, fwhm
+    for a, b in zip(ref[1:], out[1:]):
+        np.testing.assert_allclose(b, a, rtol=1e-10, atol=1e-12, equal_nan=True)
+
+# module layouts: 2 x 4 (even), 3 x 5 (odd) and a central hole (cbh)
+LAYOUTS = [SimpleNamespace(hmp=1028, vmp=512, hgp=12, vgp=38, cbh=0, hmn=2, vmn=4, pxs=0.075),
+           SimpleNamespace(hmp=487, vmp=195, hgp=7, vgp=17, cbh=0, hmn=3, vmn=5, pxs=0.172),
+           SimpleNamespace(hmp=1024, vmp=512, hgp=2, vgp=2, cbh=60, hmn=2, vmn=4, pxs=0.05)]
+
+def _forward(x, y, omega, dist, voff, hoff, tilt):
+    # 2-theta and azimuth of screen coordinates, as calc_overlays
+    vec = np.array([x - hoff, y + voff - np.deg2rad(tilt) * dist, np.full(np.shape(x), float(dist))])
+    res = np.tensordot(geometry.rot_100(omega), vec, axes=1)
+    return np.arctan2(np.hypot(res[0], res[1]), res[2]), -np.arctan2(res[0], res[1])
+
+@pytest.mark.parametrize('rota, tilt, voff, hoff, dist', OVERLAY_CASES)
+def test_project_angles_inverts_overlays(rota, tilt, voff, hoff, dist):
+    omega = -np.deg2rad(tilt + rota)
+    rows, cols = 64, 80
+    _, tth, azi, _, _, _ = geometry.calc_overlays(omega, 80.0, 60.0, dist, voff, hoff, tilt, (rows, cols),
+                                                  show_azi=True, show_pol=False, fused=False)
+    x = np.broadcast_to(np.linspace(-80.0, 80.0, cols, endpoint=False)[None, :], (rows, cols))
+    y = np.broadcast_to(np.linspace(-60.0, 60.0, rows, endpoint=False)[:, None], (rows, cols))
+    proj = geometry.project_angles(tth, azi, omega, dist, voff, hoff, tilt, LAYOUTS[0])
+    ok = np.isfinite(tth)
+    assert ok.sum() > 0.9 * ok.size
+    np.testing.assert_allclose(proj['x'][ok], x[ok], atol=1e-9)
+    np.testing.assert_allclose(proj['y'][ok], y[ok], atol=1e-9)
+
+@pytest.mark.parametrize('det', LAYOUTS)
+def test_det_module_index_matches_modules(det):
+    x0, y0, w, h = geometry.det_modules(det)
+    rng = np.random.default_rng(1)
+    x = rng.uniform(x0.min() - 10, x0.max() + w + 10, 20000)
+    y = rng.uniform(y0.min() - 10, y0.max() + h + 10, 20000)
+    # module corners and edges
+    x = np.concatenate([x, x0, x0 + w, x0 + w/2])
+    y = np.concatenate([y, y0, y0 + h/2, y0 + h])
+    expected = np.full(x.shape, -1)
+    for m in range(len(x0)):
+        expected[(x >= x0[m]) & (x < x0[m] + w) & (y >= y0[m]) & (y < y0[m] + h)] = m
+    np.testing.assert_array_equal(geometry.det_module_index(det, x, y), expected)
+
+def test_project_flags():
+    det = LAYOUTS[0]
+    omega, dist, voff, hoff, tilt = 0.0, 100.0, 0.0, 0.0, 0.0
+    # module, gap (between the two columns at x = 0), off the modules
+    x = np.array([20.0, 0.0, 500.0])
+    y = np.array([10.0, 10.0, 0.0])
+    tth, azi = _forward(x, y, omega, dist, voff, hoff, tilt)
+    proj = geometry.project_angles(tth, azi, omega, dist, voff, hoff, tilt, det)
+    np.testing.assert_array_equal(proj['flag'], [geometry.PROJ_MODULE, geometry.PROJ_GAP, geometry.PROJ_OFF])
+    assert proj['module'][0] == geometry.det_module_index(det, 20.0, 10.0) >= 0
+    np.testing.assert_array_equal(proj['module'][1:], -1)
+    # beamstop shadow
+    proj = geometry.project_angles(tth[:1], azi[:1], omega, dist, voff, hoff, tilt, det, bs_theta=tth[0] + 0.01)
+    assert proj['flag'][0] == geometry.PROJ_BEAMSTOP
+    # lambda/2d > 1
+    proj = geometry.project_reflections([0.1, 2.0], 0.0, 5.0, omega, dist, voff, hoff, tilt, det)
+    assert proj['flag'][0] == geometry.PROJ_UNREACHABLE
+    assert proj['flag'][1] != geometry.PROJ_UNREACHABLE
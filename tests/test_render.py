@@ -0,0 +1,42 @@
+import os
+import json
+import glob
+import pytest
+
+pytest.importorskip('PyQt6')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+def _snapshot(path):
+    # settings files and active settings tokens of a home folder
+    files = {}
+    for name in sorted(glob.glob(os.path.join(path, 'settings', '*')) + glob.glob(os.path.join(path, 'settings', '.active_*'))):
+        with open(name, 'rb') as rf:
+            files[name] = rf.read()
+    return files
+
+def test_render_batch_parallel_keeps_user_settings(tmp_path, monkeypatch):
+    from xrdPlanner import render
+    home = tmp_path / 'home'
+    home.mkdir()
+    monkeypatch.setenv('XRDPLANNER', str(home))
+    # initialise the home folder and write a user setting
+    from PyQt6 import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from xrdPlanner.classes import MainWindow
+    win = MainWindow()
+    with open(win.path_settings_default, 'w') as wf:
+        json.dump({'geo':dict(win.geo.__dict__, dist=777), 'plo':win.plo.__dict__,
+                   'thm':win.thm.__dict__, 'lmt':win.lmt.__dict__}, wf, indent=4)
+    win.settings_set_active()
+    win.deleteLater()
+    app.processEvents()
+    before = _snapshot(str(home))
+    assert any(name.endswith('default.json') for name in before)
+
+    settings = str(tmp_path / 'render.json')
+    with open(os.path.join(home, 'settings', 'default.json'), 'rb') as rf, open(settings, 'wb') as wf:
+        wf.write(rf.read())
+    files = render.render_batch(settings, [{'dist':d} for d in (100, 150, 200, 250)],
+                                str(tmp_path / 'out'), processes=2)
+    assert len(files) == 4 and all(os.path.exists(f) for f in files)
+    assert _snapshot(str(home)) == before
@@ -3,7 +3,9 @@ import pwd
 import sys
 import json
 import glob
+import time
 import shutil
+import copy
 import numpy as np
 from scipy.optimize import curve_fit
 import pyqtgraph as pg
@@ -11,6 +13,8 @@ import Dans_Diffraction as dif
 from PyQt6 import QtWidgets, QtCore, QtGui
 from pyFAI import calibrant
 import xrdPlanner.resources
+from xrdPlanner import geometry, optimizer, defaults, profiler, planner, follower, qmap
+from xrdPlanner.defaults import Container
 
 # Add the Absorption window and connect scattering diameter slider (from FWHM)
 # change pxrd scatterplot highlight to use dedicated highlighter (scatterplot)
@@ -35,7 +39,7 @@ class MainWindow(QtWidgets.QMainWindow):
         super().__init__(*args, **kwargs)
 
         # set path home
-        self.path_home = os.getenv('XRDPLANNER', os.path.dirname(__file__))
+        self.path_home = defaults.get_path_home()
         #self.setMouseTracking(True)
 
         # enable antialiasing
@@ -52,6 +56,44 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # list to keep track of currently highlighted contours
         self.highlight_timers = []
+        # reduced detail while a slider is dragged
+        self.lod_active = False
+        # frame-time profiler, enabled in debug mode (plo.set_debug)
+        #  - times the stages of update_screen()
+        #  - shown by the profiler label, updated twice a second
+        self.profiler = profiler.FrameProfiler()
+        self.prof_timer = QtCore.QTimer(self)
+        self.prof_timer.setSingleShot(True)
+        self.prof_timer.setInterval(500)
+        self.prof_timer.timeout.connect(self.label_prof_update)
+        # overlays are calculated in a background thread
+        #  - results of outdated requests are dropped
+        #  - overlay_buf: buffers of the displayed overlay
+        self.overlay_worker = OverlayWorker(self)
+        self.overlay_worker.sigResult.connect(self.overlay_swap)
+        self.overlay_buf = None
+        self._tth = None
+        self._azi = None
+        # motor positions of a control system (plo.follow_*)
+        #  - the follower coalesces, dead-bands and rate limits
+        #    the updates of the position source
+        #  - polled by the timer, changes are applied via apply_geometry
+        self.motor_follower = None
+        self.follow_timer = QtCore.QTimer(self)
+        self.follow_timer.setInterval(follower.FOLLOW_POLL)
+        self.follow_timer.timeout.connect(self.follow_update)
+        # hover labels are updated at most once per screen refresh
+        #  - hoverEvent() stores the position and starts the timer
+        #  - hover_label_update() reads the precomputed maps
+        self.hover_pos = None
+        self.hover_maps = None
+        self.hover_text = None
+        _screen = QtWidgets.QApplication.instance().primaryScreen()
+        _rate = _screen.refreshRate() if _screen is not None and _screen.refreshRate() > 0 else 60
+        self.hover_timer = QtCore.QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(int(1000/_rate))
+        self.hover_timer.timeout.connect(self.hover_label_update)
         # default unit cell parameters for custom cell window
         self.default_custom_cell = [6,6,6,90,90,90]
         # set path to settings folder
@@ -171,6 +213,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.fwhm_win = FwhmWindow(parent=self)
         # initialize unit cell window
         self.uc_win = UnitCellWindow(parent=self, hotkeys=False)
+        # initialize geometry optimizer window
+        self.opt_win = OptimizerWindow(parent=self)
+        # initialize q-range map window
+        self.qmap_win = QMapWindow(parent=self)
         # initialize absorption window
         #self.abs_win = AbsorptionWindow(parent=self)
 
@@ -383,9 +429,11 @@ class MainWindow(QtWidgets.QMainWindow):
                         'bs_label':None,
                         'conic':[],
                         'reference':[],
+                        'reference_batch':None,
                         'ref_hl_label':None,
                         'ref_hl_curve':None,
                         'labels':[],
+                        'modules':None,
                         'polar_grid':[]}
 
         # add beam stop scatter plot
@@ -400,16 +448,25 @@ class MainWindow(QtWidgets.QMainWindow):
                                                    fillOutline=True)
         self.ax.addItem(self.patches['beamstop'])
 
+        # add reference contour lines
+        # batched: a single plot item draws all contours,
+        # the list only holds the per-contour data
+        if self.plo.conic_ref_batch:
+            self.patches['reference_batch'] = ReferenceRingsItem(self, mouseWidth=1)
+            self.ax.addItem(self.patches['reference_batch'])
         # add empty plot per reference contour line
         for i in range(self.plo.conic_ref_num):
-            ref = HoverableCurveItem(self, useCache=True, mouseWidth=1)
-            self.ax.addItem(ref)
+            if self.plo.conic_ref_batch:
+                ref = ReferenceRing(self)
+            else:
+                ref = HoverableCurveItem(self, useCache=True, mouseWidth=1, connect='finite')
+                self.ax.addItem(ref)
             self.patches['reference'].append(ref)
             self.patches['reference'][i].name = None
             self.patches['reference'][i].index = None
 
         # add ref highlight curve
-        ref_hkl_curve = pg.PlotCurveItem(useCache=True,
+        ref_hkl_curve = pg.PlotCurveItem(useCache=True, connect='finite',
                                          pen=pg.mkPen(color=self.conic_highlight,
                                                       width=self.plo.conic_ref_linewidth*2))
         ref_hkl_curve.setVisible(False)
@@ -427,7 +484,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # add empty plot per contour line
         for i in range(self.plo.conic_tth_num):
-            curve = pg.PlotCurveItem(useCache=True)
+            curve = pg.PlotCurveItem(useCache=True, connect='finite')
             self.ax.addItem(curve)
             self.patches['conic'].append(curve)
             temp_label = pg.TextItem(anchor=(0.5,0.5), fill=pg.mkBrush(self.conic_label_fill))
@@ -487,6 +544,9 @@ class MainWindow(QtWidgets.QMainWindow):
         # add label for corrections
         self.label_corr_init()
 
+        # add label for the frame times (debug)
+        self.label_prof_init()
+
         # add empty lines for azimuthal grid
         self.polar_grid_init()
 
@@ -494,6 +554,34 @@ class MainWindow(QtWidgets.QMainWindow):
         self.update_screen()
         self.set_win_title()
 
+    def main_screen_update(self):
+        """
+        Updates the main screen after a detector change.
+
+        All plot items are kept, only the items that depend on the
+        detector dimensions are updated:
+        - the detector modules (the path of the single module item is rebuilt)
+        - the plot dimensions and window size
+        - the positions of the unit and correction labels
+        - the window title
+        A full rebuild (ax.clear() and main_screen_init()) is only needed
+        if the number of items (e.g. conic_ref_num) or their style changes.
+        """
+        # update detector modules
+        self.build_detector()
+        # update plot dimensions and window size
+        self.resize_win()
+        # move the labels to the new corners
+        if self.unit_label.anchor.y() == 0.0:
+            self.unit_label.setPos(-self.xdim, self.ydim)
+        else:
+            self.unit_label.setPos(-self.xdim, -self.ydim)
+        self.cor_label.setPos(self.xdim, -self.ydim)
+        self.prof_label.setPos(self.xdim, self.ydim)
+        # redraw contour lines
+        self.update_screen()
+        self.set_win_title()
+
     def polar_grid_init(self):
         """initialize a polar grid that can be easily hidden or shown"""
         # lines for azimuthal grid
@@ -559,6 +647,44 @@ class MainWindow(QtWidgets.QMainWindow):
         self.cor_label.setToolTip('P: Polarisation\nS: Solid angle\nF: FWHM [\u00B0]')
         self.cor_label.setPos(self.xdim, -self.ydim)
 
+    def label_prof_init(self):
+        """
+        Initializes the frame-time label (debug mode only).
+
+        The profiler is enabled if plo.set_debug is True, the label shows
+        the last, mean and 95th percentile time of the update_screen stages
+        and a histogram of the frame times (see profiler.FrameProfiler).
+        """
+        self.profiler.enabled = self.plo.set_debug
+        self.profiler.clear()
+        font = QtGui.QFont('Monospace')
+        font.setStyleHint(QtGui.QFont.StyleHint.TypeWriter)
+        font.setPixelSize(max(self.plo.unit_label_size - 6, 8))
+        self.prof_label = pg.TextItem(anchor=(1.0,0.0), color=self.unit_label_color, fill=self.unit_label_fill)
+        self.prof_label.setText('')
+        self.prof_label.setFont(font)
+        self.ax.addItem(self.prof_label)
+        self.prof_label.setVisible(self.profiler.enabled)
+        self.prof_label.setPos(self.xdim, self.ydim)
+
+    def label_prof_update(self):
+        """
+        Shows the current frame-time statistics.
+        """
+        if self.profiler.enabled:
+            self.prof_label.setText(self.profiler.text())
+
+    def prof_export(self):
+        """
+        Exports the frame times as json or in Chrome trace format
+        (chrome://tracing or https://ui.perfetto.dev).
+        """
+        default_path = os.path.join(os.path.expanduser('~'), 'xrdPlanner_frames.json')
+        target, filter = QtWidgets.QFileDialog.getSaveFileName(self, 'Export frame times', default_path, "Frame times (*.json);;Chrome trace (*.json)")
+        if not target:
+            return
+        self.profiler.export(target, trace=filter.startswith('Chrome'))
+
     def label_conic_pos_auto(self, x, y):
         """
         Adjusts the label position to maintain readability and ensures the label
@@ -595,10 +721,10 @@ class MainWindow(QtWidgets.QMainWindow):
         # if conic is not cut-off, use horizontal offset as x value.
         # this makes the display is cleaner, as the positions otherwise
         # rely on the sampling of the conic e.g. rough stepping.
-        if _visible_y.max() == y.max():
+        if _visible_y.max() == np.nanmax(y):
             label_x = self.geo.hoff
             label_y = _visible_y.max()
-        elif _visible_y.min() == y.min():
+        elif _visible_y.min() == np.nanmin(y):
             label_x = self.geo.hoff
             label_y = _visible_y.min()
         else:
@@ -649,9 +775,9 @@ class MainWindow(QtWidgets.QMainWindow):
         # OR: use the actual beam position to determine label position
         # beam_pos_y = -(self.geo.voff + np.tan(np.deg2rad(self.geo.rota))*self.geo.dist)
         if omega <= 0:
-            label_pos = [self.geo.hoff, max(y)] if theta < np.pi/2 else [self.geo.hoff, min(y)]
+            label_pos = [self.geo.hoff, np.nanmax(y)] if theta < np.pi/2 else [self.geo.hoff, np.nanmin(y)]
         else:
-            label_pos = [self.geo.hoff, min(y)] if theta < np.pi/2 else [self.geo.hoff, max(y)]
+            label_pos = [self.geo.hoff, np.nanmin(y)] if theta < np.pi/2 else [self.geo.hoff, np.nanmax(y)]
         return label_pos
 
     def label_set_position(self, pos):
@@ -686,6 +812,9 @@ class MainWindow(QtWidgets.QMainWindow):
         """
         # set darkmode
         self.geo.darkmode = use_dark
+        # colors and pens depend on the theme and colormap
+        # -> empty the pool
+        self.pen_pool = {}
         _color_dark = QtGui.QColor(self.thm.color_dark)
         _color_light = QtGui.QColor(self.thm.color_light)
         # set highlight text color depending on the lightness of the colormap
@@ -801,6 +930,50 @@ class MainWindow(QtWidgets.QMainWindow):
             if isinstance(child, QtWidgets.QWidget):
                 self.change_palette_recursive(child, palette)
     
+    def pool_color(self, f):
+        """
+        Returns the colormap color (QColor) at fraction f.
+        Colors are cached until the theme or colormap changes (theme_apply).
+        """
+        key = ('color', f)
+        if key not in self.pen_pool:
+            self.pen_pool[key] = self.cont_cmap.map(f, mode='qcolor')
+        return self.pen_pool[key]
+
+    def pool_pen(self, color, width):
+        """
+        Returns a pen of given color (QColor) and width.
+        Pens are cached until the theme or colormap changes (theme_apply),
+        widths are rounded to 0.1 px to keep the pool small.
+        """
+        width = round(float(width), 1)
+        key = ('pen', color.rgba(), width)
+        if key not in self.pen_pool:
+            self.pen_pool[key] = pg.mkPen(color, width=width)
+        return self.pen_pool[key]
+
+    def pool_set_curve(self, curve, x, y, pen):
+        """
+        Sets the data of a curve, the pen is only
+        re-assigned if it differs from the current one.
+        """
+        if getattr(curve, 'pool_pen', None) is pen:
+            curve.setData(x, y)
+        else:
+            curve.setData(x, y, pen=pen)
+            curve.pool_pen = pen
+
+    def pool_set_label(self, label, text, color):
+        """
+        Sets the text of a label, the color is only
+        re-assigned if it differs from the current one.
+        """
+        if getattr(label, 'pool_color', None) is color:
+            label.setText(text)
+        else:
+            label.setText(text, color=color)
+            label.pool_color = color
+
     ##########
     #  MENU  #
     ##########
@@ -1062,6 +1235,27 @@ class MainWindow(QtWidgets.QMainWindow):
         self.action_funct_fwhm_export = QtGui.QAction('Export FWHM', self)
         self.menu_set_action(self.action_funct_fwhm_export, self.fwhm_win.export_grid)
         menu_functions.addAction(self.action_funct_fwhm_export)
+        menu_functions.addSeparator()
+        #optimize geometry
+        self.action_funct_optimize = QtGui.QAction('&Optimize geometry', self)
+        self.menu_set_action(self.action_funct_optimize, self.opt_win.show)
+        menu_functions.addAction(self.action_funct_optimize)
+        #q-range map
+        self.action_funct_qmap = QtGui.QAction('&Q-range map', self)
+        self.menu_set_action(self.action_funct_qmap, self.qmap_win.show)
+        menu_functions.addAction(self.action_funct_qmap)
+        # follow the motors
+        self.action_funct_follow = QtGui.QAction('Follow &motors', self, checkable=True)
+        self.menu_set_action(self.action_funct_follow, self.toggle_follow)
+        self.action_funct_follow.setEnabled(bool(self.plo.follow_source))
+        self.action_funct_follow.setChecked(self.motor_follower is not None)
+        menu_functions.addAction(self.action_funct_follow)
+        # frame times (debug)
+        if self.plo.set_debug:
+            menu_functions.addSeparator()
+            self.action_funct_prof_export = QtGui.QAction('Export frame times', self)
+            self.menu_set_action(self.action_funct_prof_export, self.prof_export)
+            menu_functions.addAction(self.action_funct_prof_export)
         
         # PXRD pattern
         self.action_pxrd_pattern = QtGui.QAction('P&XRD pattern', self)
@@ -1256,6 +1450,15 @@ class MainWindow(QtWidgets.QMainWindow):
             self.action_funct_fwhm_show.setChecked(False)
         self.redraw_canvas()
 
+    def toggle_follow(self):
+        """
+        Starts or stops following the motor positions of plo.follow_source.
+        """
+        if self.motor_follower is None:
+            self.follow_start()
+        else:
+            self.follow_stop()
+
     def toggle_colored_reference(self):
         self.plo.colored_reference = not self.plo.colored_reference
         if self.plo.colored_reference:
@@ -1363,14 +1566,137 @@ class MainWindow(QtWidgets.QMainWindow):
             elif self.sender().objectName() == 'bsdx':
                 self.geo.bsdx = float(val)
 
-        # re-calculate cones and re-draw contours
-        self.draw_conics()
-        # update child windows
-        self.update_win_generic()
-        # draw reference contours
-        if self.geo.reference != 'None':
-            self.get_reference()
-            self.draw_reference()
+        # the dead band of the motor follower refers to the screen,
+        # a slider or apply_geometry may have left the motor position
+        if self.motor_follower is not None:
+            self.motor_follower.current.update({p:getattr(self.geo, p) for p in follower.FOLLOW_PARAMS})
+
+        with self.profiler.frame('update_screen'):
+            # re-calculate cones and re-draw contours
+            self.draw_conics()
+            # update child windows
+            # skipped while dragging a slider
+            if not self.lod_active:
+                with self.profiler.stage('update_win_generic'):
+                    self.update_win_generic()
+            # draw reference contours
+            if self.geo.reference != 'None':
+                with self.profiler.stage('get_reference'):
+                    self.get_reference()
+                with self.profiler.stage('draw_reference'):
+                    self.draw_reference()
+        if self.profiler.enabled and not self.prof_timer.isActive():
+            self.prof_timer.start()
+
+    def lod_begin(self):
+        """
+        Enables the reduced level of detail while a slider is dragged:
+        - conic resolution: plo.slider_lod_conic_steps
+        - overlay resolution: plo.slider_lod_overlay_res
+        - number of reference contours: plo.slider_lod_ref_num
+        - child windows are not updated
+        """
+        if self.plo.slider_lod:
+            self.lod_active = True
+
+    def lod_end(self):
+        """
+        Disables the reduced level of detail and
+        redraws the screen at full detail.
+        """
+        if self.lod_active:
+            self.lod_active = False
+            self.update_screen()
+
+    def lod_conic_steps(self):
+        """
+        Returns the conic resolution for the current level of detail.
+        """
+        if self.lod_active:
+            return min(self.plo.conic_steps, self.plo.slider_lod_conic_steps)
+        return self.plo.conic_steps
+
+    def lod_overlay_res(self):
+        """
+        Returns the overlay resolution for the current level of detail,
+        None or 0 (full detector resolution) is reduced while dragging.
+        """
+        _res = self.plo.overlay_resolution
+        if self.lod_active:
+            if not _res or _res <= 0:
+                return self.plo.slider_lod_overlay_res
+            return min(int(_res), self.plo.slider_lod_overlay_res)
+        return _res
+
+    def apply_geometry(self, values):
+        """
+        Applies a set of geometry parameters at once, e.g. a
+        geometry suggested by the optimizer window.
+
+        The sliders are updated silently and the screen
+        is redrawn only once.
+
+        Args:
+            values (dict): Geometry parameters (ener, dist, voff, hoff, tilt, rota, bsdx),
+                           missing entries are left unchanged.
+        """
+        for token in ['ener', 'dist', 'voff', 'hoff', 'tilt', 'rota', 'bsdx']:
+            if values.get(token) is not None:
+                setattr(self.geo, token, float(values[token]))
+        # the beamstop can't be further away than the detector
+        self.geo.bsdx = min(self.geo.bsdx, self.geo.dist)
+        self.sliderWidget.set_slider_values(self.geo)
+        self.update_screen()
+
+    def follow_start(self, source=None):
+        """
+        Starts following the motor positions of a control system.
+
+        The updates of the source are coalesced, changes smaller than
+        plo.follow_deadband slider steps are dropped and the screen is
+        updated at most plo.follow_rate times per second (see follower.Follower).
+
+        Args:
+            source (str or follower.PositionSource, optional): The position source,
+                default plo.follow_source (udp://host:port or a file).
+        """
+        self.follow_stop()
+        source = self.plo.follow_source if source is None else source
+        deadband = {p:self.plo.follow_deadband * getattr(self.lmt, f'{p}_stp') for p in follower.FOLLOW_PARAMS}
+        current = {p:getattr(self.geo, p) for p in follower.FOLLOW_PARAMS}
+        try:
+            self.motor_follower = follower.Follower(source,
+                                                    names=self.plo.follow_names,
+                                                    rate=self.plo.follow_rate,
+                                                    deadband=deadband,
+                                                    current=current)
+        except (OSError, ValueError) as e:
+            print(f'WARNING: Unable to follow the motors ({source}): {e}')
+            self.action_funct_follow.setChecked(False)
+            return
+        self.follow_timer.start()
+        self.action_funct_follow.setChecked(True)
+
+    def follow_stop(self):
+        """
+        Stops following the motor positions, see follow_start.
+        """
+        self.follow_timer.stop()
+        if self.motor_follower is not None:
+            self.motor_follower.close()
+            self.motor_follower = None
+        self.action_funct_follow.setChecked(False)
+        # the q-range map is not recalculated while following
+        if hasattr(self, 'qmap_win'):
+            self.qmap_win.refresh()
+
+    def follow_update(self):
+        """
+        Applies the due motor position changes, called by the follow_timer.
+        """
+        changes = self.motor_follower.poll()
+        if changes is not None:
+            self.apply_geometry(changes)
 
     def update_win_generic(self):
         """
@@ -1383,6 +1709,8 @@ class MainWindow(QtWidgets.QMainWindow):
             self.win_pxrd_update()
         if hasattr(self, 'fwhm_win'):
             self.fwhm_win.update()
+        if hasattr(self, 'qmap_win'):
+            self.qmap_win.refresh()
 
     ##################
     #  DRAW CONICS   #
@@ -1428,60 +1756,67 @@ class MainWindow(QtWidgets.QMainWindow):
         _comp_shift = -(self.geo.voff - self.geo.dist * np.tan(_omega) - np.deg2rad(self.geo.tilt) * self.geo.dist)
 
         # overlay
-        if self.plo.show_polarisation or self.plo.show_solidangle or self.plo.show_unit_hover or self.plo.show_fwhm:
-            _grd, self._tth, self._azi, self._polcor, self._solang, self._fwhm = self.calc_overlays(_omega, res=self.plo.overlay_resolution, pol=self.plo.polarisation_fac)
-            self.patches['overlay'].setImage(_grd * self._polcor * self._solang,
-                                             autoLevels=False,
-                                             levels=[0.0,1.0],
-                                             rect=(-self.xdim,
-                                                   -self.ydim,
-                                                    self.xdim * 2,
-                                                    self.ydim * 2))
-        else:
-            self._tth = None
-            self._azi = None
-            self.patches['overlay'].setImage(None)
-            self.cor_label.hide()
+        with self.profiler.stage('overlays'):
+            if self.plo.show_polarisation or self.plo.show_solidangle or self.plo.show_unit_hover or self.plo.show_fwhm:
+                _res = self.lod_overlay_res()
+                _pars = self.overlay_params(_omega, res=_res, pol=self.plo.polarisation_fac)
+                if self.plo.overlay_async:
+                    # the overlay is swapped in when ready (overlay_swap)
+                    self.overlay_worker.submit(_pars)
+                else:
+                    _result = OverlayWorker.calculate(_pars)
+                    self.overlay_swap(self.overlay_worker.cancel(), _result, None)
+            else:
+                # drop pending results
+                self.overlay_worker.cancel()
+                self._tth = None
+                self._azi = None
+                self.patches['overlay'].setImage(None)
+                self.overlay_worker.release(self.overlay_buf)
+                self.overlay_buf = None
+                self.cor_label.hide()
         
         # update beam center
         self.patches['beamcenter'].setData([self.geo.hoff],[_comp_shift])
         # update beam center
         self.patches['poni'].setData([self.geo.hoff],[-(self.geo.voff - np.deg2rad(self.geo.tilt)*self.geo.dist)])
 
-        # hide beamstop contour and label
-        self.patches['beamstop'].setVisible(False)
-        self.patches['bs_label'].setVisible(False)
-        # check if beamstop is on screen, change visibility
-        if self.geo.bssz and not (isinstance(self.geo.bssz, str) and self.geo.bssz.lower() == 'none'):
-            # make sure it is a float (might be a string from the export window!)
-            self.geo.bssz = float(self.geo.bssz)
-            # update beam stop
-            self.bs_theta = np.tan((self.geo.bssz/2) / self.geo.bsdx)
+        with self.profiler.stage('beamstop'):
+            # hide beamstop contour and label
+            self.patches['beamstop'].setVisible(False)
+            self.patches['bs_label'].setVisible(False)
+            # check if beamstop is on screen, change visibility
+            if self.geo.bssz and not (isinstance(self.geo.bssz, str) and self.geo.bssz.lower() == 'none'):
+                # make sure it is a float (might be a string from the export window!)
+                self.geo.bssz = float(self.geo.bssz)
+                # update beam stop
+                self.bs_theta = self.get_extent().bs_theta
 
-            # calculate the conic section corresponding to the theta angle
-            # :returns False is conic is outside of visiblee area
-            x, y = self.calc_conic(_omega, self.bs_theta, steps=self.plo.conic_steps)
-            if x is not False:
-                # figure out the label positions
-                if self.plo.conic_label_auto:
-                    label_pos = self.label_conic_pos_auto(x, y)
-                else:
-                    label_pos = self.label_conic_pos_static(x, y, self.xdim, self.ydim, _omega, self.bs_theta)
-                
-                # continue if label can be placed
-                if label_pos is not False:
-                    # plot the conic section
-                    self.patches['beamstop'].setData(x, y, fillLevel=y.max())
-                    self.patches['beamstop'].setVisible(True)
-
-                    _unit = self.calc_unit(self.bs_theta)
-                    self.patches['bs_label'].setPos(*label_pos)
-                    self.patches['bs_label'].setText(f'{_unit:.2f}')
-                    self.patches['bs_label'].setVisible(True)
+                # calculate the conic section corresponding to the theta angle
+                # :returns False is conic is outside of visiblee area
+                # the beamstop is filled, keep the contour closed
+                x, y = self.calc_conic(_omega, self.bs_theta, steps=self.lod_conic_steps(), clip=False)
+                if x is not False:
+                    # figure out the label positions
+                    if self.plo.conic_label_auto:
+                        label_pos = self.label_conic_pos_auto(x, y)
+                    else:
+                        label_pos = self.label_conic_pos_static(x, y, self.xdim, self.ydim, _omega, self.bs_theta)
+                    
+                    # continue if label can be placed
+                    if label_pos is not False:
+                        # plot the conic section
+                        self.patches['beamstop'].setData(x, y, fillLevel=y.max())
+                        self.patches['beamstop'].setVisible(True)
+
+                        _unit = self.calc_unit(self.bs_theta)
+                        self.patches['bs_label'].setPos(*label_pos)
+                        self.patches['bs_label'].setText(f'{_unit:.2f}')
+                        self.patches['bs_label'].setVisible(True)
         
         # calculate the maximum resolution for the given geometry
         if self.plo.conic_tth_auto:
-            theta_max = np.rad2deg(self.calc_tth_max(scale=0.90))
+            theta_max = np.rad2deg(self.get_extent(scale=0.90).tth_max)
             # make new array of 2theta values
             self.cont_geom_num = np.linspace(theta_max/self.plo.conic_tth_num, theta_max, self.plo.conic_tth_num)
         
@@ -1497,45 +1832,50 @@ class MainWindow(QtWidgets.QMainWindow):
 
             # calculate the conic section corresponding to the theta angle
             # :returns False is conic is outside of visiblee area
-            x, y = self.calc_conic(_omega, theta, steps=self.plo.conic_steps)
+            with self.profiler.stage('conics'):
+                x, y = self.calc_conic(_omega, theta, steps=self.lod_conic_steps())
             if x is False or x.size == 0:
                 continue
 
             # figure out the label positions
-            if self.plo.conic_label_auto:
-                label_pos = self.label_conic_pos_auto(x, y)
-            else:
-                label_pos = self.label_conic_pos_static(x, y, self.xdim, self.ydim, _omega, theta)
+            with self.profiler.stage('labels'):
+                if self.plo.conic_label_auto:
+                    label_pos = self.label_conic_pos_auto(x, y)
+                else:
+                    label_pos = self.label_conic_pos_static(x, y, self.xdim, self.ydim, _omega, theta)
             # continue if label can be placed
             if label_pos is False:
                 continue
 
             # plot the conic section
             _unit = self.calc_unit(theta)
-            self.patches['labels'][_n].setPos(*label_pos)
             if self.plo.colored_reference:
-                self.patches['conic'][_n].setData(x, y, pen=pg.mkPen(self.conic_ref_color, width=self.plo.conic_linewidth))
-                self.patches['labels'][_n].setText(f'{_unit:.2f}', color=self.conic_ref_color)
+                _color = self.conic_ref_color
             else:
-                self.patches['conic'][_n].setData(x, y, pen=pg.mkPen(self.cont_cmap.map(_f, mode='qcolor'), width=self.plo.conic_linewidth))
-                self.patches['labels'][_n].setText(f'{_unit:.2f}', color=self.cont_cmap.map(_f, mode='qcolor'))
-            self.patches['conic'][_n].setVisible(True)
-            self.patches['labels'][_n].setVisible(True)
+                _color = self.pool_color(_f)
+            with self.profiler.stage('conics'):
+                self.pool_set_curve(self.patches['conic'][_n], x, y, self.pool_pen(_color, self.plo.conic_linewidth))
+                self.patches['conic'][_n].setVisible(True)
+            with self.profiler.stage('labels'):
+                self.patches['labels'][_n].setPos(*label_pos)
+                self.pool_set_label(self.patches['labels'][_n], f'{_unit:.2f}', _color)
+                self.patches['labels'][_n].setVisible(True)
             
             ## plot azimuthal grid lines
-            if self.plo.show_grid:
-                # calculate the azimuthal grid points
-                grid_vectors = self.calc_azi_grid(_omega)
-                for i,[a, v] in enumerate(grid_vectors.items()):
-                    # plot the azimuthal grid point
-                    # Currently the angle a is not used
-                    # but might be useful for future reference
-                    self.patches['polar_grid'][i].setData(v[:,0],
-                                                        v[:,1],)
-                    self.patches['polar_grid'][i].setVisible(True)
-            else:
-                for i in range(self.plo.azimuth_num):
-                    self.patches['polar_grid'][i].setVisible(False)
+            with self.profiler.stage('grid'):
+                if self.plo.show_grid:
+                    # calculate the azimuthal grid points
+                    grid_vectors = self.calc_azi_grid(_omega)
+                    for i,[a, v] in enumerate(grid_vectors.items()):
+                        # plot the azimuthal grid point
+                        # Currently the angle a is not used
+                        # but might be useful for future reference
+                        self.patches['polar_grid'][i].setData(v[:,0],
+                                                            v[:,1],)
+                        self.patches['polar_grid'][i].setVisible(True)
+                else:
+                    for i in range(self.plo.azimuth_num):
+                        self.patches['polar_grid'][i].setVisible(False)
 
     def draw_reference(self):
         """
@@ -1558,7 +1898,7 @@ class MainWindow(QtWidgets.QMainWindow):
         - The method assumes that `self.geo.ener` is the energy value used for wavelength calculation.
         - The method uses `np.arcsin` for angle calculation and `np.deg2rad` for degree to radian conversion.
         - The method relies on `self.calc_conic` to compute the conic section coordinates.
-        - The method uses `pg.mkPen` for setting the pen properties of the contour lines.
+        - The method uses `pool_pen` for setting the pen properties of the contour lines.
         Attributes:
         - self.plo.conic_ref_num: Number of reference conic sections.
         - self.cont_ref_dsp: List of d-spacings for the reference contours.
@@ -1574,15 +1914,22 @@ class MainWindow(QtWidgets.QMainWindow):
         - self.plo.conic_ref_linewidth: Base line width for the reference contours.
         - self.conic_ref_color: Color for the reference contour lines.
         - self.patches['reference']: Dictionary to store the reference contour line patches.
+        - self.patches['reference_batch']: Single plot item drawing all reference contours
+          (if plo.conic_ref_batch is True).
         """
         if len(self.patches['reference']) == 0:
             return
+        # collect the contours for the batched plot item
+        # (x, y, color, width, index)
+        _batch = []
+        # number of contours to draw, reduced while dragging a slider
+        _num = min(len(self.cont_ref_dsp), self.plo.slider_lod_ref_num) if self.lod_active else len(self.cont_ref_dsp)
         # plot reference contour lines
         # standard contour lines are to be drawn
         for _n in range(self.plo.conic_ref_num):
             self.patches['reference'][_n].setVisible(False)
             # number of d-spacings might be lower than the maximum number of allowed contours
-            if _n < len(self.cont_ref_dsp):
+            if _n < _num:
                 _d = self.cont_ref_dsp[_n]
                 # None adds a list of zeros
                 # catch those here
@@ -1605,7 +1952,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 
                 # calculate the conic section corresponding to the theta angle
                 # :returns False is conic is outside of visiblee area
-                x, y = self.calc_conic(_omega, theta, steps=self.plo.conic_steps)
+                x, y = self.calc_conic(_omega, theta, steps=self.lod_conic_steps())
                 if x is False:
                     continue
 
@@ -1636,16 +1983,21 @@ class MainWindow(QtWidgets.QMainWindow):
                 if self.plo.colored_reference:
                     # current fraction for colormap
                     _f = _n/len(self.cont_ref_dsp)
-                    # plot the conic section
-                    self.patches['reference'][_n].setData(x, y, pen=pg.mkPen(self.cont_cmap.map(_f, mode='qcolor'),
-                                                                             width=max(self.plo.conic_ref_cif_lw_min, 
-                                                                                       self.plo.conic_ref_linewidth * width)))
+                    _color = self.pool_color(_f)
+                else:
+                    _color = self.conic_ref_color
+                _width = max(self.plo.conic_ref_cif_lw_min, self.plo.conic_ref_linewidth * width)
+                # plot the conic section
+                if self.patches['reference_batch'] is not None:
+                    self.patches['reference'][_n].setData(x, y)
+                    _batch.append((x, y, _color, _width, _n))
                 else:
-                    self.patches['reference'][_n].setData(x, y, pen=pg.mkPen(self.conic_ref_color,
-                                                                             width=max(self.plo.conic_ref_cif_lw_min, 
-                                                                                       self.plo.conic_ref_linewidth * width)))
+                    self.pool_set_curve(self.patches['reference'][_n], x, y, self.pool_pen(_color, _width))
                 self.patches['reference'][_n].setVisible(True)
         
+        if self.patches['reference_batch'] is not None:
+            self.patches['reference_batch'].setRings(_batch)
+        
         # update highlighted curve position and hkl label
         _index_hl = self.patches['ref_hl_curve'].index
         if _index_hl is None:
@@ -1704,7 +2056,7 @@ class MainWindow(QtWidgets.QMainWindow):
         Change the detector settings and update the display.
 
         This method allows changing the detector type and size. It then updates
-        the detector parameters, clears the current display, re-initializes the 
+        the detector parameters, updates the detector dependent items of the 
         main screen, centers the slider frame, and updates the window.
 
         Args:
@@ -1717,10 +2069,8 @@ class MainWindow(QtWidgets.QMainWindow):
             self.geo.det_size = det_size
         # get new detector specs
         self.det = self.get_det_params()
-        # clear the screen
-        self.ax.clear()
-        # re-initialise
-        self.main_screen_init()
+        # update the detector dependent items
+        self.main_screen_update()
         # center the slider frame
         self.sliderWidget.center_frame()
         #self.update_win_generic()
@@ -1821,41 +2171,7 @@ class MainWindow(QtWidgets.QMainWindow):
         Returns:
             Container: An object containing the default geometry settings
         """
-        ######################
-        # Setup the geometry #
-        ######################
-        geo = Container()
-        geo.det_type = 'EIGER2'  # [str]  Pilatus3 / Eiger2
-        geo.det_size = '4M'      # [str]  300K 1M 2M 6M / 1M 4M 9M 16M
-        geo.ener = 25            # [keV]  Beam energy
-        geo.dist = 100           # [mm]   Detector distance
-        geo.voff = 0             # [mm]   Detector offset (vertical)
-        geo.hoff = 0             # [mm]   Detector offset (horizontal)
-        geo.rota = 0             # [deg]  Detector rotation
-        geo.tilt = 0             # [deg]  Detector tilt
-        geo.bssz = 3.0           # [mm]   Current beamstop size (or None)
-        geo.bsdx = 40            # [mm]   Beamstop distance
-        geo.unit = 1             # [0-3]  Contour legend
-                                 #          0: 2-Theta
-                                 #          1: d-spacing
-                                 #          2: q-space
-                                 #          3: sin(theta)/lambda
-        geo.reference = 'None'   # [str]  Plot reference contours
-                                 #          pick from pyFAI
-        geo.darkmode = True      # [bool] Darkmode
-        geo.colormap = 'viridis' # [cmap] Contour colormap
-        geo.bs_list = [1.5,      # [list] Available beamstop sizes
-                       2.0,
-                       2.5,
-                       3.0,
-                       5.0]
-        geo.det_bank = {}        # available detectors
-                                 # 'key':['value'] or ['value1', 'value2']
-                                 # 'key': Detector name
-                                 # 'value': Detector model/size/type
-                                 # e.g. {'PLATUS3:['1M', '2M'], 'EIGER2':['4M']}
-                                 # empty dict enables all detectors
-        return geo
+        return defaults.get_defaults_geo()
 
     def get_defaults_plo(self):
         """
@@ -1875,92 +2191,7 @@ class MainWindow(QtWidgets.QMainWindow):
             - update/reset
             - debug/testing
         """
-        ################
-        # Plot Details #
-        ################
-        plo = Container()
-        # - geometry contour section - 
-        plo.conic_tth_min = 5               # [int]    Minimum 2-theta contour line
-        plo.conic_tth_max = 100             # [int]    Maximum 2-theta contour line
-        plo.conic_tth_num = 12              # [int]    Number of contour lines
-        plo.conic_tth_auto = True           # [bool]   Dynamic contour levels
-        plo.beamcenter_marker = 'o'         # [marker] Beamcenter marker
-        plo.beamcenter_size = 6             # [int]    Beamcenter size
-        plo.poni_marker = 'x'               # [marker] Poni marker
-        plo.poni_size = 8                   # [int]    Poni size
-        plo.conic_linewidth = 2.0           # [float]  Contour linewidth (lw)
-        plo.conic_label_size = 14           # [int]    Contour labelsize
-        plo.conic_label_auto = True         # [bool]   Dynamic label positions
-        plo.colored_reference = False       # [bool]   Color reference cones instead
-        # - reference contour section - 
-        plo.conic_ref_linewidth = 2.0       # [float]  Reference contour linewidth
-        plo.conic_ref_timeout = 500         # [int]    highlight contour on click (msec)
-        plo.conic_ref_num = 250             # [int]    Number of reference contours
-        plo.conic_ref_cif_int = 0.01        # [float]  Minimum display intensity (cif)
-        plo.conic_ref_cif_kev = 10.0        # [float]  Energy [keV] for intensity calculation
-        plo.conic_ref_cif_irel = True       # [bool]   Linewidth relative to intensity
-        plo.conic_ref_cif_lw_min = 0.1      # [float]  Minimum linewidth when using irel
-        plo.conic_ref_cif_lw_mult = 3.0     # [float]  Linewidth multiplier when using irel
-        plo.conic_hkl_show_int = False      # [bool]   Show intensity in hkl tooltip
-        plo.conic_hkl_label_size = 14       # [int]    Font size of hkl tooltip
-        # - module section - 
-        plo.det_module_alpha = 0.20         # [float]  Detector module alpha
-        plo.det_module_width = 1            # [int]    Detector module border width
-        # - general section - 
-        plo.conic_steps = 100               # [int]    Conic resolution
-        plo.plot_size = 0                   # [int]    Plot size, px (0 for auto)
-        plo.plot_size_fixed = True          # [bool]   Fix window size
-        plo.plot_padding = 0                # [int]    Padding of the detector screen
-        plo.unit_label_size = 16            # [int]    Label size, px
-        plo.polarisation_fac = 0.99         # [float]  Horizontal polarisation factor
-        plo.show_polarisation = True        # [bool]   Show polarisation overlay
-        plo.show_solidangle = False         # [bool]   Show solid angle overlay
-        plo.show_unit_hover = True          # [bool]   Show unit value on hover
-        plo.show_grid = False               # [bool]   Show azimuthal grid
-        plo.azimuth_num = 13                # [int]    Number of azimuthal grid lines
-        plo.overlay_resolution = 300        # [int]    Overlay resolution
-        plo.overlay_toggle_warn = True      # [bool]   Overlay warn color threshold
-        # - pxrd plot -
-        plo.pxrd_marker_symbol = 'arrow_up' # [marker] Symbol to mark peaks
-        plo.pxrd_marker_offset = 0.05       # [float]  offset of marker from x-axis
-        # - extra functions -
-        plo.show_fwhm = False               # [bool]   Show delta_d/d function
-        plo.sensor_thickness = 1000e-6      # [float]  Detector sensor thickness [m]
-        plo.sensor_material = 'CdTe'        # [str]    Detector sensor material
-        plo.beam_divergence = 10e-6         # [float]  X-ray beam divergence [rad]
-        plo.scattering_diameter = 100e-6    # [float]  Scattering volume diameter [m]
-        plo.energy_resolution = 1.4e-4      # [float]  X-ray beam resolution [eV/keV]
-        #plo.funct_fwhm_thresh = 1e-3       # 
-        # - slider section - 
-        plo.slider_margin = 12              # [int]    Slider frame top margin
-        plo.slider_border_width = 1         # [int]    Slider frame border width
-        plo.slider_border_radius = 1        # [int]    Slider frame border radius (px)
-        plo.slider_label_size = 14          # [int]    Slider frame label size
-        plo.slider_column_width = 75        # [int]    Slider label column width
-        plo.enable_slider_ener = True       # [bool]   Show energy slider
-        plo.enable_slider_dist = True       # [bool]   Show distance slider
-        plo.enable_slider_rota = True       # [bool]   Show rotation slider
-        plo.enable_slider_voff = True       # [bool]   Show vertical offset slider
-        plo.enable_slider_hoff = True       # [bool]   Show horizontal offset slider
-        plo.enable_slider_tilt = True       # [bool]   Show tilt slider
-        plo.enable_slider_bsdx = True       # [bool]   Show beamstop distance slider
-        plo.slider_label_ener = 'Energy\n[keV]'            # [str] Label for energy slider
-        plo.slider_label_dist = 'Distance\n[mm]'           # [str] Label for distance slider
-        plo.slider_label_rota = 'Rotation\n[\u02da]'       # [str] Label for rotation slider
-        plo.slider_label_voff = 'Vertical\noffset\n[mm]'   # [str] Label for vertical offset slider
-        plo.slider_label_hoff = 'Horizontal\noffset\n[mm]' # [str] Label for horizontal offset slider
-        plo.slider_label_tilt = 'Tilt\n[\u02da]'           # [str] Label for tilt slider
-        plo.slider_label_bsdx = 'Beamstop\ndistance\n[mm]' # [str] Label for beamstop distance slider
-        # - update/reset - 
-        plo.update_settings = True          # [bool]   Update settings file after load
-        plo.update_det_bank = True          # [bool]   Update detector bank after load
-        plo.reset_settings = False          # [bool]   Reset settings file
-        plo.reset_det_bank = False          # [bool]   Reset detector bank
-        # - debug/testing -
-        plo.use_native_menubar = True       # [bool]   Use native menubar
-        plo.set_debug = False               # [bool]   Debug mode
-
-        return plo
+        return defaults.get_defaults_plo()
     
     def get_defaults_thm(self):
         """
@@ -1981,48 +2212,7 @@ class MainWindow(QtWidgets.QMainWindow):
         Returns:
             Container: An object containing the default theme settings.
         """
-        #################
-        # Theme Details #
-        #################
-        thm = Container()
-        thm.color_dark = '#404040'                    # [color]  Global dark color
-        thm.color_light = '#EEEEEE'                   # [color]  Global light color
-        # light mode
-        thm.light_conic_label_fill = '#FFFFFF'        # [color]  Contour label fill color
-        thm.light_conic_ref_color = '#DCDCDC'         # [color]  Reference contour color
-        thm.light_conic_highlight = '#FF0000'         # [color]  Reference contour highlight color
-        thm.light_beamstop_color = '#80FF0000'        # [color]  Beamstop color
-        thm.light_beamstop_edge_color = '#FF0000'     # [color]  Beamstop edge color
-        thm.light_det_module_color = '#404040'        # [color]  Detector module border color
-        thm.light_det_module_fill = '#404040'         # [color]  Detector module background color
-        thm.light_plot_bg_color = '#FFFFFF'           # [color]  Plot background color
-        thm.light_unit_label_color = '#808080'        # [color]  Label color
-        thm.light_unit_label_fill = '#FFFFFF'         # [color]  Label fill color
-        thm.light_slider_border_color = '#808080'     # [color]  Slider frame border color
-        thm.light_slider_bg_color = '#AAC0C0C0'       # [color]  Slider frame background color
-        thm.light_slider_bg_hover = '#C0C0C0'         # [color]  Slider frame hover color
-        thm.light_slider_label_color = '#000000'      # [color]  Slider frame label color
-        thm.light_overlay_threshold_color = '#FF0000' # [color]  Map threshold color
-        thm.light_grid_color = '#AAAAAA'              # [color]  Grid color
-        # dark mode
-        thm.dark_conic_label_fill = '#000000'         # [color]  Contour label fill color
-        thm.dark_conic_ref_color = '#303030'          # [color]  Reference contour color
-        thm.dark_conic_highlight = '#FF0000'          # [color]  Reference contour highlight color
-        thm.dark_beamstop_color = '#AAFF0000'         # [color]  Beamstop color
-        thm.dark_beamstop_edge_color = '#FF0000'      # [color]  Beamstop edge color
-        thm.dark_det_module_color = '#EEEEEE'         # [color]  Detector module border color
-        thm.dark_det_module_fill = '#EEEEEE'          # [color]  Detector module background color
-        thm.dark_plot_bg_color = '#000000'            # [color]  Plot background color
-        thm.dark_unit_label_color = '#C0C0C0'         # [color]  Label color
-        thm.dark_unit_label_fill = '#000000'          # [color]  Label fill color
-        thm.dark_slider_border_color = '#202020'      # [color]  Slider frame border color
-        thm.dark_slider_bg_color = '#AA303030'        # [color]  Slider frame background color
-        thm.dark_slider_bg_hover = '#303030'          # [color]  Slider frame hover color
-        thm.dark_slider_label_color = '#C0C0C0'       # [color]  Slider frame label color
-        thm.dark_overlay_threshold_color = '#FF0000'  # [color]  Map threshold color
-        thm.dark_grid_color = '#606060'               # [color]  Grid color
-
-        return thm
+        return defaults.get_defaults_thm()
     
     def get_defaults_lmt(self):
         """
@@ -2030,39 +2220,7 @@ class MainWindow(QtWidgets.QMainWindow):
         Returns:
             Container: An object containing default limits
         """
-        ##########
-        # Limits #
-        ##########
-        lmt = Container()
-        lmt.ener_min =  5    # [int] Energy minimum [keV]
-        lmt.ener_max =  100  # [int] Energy maximum [keV]
-        lmt.ener_stp =  1    # [int] Energy step size [keV]
-
-        lmt.dist_min =  40   # [int] Distance minimum [mm]
-        lmt.dist_max =  1000 # [int] Distance maximum [mm]
-        lmt.dist_stp =  1    # [int] Distance step size [mm]
-
-        lmt.hoff_min = -150  # [int] Horizontal offset minimum [mm]
-        lmt.hoff_max =  150  # [int] Horizontal offset maximum [mm]
-        lmt.hoff_stp =  1    # [int] Horizontal offset step size [mm]
-
-        lmt.voff_min = -250  # [int] Vertical offset minimum [mm]
-        lmt.voff_max =  250  # [int] Vertical offset maximum [mm]
-        lmt.voff_stp =  1    # [int] Vertical offset step size [mm]
-
-        lmt.rota_min = -45   # [int] Rotation minimum [deg]
-        lmt.rota_max =  45   # [int] Rotation maximum [deg]
-        lmt.rota_stp =  1    # [int] Rotation step size [deg]
-
-        lmt.tilt_min = -40   # [int] Tilt minimum [deg]
-        lmt.tilt_max =  40   # [int] Tilt maximum [deg]
-        lmt.tilt_stp =  1    # [int] Tilt step size [deg]
-
-        lmt.bsdx_min =   5   # [int] Beamstop distance minimum [mm]
-        lmt.bsdx_max = 1000  # [int] Beamstop distance maximum [mm]
-        lmt.bsdx_stp =   1   # [int] Beamstop distance step size [mm]
-        
-        return lmt
+        return defaults.get_defaults_lmt()
 
     def get_defaults_all(self):
         """
@@ -2163,161 +2321,8 @@ class MainWindow(QtWidgets.QMainWindow):
         Raises:
         SystemExit: If there is an error parsing the detector database file.
         """
-        ###########################
-        # Detector Specifications #
-        ###########################
-        detectors = dict()
-        ###############################
-        # Specifications for Pilatus3 #
-        ###############################
-        detectors['PILATUS3'] = {
-            'pxs' : 172e-3, # [mm] Pixel size
-            'hmp' : 487,    # [px] Module size (horizontal
-            'vmp' : 195,    # [px] Module size (vertical)
-            'hgp' : 7,      # [px] Module gap (horizontal)
-            'vgp' : 17,     # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : {'300K':(1,3),
-                        '1M':(2,5),
-                        '2M':(3,8),
-                        '6M':(5,12)},
-            }
-        
-        ###############################
-        # Specifications for Pilatus4 #
-        ###############################
-        # Note: These are probably not
-        # the correct PILATUS4 specs
-        # and are only meant to play
-        # around!
-        detectors['PILATUS4'] = {
-            'pxs' : 150e-3, # [mm] Pixel size
-            'hmp' : 513,    # [px] Module size (horizontal
-            'vmp' : 255,    # [px] Module size (vertical)
-            'hgp' : 7,      # [px] Module gap (horizontal)
-            'vgp' : 20,     # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : {'1M':(2,4),
-                      '2M':(3,6),
-                      '4M':(4,8)}
-            }
-        
-        #############################
-        # Specifications for Eiger2 #
-        #############################
-        detectors['EIGER2'] = {
-            'pxs' : 75e-3,  # [mm] Pixel size
-            'hmp' : 1028,   # [px] Module size (horizontal
-            'vmp' : 512,    # [px] Module size (vertical)
-            'hgp' : 12,     # [px] Module gap (horizontal)
-            'vgp' : 38,     # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : {'500K':(1,2),
-                        '1M':(1,2),
-                        '4M':(2,4),
-                        '9M':(3,6),
-                       '16M':(4,8)},
-            }
-        
-        #############################
-        # Specifications for MPCCD #
-        #############################
-        detectors['MPCCD'] = {
-            'pxs' : 50e-3,   # [mm] Pixel size
-            'hmp' : 1024,    # [px] Module size (horizontal
-            'vmp' : 512,     # [px] Module size (vertical)
-            'hgp' : 18,      # [px] Module gap (horizontal)
-            'vgp' : 27,      # [px] Module gap (vertical)
-            'cbh' : 60,      # [px] Central beam hole
-            'size' : {'4M':(2,4)},
-            }
-
-        ##############################
-        # Specifications for RAYONIX #
-        ##############################
-        detectors['RAYONIX'] = {
-            'pxs' : 39e-3,  # [mm] Pixel size
-            'hmp' : 1920,   # [px] Module size (horizontal
-            'vmp' : 1920,   # [px] Module size (vertical)
-            'hgp' : 0,      # [px] Module gap (horizontal)
-            'vgp' : 0,      # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : {'MX225-HS':(3,3),
-                      'MX300-HS':(4,4)},
-            }
-        
-        #############################
-        # Specifications for PHOTON #
-        #############################
-        detectors['PHOTON-II'] = {
-            'pxs' : 135e-3, # [mm] Pixel size
-            'hmp' : 768,    # [px] Module size (horizontal
-            'vmp' : 512,    # [px] Module size (vertical)
-            'hgp' : 0,      # [px] Module gap (horizontal)
-            'vgp' : 0,      # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : { '7':(1,1),
-                      '14':(1,2)},
-            }
-        
-        #############################
-        # Specifications for PHOTON #
-        #############################
-        detectors['PHOTON-III'] = {
-            'pxs' : 135e-3, # [mm] Pixel size
-            'hmp' : 768,    # [px] Module size (horizontal
-            'vmp' : 512,    # [px] Module size (vertical)
-            'hgp' : 0,      # [px] Module gap (horizontal)
-            'vgp' : 0,      # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : { '7':(1,1),
-                      '14':(1,2),
-                      '28':(2,2)},
-            }
-        
-        ###################################
-        # Specifications for Perkin-Elmer #
-        ###################################
-        detectors['Perkin-Elmer XRD'] = {
-            'pxs' : 100e-3, # [mm] Pixel size
-            'hmp' : 2048,   # [px] Module size (horizontal
-            'vmp' : 2048,   # [px] Module size (vertical)
-            'hgp' : 0,      # [px] Module gap (horizontal)
-            'vgp' : 0,      # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : {'0822':(1,1),
-                      '1611':(2,2),
-                      '1620':(2,2),
-                      '1621':(2,2),
-                      '1622':(2,2),
-                      '1642':(2,2)},
-            }
-        
-        ############################
-        # Specifications for Varex #
-        ############################
-        detectors['VAREX XRpad2'] = {
-            'pxs' : 100e-3, # [mm] Pixel size
-            'hmp' : 4288,   # [px] Module size (horizontal)
-            'vmp' : 4288,   # [px] Module size (vertical)
-            'hgp' : 0,      # [px] Module gap (horizontal)
-            'vgp' : 0,      # [px] Module gap (vertical)
-            'cbh' : 0,      # [px] Central beam hole
-            'size' : {'4343':(1,1)},
-            }
-        
-        #############################
-        # Specifications for CITIUS #
-        #############################
-        detectors['CITIUS'] = {
-            'pxs' : 72.6e-3, # [mm] Pixel size
-            'hmp' : 728,     # [px] Module size (horizontal)
-            'vmp' : 384,     # [px] Module size (vertical)
-            'hgp' : 22,      # [px] Module gap (horizontal)
-            'vgp' : 36,      # [px] Module gap (vertical)
-            'cbh' : 0,       # [px] Central beam hole
-            'size' : {'20.2':(6,12)},
-            }
+        # default detector specifications
+        detectors = defaults.get_det_library()
         
         # make file dump
         if not os.path.exists(self.path_detdb) or reset:
@@ -2406,6 +2411,7 @@ class MainWindow(QtWidgets.QMainWindow):
             'conic_label_size':'[int] Contour labelsize',
             'conic_ref_linewidth':'[float] Reference contour linewidth',
             'conic_ref_num':'[int] Number of reference contours',
+            'conic_ref_batch':'[bool] Draw reference contours as a single item',
             'conic_ref_cif_int':'[float] Minimum display intensity (cif)',
             'conic_ref_cif_kev':'[float] Energy [keV] for intensity calculation',
             'conic_ref_cif_irel':'[bool] Linewidth relative to intensity',
@@ -2416,6 +2422,7 @@ class MainWindow(QtWidgets.QMainWindow):
             'det_module_alpha':'[float] Detector module alpha',
             'det_module_width':'[int] Detector module border width',
             'conic_steps':'[int] Conic resolution',
+            'conic_tolerance':'[float] Adaptive conic resolution, px (0 for fixed)',
             'plot_size':'[int] Plot size, px (0 for auto)',
             'plot_size_fixed':'[bool] Fix window size',
             'unit_label_size':'[int] Label size, px',
@@ -2426,11 +2433,18 @@ class MainWindow(QtWidgets.QMainWindow):
             'overlay_resolution':'[int] Overlay resolution',
             'overlay_threshold':'[float] Overlay warn color threshold',
             'overlay_toggle_warn':'[bool] Toggle overlay highlight',
+            'overlay_async':'[bool] Calculate overlays in the background',
+            'overlay_workers':'[int] Overlay threads, 0: all CPUs',
+            'pxrd_coverage_steps':'[int] Azimuthal samples per ring of the coverage (PXRD reflections)',
             'slider_margin':'[int] Slider frame top margin',
             'slider_border_width':'[int] Slider frame border width',
             'slider_border_radius':'[int] Slider frame border radius (px)',
             'slider_label_size':'[int] Slider frame label size',
             'slider_column_width':'[int] Slider label column width',
+            'slider_lod':'[bool] Reduce detail while dragging a slider',
+            'slider_lod_conic_steps':'[int] Conic resolution while dragging',
+            'slider_lod_overlay_res':'[int] Overlay resolution while dragging',
+            'slider_lod_ref_num':'[int] Number of reference contours while dragging',
             'enable_slider_ener':'[bool] Show energy slider',
             'enable_slider_dist':'[bool] Show distance slider',
             'enable_slider_rota':'[bool] Show rotation slider',
@@ -2445,11 +2459,15 @@ class MainWindow(QtWidgets.QMainWindow):
             'slider_label_hoff':'[str] Label for horizontal offset slider',
             'slider_label_tilt':'[str] Label for tilt slider',
             'slider_label_bsdx':'[str] Label for beamstop distance slider',
+            'follow_source':'[str] Position source to follow the motors, udp://host:port or file (empty to disable)',
+            'follow_names':'[dict] Position names of the source and the geometry parameters, e.g. {det_z: dist}',
+            'follow_rate':'[float] Maximum screen updates per second while following (0: no limit)',
+            'follow_deadband':'[float] Ignore motor changes below this fraction of the slider step',
             'update_settings':'[bool] Update settings file after load',
             'update_det_bank':'[bool] Update detector bank after load',
             'reset_settings':'[bool] Reset settings file',
             'reset_det_bank':'[bool] Reset detector bank',
-            'set_debug':'[bool] Debug mode: Allow pan, zoom and use of toolbox menu'
+            'set_debug':'[bool] Debug mode: Allow pan, zoom, use of toolbox menu and show frame times'
         }
         self.tooltips['thm'] = {
             'color_dark':'[color] Global dark color',
@@ -2632,8 +2650,9 @@ class MainWindow(QtWidgets.QMainWindow):
         Builds the detector by placing modules in a grid pattern based on the detector's configuration.
 
         The method calculates the positions of the detector modules in millimeters, taking into account
-        the pixel size, module gaps, and central beam hole size. It then creates and adds graphical 
-        rectangle items representing the modules to the scene.
+        the pixel size, module gaps, and central beam hole size. All modules are joined into a
+        single QPainterPath that is drawn by one graphics item. The path is only rebuilt if the
+        detector changed.
 
         The placement logic ensures that the beam position is either between the modules (for even 
         numbers of modules) or at the center module (for odd numbers of modules). Additionally, it 
@@ -2661,38 +2680,27 @@ class MainWindow(QtWidgets.QMainWindow):
             None
         """
         # build detector modules
-        # pixel -> mm
-        _hms = self.det.hmp * self.det.pxs
-        _vms = self.det.vmp * self.det.pxs
-        _hgs = self.det.hgp * self.det.pxs
-        _vgs = self.det.vgp * self.det.pxs
-        _cbh = self.det.cbh * self.det.pxs
-        # beam position is between the modules (even) or at the center module (odd)
-        # determined by the "+det.hmn%2" part
-        for i in range(-self.det.hmn//2+self.det.hmn%2, self.det.hmn-self.det.hmn//2):
-            for j in range(-self.det.vmn//2+self.det.vmn%2, self.det.vmn-self.det.vmn//2):
-                # - place modules along x (i) and y (j) keeping the gaps in mind ( + (det.hgp*det.pxs)/2)
-                # - the " - ((det.hmp+det.hgp*det.pxs)/2)" positions the origin (the beam) at the center of a module
-                #   and "det.hmn%2" makes sure this is only active for detectors with an odd number of modules
-                # - define sets of panels that collectively move to realize a central hole offset for MPCCD detectors
-                #   that are used at SACLA/SPring-8:
-                #   x = (...) + (det.cbh/2)*(2*(j&det.vmn)//det.vmn-1)
-                #   y = (...) + (det.cbh/2)*(1-2*(i&det.hmn)//det.hmn)
-                # - negative values of det.cbh for 'clockwise' offset order
-                origin_x = i * (_hms + _hgs) \
-                             - ((_hms + _hgs)/2) * (self.det.hmn % 2) \
-                             + (_hgs)/2 \
-                             + (_cbh/2) * (2*(j & self.det.vmn) // self.det.vmn-1)
-                origin_y = j * (_vms + _vgs) \
-                             - ((_vms + _vgs)/2) * (self.det.vmn%2) \
-                             + (_vgs/2) \
-                             + (_cbh/2) * (1-2*(i & self.det.hmn) // self.det.hmn)
-                # add the module
-                rect_item = QtWidgets.QGraphicsRectItem(origin_x, origin_y,  _hms, _vms)
-                rect_item.setPen(pg.mkPen(color = self.det_module_color, width = self.plo.det_module_width))
-                rect_item.setBrush(pg.mkBrush(color = self.det_module_fill))
-                rect_item.setOpacity(self.plo.det_module_alpha)
-                self.ax.addItem(rect_item)
+        # the path is re-used until the detector changes
+        _key = (self.det.hmp, self.det.vmp, self.det.hgp, self.det.vgp, self.det.cbh, self.det.hmn, self.det.vmn, self.det.pxs)
+        if self.patches['modules'] is not None and self.patches['modules'].key == _key:
+            return
+        # module layout, see geometry.det_modules
+        _x0, _y0, _hms, _vms = geometry.det_modules(self.det)
+        path = QtGui.QPainterPath()
+        for origin_x, origin_y in zip(_x0, _y0):
+            # add the module
+            path.addRect(origin_x, origin_y,  _hms, _vms)
+
+        if self.patches['modules'] is None:
+            path_item = QtWidgets.QGraphicsPathItem(path)
+            path_item.setPen(self.pool_pen(self.det_module_color, self.plo.det_module_width))
+            path_item.setBrush(pg.mkBrush(color = self.det_module_fill))
+            path_item.setOpacity(self.plo.det_module_alpha)
+            self.ax.addItem(path_item)
+            self.patches['modules'] = path_item
+        else:
+            self.patches['modules'].setPath(path)
+        self.patches['modules'].key = _key
 
     ##########
     #  PXRD  #
@@ -2779,6 +2787,17 @@ class MainWindow(QtWidgets.QMainWindow):
         powder_box_layout.addWidget(self.pxrd_plot)
         layout.addWidget(powder_box)
 
+        # reflection table, hidden until requested
+        self.pxrd_table = QtWidgets.QTableWidget(0, 5)
+        self.pxrd_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.pxrd_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.pxrd_table.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.pxrd_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self.pxrd_table.verticalHeader().setVisible(False)
+        self.pxrd_table.cellClicked.connect(self.win_pxrd_table_clicked)
+        self.pxrd_table.setVisible(False)
+        layout.addWidget(self.pxrd_table)
+
         # Disclimer box info
         citation_box = QtWidgets.QGroupBox()
         citation_box.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
@@ -2794,6 +2813,15 @@ class MainWindow(QtWidgets.QMainWindow):
         menu.addAction('Remove', self.win_pxrd_rem_ghost)
         button_ghost.setMenu(menu)
         citation_box_layout.addWidget(button_ghost, alignment=QtCore.Qt.AlignmentFlag.AlignLeft)
+        # show the reflection table
+        button_table = QtWidgets.QPushButton('Reflections')
+        button_table.setToolTip('Show the reflections and the fraction of their rings\nthat lands on the detector modules (coverage).\nExport them as comma separated values.')
+        button_table.setCheckable(True)
+        button_table.toggled.connect(self.win_pxrd_toggle_table)
+        menu = QtWidgets.QMenu()
+        menu.addAction('Export', self.win_pxrd_export)
+        button_table.setMenu(menu)
+        citation_box_layout.addWidget(button_table, alignment=QtCore.Qt.AlignmentFlag.AlignLeft)
         # add citation
         citation = QtWidgets.QLabel('This feature is currently in <b>test phase</b>, feedback is very welcome!')
         citation.setOpenExternalLinks(True)
@@ -2879,12 +2907,9 @@ class MainWindow(QtWidgets.QMainWindow):
                               dEE=dEE,
                               deg=False)
         # calc visible extent
-        if self._tth is not None and not isinstance(self._tth, float):
-            max_res_r = np.nanmax(self._tth)
-            min_res_r = max(np.nanmin(self._tth), fwhm.mean()/10)
-        else:
-            max_res_r = self.calc_tth_max()
-            min_res_r = fwhm.mean()/10
+        extent = self.get_extent()
+        max_res_r = extent.tth_max
+        min_res_r = max(extent.tth_min, fwhm.mean()/10)
 
         # add beamstop shadow
         if self.geo.bssz and not (isinstance(self.geo.bssz, str) and self.geo.bssz.lower() == 'none'):
@@ -2933,6 +2958,96 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.pxrd_scatt_highlighted is not None:
             self.win_pxrd_highlight(self.pxrd_scatt_highlighted.index())
 
+        if self.pxrd_table.isVisible():
+            self.win_pxrd_table_update()
+
+    def win_pxrd_reflections(self):
+        """
+        Returns the reflections of the cif reference that are reachable at
+        the current energy as columns (dict of arrays): h, k, l, d-spacing [Å],
+        2-theta [°], relative intensity and the ring coverage of the detector
+        modules (see calc_ring_coverage). 'index' is the index of the reference
+        contour. None if the reference is not a cif.
+        """
+        if self.geo.reference not in self.ref_cif or not self.ref_cif[self.geo.reference].is_complete:
+            return None
+        ref = self.ref_cif[self.geo.reference]
+        dsp = np.asarray(ref.dsp, dtype=float)
+        peak_ttr, idx = self.dsp2tth(dsp)
+        hkl = np.array(ref.hkl)[idx]
+        return {'index':np.arange(len(dsp))[idx],
+                'h':hkl[:,0].astype(int),
+                'k':hkl[:,1].astype(int),
+                'l':hkl[:,2].astype(int),
+                'dsp':dsp[idx],
+                'tth':np.rad2deg(peak_ttr),
+                'irel':hkl[:,4],
+                'coverage':self.calc_ring_coverage(dsp)[idx]}
+
+    def win_pxrd_toggle_table(self, checked):
+        self.pxrd_table.setVisible(checked)
+        if checked:
+            self.win_pxrd_table_update()
+        self.pxrd_win.adjustSize()
+
+    def win_pxrd_table_update(self):
+        """
+        Fills the reflection table: hkl, d-spacing, position in the current
+        unit, relative intensity and the coverage of the rings. Reflections
+        that miss the modules are greyed out.
+        """
+        ref = self.win_pxrd_reflections()
+        if ref is None:
+            self.pxrd_table.setRowCount(0)
+            return
+        self.pxrd_table.setHorizontalHeaderLabels(['h k l', 'd [\u212B]', self.unit_names[self.geo.unit], 'I [%]', 'Coverage [%]'])
+        pos = self.calc_unit(np.deg2rad(ref['tth']))
+        self.pxrd_table.setRowCount(len(ref['dsp']))
+        for row in range(len(ref['dsp'])):
+            values = [f'{ref["h"][row]} {ref["k"][row]} {ref["l"][row]}', f'{ref["dsp"][row]:.4f}', f'{pos[row]:.3f}',
+                      f'{ref["irel"][row]*100:.1f}', f'{ref["coverage"][row]*100:.1f}']
+            for col, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                item.setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+                if ref['coverage'][row] == 0:
+                    item.setForeground(self.palette().placeholderText().color())
+                    item.setFlags(item.flags() & ~QtCore.Qt.ItemFlag.ItemIsSelectable)
+                self.pxrd_table.setItem(row, col, item)
+            # the reference contour, for highlighting
+            self.pxrd_table.item(row, 0).setData(QtCore.Qt.ItemDataRole.UserRole, int(ref['index'][row]))
+
+    def win_pxrd_table_clicked(self, row, col):
+        """
+        Highlights the contour of the reflection that was clicked,
+        a reflection without a drawn contour removes the highlight.
+        """
+        index = self.pxrd_table.item(row, 0).data(QtCore.Qt.ItemDataRole.UserRole)
+        if index is None or index >= len(self.patches['reference']):
+            return
+        if self.patches['reference'][index].isVisible():
+            self.patches['reference'][index].highlight()
+        else:
+            self.patches['reference'][index].lowlight()
+
+    def win_pxrd_export(self):
+        """
+        Exports the reflections and the coverage of their rings
+        (see win_pxrd_reflections) as comma separated values.
+        """
+        ref = self.win_pxrd_reflections()
+        if ref is None:
+            return
+        default_path = os.path.join(os.path.expanduser('~'), f'{os.path.splitext(self.geo.reference)[0]}_reflections.csv')
+        target, filter = QtWidgets.QFileDialog.getSaveFileName(self.pxrd_win, 'Export reflections', default_path, "Comma separated values (*.csv)")
+        if not target:
+            return
+        columns = ['h', 'k', 'l', 'dsp', 'tth', 'irel', 'coverage']
+        header = (f'# {self.geo.reference}, {self.geo.det_type} {self.geo.det_size}, ener={self.geo.ener} keV, dist={self.geo.dist} mm, '
+                  f'voff={self.geo.voff} mm, hoff={self.geo.hoff} mm, rota={self.geo.rota} deg, tilt={self.geo.tilt} deg, '
+                  f'bssz={self.geo.bssz} mm, bsdx={self.geo.bsdx} mm\n' + ','.join(columns))
+        np.savetxt(target, np.column_stack([ref[k] for k in columns]), delimiter=',',
+                   fmt=['%d', '%d', '%d', '%.6g', '%.6g', '%.6g', '%.4f'], header=header, comments='')
+
     def win_pxrd_hkl_clicked(self, widget, points, event):
         if not widget.name:
             return
@@ -3190,24 +3305,12 @@ class MainWindow(QtWidgets.QMainWindow):
         """
         # called when a cif is dropped onto the window
         self.xtl = dif.Crystal(fpath)
-        # :return xval: arrray : x-axis of powder scan (units)
-        # :return inten: array : intensity values at each point in x-axis
-        # :return reflections: (h, k, l, xval, intensity) array of reflection positions, grouped by min_overlap
-        xval, inten, reflections = self.xtl.Scatter.powder(scattering_type='xray', units='dspace', powder_average=True, min_overlap=0.02, energy_kev=self.plo.conic_ref_cif_kev)
-        # reject low intensities: based on median or mean?
-        # median is always around unity -> useless
-        # mean rejects many, add adjustable multiplicator?
-        used = reflections[reflections[:,4] > reflections[:,4].max() * self.plo.conic_ref_cif_int]
-        # sort by intensity -> ascending -> flip
-        ordered = used[used[:, 4].argsort()][::-1]
-        # pick the strongest
-        ordered = ordered[:self.plo.conic_ref_num]
-        # assign dspacing
-        self.cont_ref_dsp = ordered[:,3]
-        # hkl -> integer
-        # cast hkl array to list of tuples (for easy display)
-        irel = ordered[:,4]/ordered[:,4].max()
-        self.cont_ref_hkl = list(zip(ordered[:,0], ordered[:,1], ordered[:,2], ordered[:,4], irel))
+        # the strongest reflections, d-spacings and
+        # (h, k, l, intensity, relative intensity)
+        self.cont_ref_dsp, self.cont_ref_hkl = planner.cif_reflections(self.xtl,
+                                                                       self.plo.conic_ref_cif_kev,
+                                                                       self.plo.conic_ref_cif_int,
+                                                                       self.plo.conic_ref_num)
 
         self.geo.reference = os.path.basename(fpath)
         # update entry, might be incomplete (load on startup only has cif path)
@@ -3311,14 +3414,7 @@ class MainWindow(QtWidgets.QMainWindow):
                - 4: ptycho pixel size in nm
         """
         # calc_unit expects 2-Theta in radians
-
-        # Conversion factor keV to Angstrom: 12.398
-        # sin(t)/l: np.sin(Theta) / lambda -> (12.398/geo_energy)
-        stl = np.sin(tth/2)/(12.398/self.geo.ener)
-        # d-spacing: l = 2 d sin(t) -> 1/2(sin(t)/l)
-        dsp = 1/(2*stl)
-        units = {0:np.rad2deg(tth), 1:dsp, 2:stl*4*np.pi, 3:stl, 4: 0.5*0.1*dsp}
-        return units[self.geo.unit]
+        return geometry.calc_unit(tth, self.geo.ener, self.geo.unit)
 
     def calc_tth_max(self, scale=1.0):
         """
@@ -3331,30 +3427,64 @@ class MainWindow(QtWidgets.QMainWindow):
         -------
         float, maximum 2-theta in radians
         """
-        # make screen grid
-        size_h = np.array([-self.xdim, self.xdim])*scale
-        size_v = np.array([-self.ydim, self.ydim])*scale
-        _gx, _gy = np.meshgrid(size_h, size_v, sparse=True)
-        # build vector -> 3 x n x m
-        _vec = np.full((3, 2, 2), self.geo.dist)
-        _vec[0,:,:] = _gx - self.geo.hoff
-        # Compensate for vertical offset and PONI offset caused by the tilt (sdd*tilt)
-        _vec[1,:,:] = _gy + self.geo.voff - np.deg2rad(self.geo.tilt) * self.geo.dist
-        # apply combined rotation and tilt
-        _rot = self.rot_100(-np.deg2rad(self.geo.tilt + self.geo.rota))
-        # reshape to allow matrix multiplication
-        # _rot: 3 x 3 @ _norm: 3 x n*m -> _res: 3 x n x m
-        _res = np.reshape(_rot @ np.reshape(_vec, (3,-1)), _vec.shape)
-        # Distance POBI - pixel on grid
-        R_a = np.sqrt(np.sum(_res[0:2]**2, axis=0))
-        # POBI distance
-        D_a = _res[2]
-        # 2theta - Angle between pixel, sample, and POBI
-        tth = np.arctan2(R_a, D_a)
-        # 2theta max
-        return tth.max()
-
-    def calc_conic(self, omega, theta, steps=100):
+        return self.get_extent(scale=scale).tth_max
+
+    def get_extent(self, scale=1.0):
+        """
+        Returns the angular extent of the detector screen for the current
+        geometry: minimum/maximum 2-theta, the 2-theta angles of the corners
+        and the beamstop angle (see geometry.DetectorExtent).
+
+        The record is memoized per geometry, repeated calls (e.g. from
+        draw_conics, the pxrd window and the FWHM window) are free.
+
+        Parameters:
+        scale (float, optional): Scale applied to the screen dimensions, default 1.0.
+
+        Returns:
+        DetectorExtent: The shared (read-only) extent record.
+        """
+        return geometry.get_extent(float(self.xdim), float(self.ydim),
+                                   float(self.geo.dist), float(self.geo.voff), float(self.geo.hoff),
+                                   float(self.geo.rota), float(self.geo.tilt),
+                                   bssz=self.geo.bssz, bsdx=float(self.geo.bsdx), scale=scale)
+
+    def calc_ring_coverage(self, dsp=None):
+        """
+        Returns the fraction of every reference ring (dsp, default cont_ref_dsp) that lands
+        on the detector modules, the gaps, the central hole and the beamstop
+        are excluded (see geometry.ring_coverage).
+
+        Only the rings within the angular extent of the screen are sampled
+        (plo.pxrd_coverage_steps per ring), the others are not covered.
+        The result is memoized per geometry, detector and reference.
+
+        Parameters:
+        dsp (numpy.ndarray, optional): d-spacings [Å], default the reference (cont_ref_dsp).
+
+        Returns:
+        numpy.ndarray: coverage [0-1] per ring, None if there is no reference.
+        """
+        if dsp is None:
+            dsp = self.cont_ref_dsp
+        if dsp is None:
+            return None
+        dsp = np.asarray(dsp, dtype=float)
+        extent = self.get_extent()
+        cov = np.zeros(dsp.shape)
+        peak_ttr, idx = self.dsp2tth(dsp)
+        on_screen = (peak_ttr >= extent.tth_min) & (peak_ttr <= extent.tth_max) & (peak_ttr > extent.bs_theta)
+        idx = np.asarray(idx).ravel()[on_screen]
+        if len(idx) > 0:
+            _layout = tuple(getattr(self.det, k) for k in geometry.DET_LAYOUT)
+            cov[idx] = geometry.get_ring_coverage(tuple(dsp[idx]), float(self.geo.ener),
+                                                  float(-np.deg2rad(self.geo.tilt + self.geo.rota)),
+                                                  float(self.geo.dist), float(self.geo.voff), float(self.geo.hoff),
+                                                  float(self.geo.tilt), _layout, extent.bs_theta,
+                                                  int(self.plo.pxrd_coverage_steps))
+        return cov
+
+    def calc_conic(self, omega, theta, steps=100, clip=True):
         """
         Calculate the conic section formed by the intersection of a plane and a cone.
         This method computes the coordinates of the conic section (circle, ellipse, parabola, hyperbola, or line)
@@ -3363,6 +3493,10 @@ class MainWindow(QtWidgets.QMainWindow):
         omega (float): The angle of the cone's axis relative to the plane.
         theta (float): The angle of the intersecting plane.
         steps (int, optional): The number of steps for parameterization of the conic section. Default is 100.
+        clip (bool, optional): Only sample the visible part of the conic. Default is True.
+        If plo.conic_tolerance is larger than zero, the points are placed according to the
+        curvature of the conic (maximum deviation of plo.conic_tolerance pixel) and steps
+        is the maximum number of points.
         Returns:
         tuple: A tuple containing two arrays (x, y) representing the coordinates of the conic section.
                If the conic section is not visible, returns (False, False).
@@ -3370,7 +3504,8 @@ class MainWindow(QtWidgets.QMainWindow):
         - The method skips drawing smaller/larger ±90 degree contours and rejects overlap of the 'backscattering'.
         - The eccentricity of the resulting conic section is evaluated to parameterize the conic accordingly.
         - The method handles circles, ellipses, parabolas, hyperbolas, and lines based on the eccentricity value.
-        - For ellipses and hyperbolas, the method checks if the conic section is visible within the given dimensions.
+        - The parameter intervals inside the visible area are calculated analytically and only those
+          are sampled, disjoint parts are separated by NaN (see geometry.calc_conic).
         References:
         - https://math.stackexchange.com/questions/4079720/on-the-equation-of-the-ellipse-formed-by-intersecting-a-plane-and-cone
         - https://www.geogebra.org/
@@ -3386,100 +3521,10 @@ class MainWindow(QtWidgets.QMainWindow):
         # and parabola and here only 3d-drawing the
         # problem in geogebra made me understand what's
         # going on: https://www.geogebra.org/
-        # 
-        # skip drawing smaller/larger +-90 deg contours
-        # reject overlap of the 'backscattering'
-        # -> limitation of the current implementation
-        if theta > np.pi/2 + abs(omega):
-            return False, False
-
-        # y axis offset of the cone center
-        dy_cone = self.geo.dist * np.tan(omega)
-        # change in 'r', the length of the cones primary axis
-        dz_cone = np.sqrt(self.geo.dist**2 + dy_cone**2)
-        # tilt is handled as a rotation but
-        # has its travel distance (y) reset.
-        comp_tilt = np.deg2rad(self.geo.tilt) * self.geo.dist
-        # eccentricity of the resulting conic section
-        ecc = np.round(np.cos(np.pi/2 - omega) / np.cos(theta), 10)
-        # y ('height') components/distances from central axis of the cone
-        # intersecting the detector plane and the distance to
-        # the y intersection of the conic section.
-        y1 = dz_cone * np.sin(theta) / np.cos(omega + theta)
-        y2 = dz_cone * np.sin(theta) / np.cos(omega - theta)
-
-        # add x/y offsets
-        # revert tilt rotation
-        y0 = dy_cone - self.geo.voff + comp_tilt 
-        x0 = self.geo.hoff
-
-        # add margin to slightly extend
-        # conics outside of visible area
-        _xdim = self.xdim * 1.05
-        #_ydim = self.ydim * 1.05
-        # evaluate the eccentricity and parameterise
-        # the resulting conic accordingly
-        if abs(ecc) == 0:
-            # circle
-            h = (y1+y2)/2
-            # check if the circle is visible
-            if h - np.sqrt(y0**2 + x0**2) > np.sqrt(self.ydim**2 + self.xdim**2):
-                return False, False
-            t = np.linspace(0, 2*np.pi, 2*steps)
-            x = x0 + h * np.sin(t)
-            y = y0 + (y1-y2)/2 + h * np.cos(t)
-        elif 0 < abs(ecc) < 1:
-            # ellipse
-            yd = (y1-y2)/2
-            h = (y1+y2)/2
-            w = dz_cone * np.sin(theta) * (y1+y2) / (2 * np.sqrt(y1*y2) * np.cos(theta))
-            # ellipses that expand ouside the visible area:
-            # add a margin to make sure the connecting line
-            # of segmented ellipses is outside the visible area
-            #
-            # I hope this is faster than generating and handing
-            # over a 'connect' array to the setData function
-            # of the plotItem
-            _xlim1 = (_xdim + x0) / w
-            _xlim2 = (_xdim - x0) / w
-            # check if the ellipse is visible
-            if _xlim1 < 0 and _xlim2 < 0:
-                return False, False
-            if _xlim1 < 1 and _xlim2 < 1:
-                l = -np.arcsin(_xlim1)
-                r =  np.arcsin(_xlim2)
-                t = np.hstack([np.linspace(l, r, steps), np.linspace(-r+np.pi, -l+np.pi, steps)])
-            else:
-                t = np.linspace(0, 2*np.pi, 2*steps)
-            x = x0 + w * np.sin(t)
-            y = y0 + yd + h * np.cos(t)
-        elif abs(ecc) == 1:
-            # parabola
-            yd = np.sign(ecc) * self.geo.dist * np.tan(abs(omega) - theta)
-            a = np.sign(ecc) * self.geo.dist * np.tan(theta)
-            l = -(_xdim + x0) / a
-            r =  (_xdim - x0) / a
-            t = np.linspace(l, r, steps)
-            x = x0 + a*t
-            y = y0 - dy_cone + yd + a/2 * t**2
-        elif 1 < abs(ecc) < 100:
-            # hyperbola
-            h = np.sign(omega) * (y1+y2)/2
-            if h == 0:
-                return False, False
-            w = h * np.sqrt(ecc**2-1)
-            l = -np.arcsinh((_xdim + x0) / w)
-            r =  np.arcsinh((_xdim - x0) / w)
-            t = np.linspace(l, r, steps)
-            x = x0 + w * np.sinh(t)
-            y = y0 + (y1-y2)/2 - h * np.cosh(t)
-        elif abs(ecc) >= 100:
-            # line
-            t = np.linspace(-_xdim, _xdim, steps)
-            x = t
-            y = y0 + np.ones(len(t)) * y1
-        
-        return x, y
+        # tolerance: pixel -> mm
+        tol = self.plo.conic_tolerance * 2 * self.ydim / self.plo.plot_size
+        return geometry.calc_conic(omega, theta, self.geo.dist, self.geo.voff, self.geo.hoff, self.geo.tilt,
+                                   self.xdim, self.ydim, steps=steps, clip=clip, tol=tol)
     
     def calc_overlays(self, omega, res=150, pol=0.99):
         """
@@ -3507,102 +3552,59 @@ class MainWindow(QtWidgets.QMainWindow):
             - fwhm : ndarray
                 The full width at half maximum (FWHM) for the detector.
         """
-        # scale overlay to detector dimensions
-        if res is not None and res > 0:
-            _res_scale = self.ydim/self.xdim
-            _res_v = int(round(_res_scale * res, 0))
-        else:
-            res    = (self.det.hmp * self.det.hmn + self.det.hgp * (self.det.hmn-1) + self.det.cbh)
-            _res_v = (self.det.vmp * self.det.vmn + self.det.vgp * (self.det.vmn-1) + self.det.cbh)
-
-        # neutral overlay grid
-        grd = np.ones((_res_v, res))
-
-        # make screen grid
-        size_h = np.linspace(-self.xdim, self.xdim, res, endpoint=False)
-        size_v = np.linspace(-self.ydim, self.ydim, _res_v, endpoint=False)
-        _gx, _gy = np.meshgrid(size_h, size_v, sparse=True)
-        # build vector -> 3 x n x m
-        _vec = np.full((3, _res_v, res), self.geo.dist)
-        _vec[0,:,:] = _gx - self.geo.hoff
-        # Compensate for vertical offset and PONI offset caused by the tilt (sdd*tilt)
-        _vec[1,:,:] = _gy + self.geo.voff - np.deg2rad(self.geo.tilt) * self.geo.dist
-
-        # omega is the combination of rotation and tilt, in radians
-        _rot = self.rot_100(omega)
-        # reshape to allow matrix multiplication
-        # _rot: 3 x 3 @ _norm: 3 x n*m -> _res: 3 x n x m
-        _res = np.reshape(_rot @ np.reshape(_vec, (3,-1)), _vec.shape)
+        return geometry.calc_overlays(**self.overlay_params(omega, res=res, pol=pol))
 
-        # unit hover
-        tth = 1.0
-        azi = None
-        if self.plo.show_unit_hover:
-            # Distance POBI - pixel on grid
-            R_a = np.sqrt(np.sum(_res[0:2]**2, axis=0)) * 1e-3 # m
-            # POBI distance
-            D_a = _res[2] * 1e-3 # m
-            # 2theta - Angle between pixel, sample, and POBI
-            tth = np.arctan2(R_a, D_a)
-            # remove very small values (tth < 0.057 deg) to avoid zero divide
-            tth[tth < 1e-3] = np.nan
-            if self.plo.show_grid:
-                # calculate the azimuthal angle eta
-                azi = -np.arctan2(_res[0], _res[1])
-
-        # polarisation
-        pc = 1.0
-        if self.plo.show_polarisation:
-            _mag = np.sqrt(np.sum(_res**2, axis=0))
-            _norm = _res / _mag
-            # add pol fractions (-> 1.0)
-            # this notation is equivalent to cos(psi)**2,
-            # psi angle of polarization direction to the observer
-            # _res is direct cos(psi)
-            pc_hor = _norm[0,:,:]**2 * pol
-            pc_ver = _norm[1,:,:]**2 * (1-pol)
-            pc = 1.0 - (pc_hor + pc_ver)
-
-        # solid angle
-        sa = 1.0
-        if self.plo.show_solidangle:
-            _mag = np.sqrt(np.sum(_vec**2, axis=0))
-            sa = 1 / _mag**3
-            sa = sa / np.max(sa)
-        
-        # delta d / d
-        fwhm = 1.0
-        #fwhm_width = 0.0
+    def overlay_params(self, omega, res=150, pol=0.99):
+        """
+        Collects the parameters for geometry.calc_overlays from the
+        current geometry, detector and plot settings.
+        A res of None or 0 uses the detector pixel dimensions.
+        """
+        fwhm = None
         if self.plo.show_fwhm:
-            # dia: sample scattering diameter
-            dia = self.plo.scattering_diameter
-            # thk: detector sensor thickness
-            thk = self.plo.sensor_thickness
-            # mat: detector sensor material
-            mat = self.plo.sensor_material
-            # nrg: X-ray energy
-            nrg = self.geo.ener
-            # pxs: detector pixel size
-            pxs = self.det.pxs * 1e-3
-            # div: X-ray beam divergence
-            div = self.plo.beam_divergence
-            # dEE: X-ray energy resolution
-            dEE = self.plo.energy_resolution
-            # use the "unrotated" vector coordinates to define
-            # R and D in the detector plane
-            # radial component of the unrotated detector
-            # i.e. radius away from the PONI
-            r = np.sqrt(np.sum(_vec[0:2]**2, axis=0)) * 1e-3 # m
-            # dis: PONI distance
-            dis = self.geo.dist * 1e-3 # m
-            # 2theta-alpha - Angle between pixel, sample, and PONI
-            tth_a = np.arctan2(r, dis)
-            # remove very small values (tth < 0.057 deg) to avoid zero divide
-            tth_a[tth_a < 1e-3] = np.nan
-            # H2, FWHM
-            fwhm = self.calc_FWHM(dis, dia, thk, mat, pxs, tth_a, nrg, div, dEE)
-
-        return grd, tth, azi, pc, sa, fwhm
+            fwhm = {'dia':self.plo.scattering_diameter,
+                    'thk':self.plo.sensor_thickness,
+                    'mat':self.plo.sensor_material,
+                    'pxs':self.det.pxs * 1e-3,
+                    'ener':self.geo.ener,
+                    'div':self.plo.beam_divergence,
+                    'dEE':self.plo.energy_resolution}
+        return {'omega':omega,
+                'xdim':self.xdim,
+                'ydim':self.ydim,
+                'dist':self.geo.dist,
+                'voff':self.geo.voff,
+                'hoff':self.geo.hoff,
+                'tilt':self.geo.tilt,
+                'shape':geometry.overlay_shape(self.xdim, self.ydim, res, self.det),
+                'pol':pol,
+                'show_tth':self.plo.show_unit_hover,
+                'show_azi':self.plo.show_unit_hover and self.plo.show_grid,
+                'show_pol':self.plo.show_polarisation,
+                'show_sa':self.plo.show_solidangle,
+                'fwhm':fwhm,
+                'workers':self.plo.overlay_workers}
+
+    def overlay_swap(self, generation, result, buf):
+        """
+        Displays a calculated overlay (see OverlayWorker) and
+        returns the buffers of the previous overlay to the worker.
+        """
+        _grd, self._tth, self._azi, self._polcor, self._solang, self._fwhm = result['maps']
+        # the hover maps are rebuilt on demand
+        self.hover_maps = None
+        self.patches['overlay'].setImage(result['img'],
+                                         autoLevels=False,
+                                         levels=[0.0,1.0],
+                                         rect=(-result['xdim'],
+                                               -result['ydim'],
+                                                result['xdim'] * 2,
+                                                result['ydim'] * 2))
+        self.overlay_worker.release(self.overlay_buf)
+        self.overlay_buf = buf
+        if buf is not None:
+            # calculated in the background
+            self.profiler.record('overlay_worker', *result['time'])
 
     def calc_azi_grid(self, omega):
         """calculate the azimuthal grid points and return a dictionary with the vectors"""
@@ -3664,96 +3666,16 @@ class MainWindow(QtWidgets.QMainWindow):
         -------
           np.arr, np.arr: tth values, valid indices
         """
-        lambda_2d = (12.398/self.geo.ener) / (2*np.atleast_1d(dsp))
-        idx = np.nonzero(lambda_2d < 1)
-        tth = 2 * np.arcsin(lambda_2d[idx])
-        return tth, idx
+        return geometry.dsp2tth(dsp, self.geo.ener)
 
     #################
     #    UTILITY    #
     #  INDEPENDENT  #
     #################
     def get_att_lengths(self):
-        # X-ray attenuation lengths z for Si and CdTe in meter [m] where z = ln(1/e)/mu
-        # calculated in 1 keV steps from 1-150 keV
-        # table values from Chantler (2000) https://doi.org/10.1063/1.1321055
-        # calculated using the xraydb python module https://xraypy.github.io/XrayDB/
-        self.att_lengths = {'Si':[2.92336338e-06, 1.52940940e-06, 4.41817449e-06, 9.68094927e-06,
-                                  1.81408951e-05, 3.02711037e-05, 4.66249577e-05, 6.77473199e-05,
-                                  9.52638566e-05, 1.30549774e-04, 1.73447018e-04, 2.24595659e-04,
-                                  2.84605387e-04, 3.54031165e-04, 4.33380209e-04, 5.23140541e-04,
-                                  6.23712068e-04, 7.35455743e-04, 8.58680607e-04, 9.93585970e-04,
-                                  1.14037836e-03, 1.29916870e-03, 1.46997950e-03, 1.65282867e-03,
-                                  1.84755219e-03, 2.05413078e-03, 2.27435657e-03, 2.51166980e-03,
-                                  2.76076718e-03, 3.02154479e-03, 3.29339416e-03, 3.57595496e-03,
-                                  3.86839569e-03, 4.17070154e-03, 4.48147168e-03, 4.80065791e-03,
-                                  5.12767462e-03, 5.46137164e-03, 5.80102998e-03, 6.15160747e-03,
-                                  6.50892811e-03, 6.87076056e-03, 7.23575505e-03, 7.60377581e-03,
-                                  7.97432820e-03, 8.34584473e-03, 8.71928990e-03, 9.09192353e-03,
-                                  9.46569452e-03, 9.83772142e-03, 1.02072666e-02, 1.05776192e-02,
-                                  1.09433726e-02, 1.13091543e-02, 1.16704952e-02, 1.20265003e-02,
-                                  1.23811631e-02, 1.27324096e-02, 1.30769437e-02, 1.34176491e-02,
-                                  1.37548957e-02, 1.40888666e-02, 1.44155703e-02, 1.47396457e-02,
-                                  1.50576116e-02, 1.53688649e-02, 1.56783348e-02, 1.59792892e-02,
-                                  1.62758741e-02, 1.65681895e-02, 1.68560238e-02, 1.71398554e-02,
-                                  1.74122248e-02, 1.76875177e-02, 1.79512540e-02, 1.82145339e-02,
-                                  1.84671438e-02, 1.87236452e-02, 1.89677703e-02, 1.92079643e-02,
-                                  1.94519568e-02, 1.96857927e-02, 1.99143713e-02, 2.01393629e-02,
-                                  2.03608585e-02, 2.05788754e-02, 2.07833706e-02, 2.09941098e-02,
-                                  2.12017351e-02, 2.14014048e-02, 2.15968609e-02, 2.17951736e-02,
-                                  2.19821326e-02, 2.21717840e-02, 2.23511828e-02, 2.25366433e-02,
-                                  2.27091166e-02, 2.28903416e-02, 2.30570644e-02, 2.32331077e-02,
-                                  2.33946370e-02, 2.35541564e-02, 2.37235475e-02, 2.38780490e-02,
-                                  2.40302885e-02, 2.41803970e-02, 2.43399625e-02, 2.44882422e-02,
-                                  2.46323882e-02, 2.47746094e-02, 2.49149003e-02, 2.50533840e-02,
-                                  2.51901681e-02, 2.53252522e-02, 2.54586507e-02, 2.55903974e-02,
-                                  2.57204103e-02, 2.58490340e-02, 2.59762024e-02, 2.61018936e-02,
-                                  2.62261777e-02, 2.63492097e-02, 2.64707961e-02, 2.65910939e-02,
-                                  2.67101422e-02, 2.68280390e-02, 2.69448830e-02, 2.70602934e-02,
-                                  2.71637201e-02, 2.72706288e-02, 2.73828591e-02, 2.74939145e-02,
-                                  2.76039513e-02, 2.77130685e-02, 2.78212863e-02, 2.79285825e-02,
-                                  2.80224089e-02, 2.81218802e-02, 2.82264203e-02, 2.83300579e-02,
-                                  2.84220811e-02, 2.85159760e-02, 2.86172018e-02, 2.87175212e-02,
-                                  2.88171887e-02, 2.89147878e-02, 2.89995540e-02, 2.90922933e-02,
-                                  2.91891453e-02, 2.92852862e-02],
-                          'CdTe':[8.86140064e-08, 4.41597213e-07, 1.15951587e-06, 8.36374589e-07,
-                                  8.36034310e-07, 1.32724815e-06, 1.97362567e-06, 2.79221097e-06,
-                                  3.79736962e-06, 5.07172559e-06, 6.58646052e-06, 8.34536221e-06,
-                                  1.03633319e-05, 1.26445947e-05, 1.51992203e-05, 1.80585164e-05,
-                                  2.12380712e-05, 2.47559111e-05, 2.86220163e-05, 3.28393095e-05,
-                                  3.74211141e-05, 4.23847110e-05, 4.77396937e-05, 5.34604046e-05,
-                                  5.95357580e-05, 6.58583493e-05, 2.02635396e-05, 2.23180704e-05,
-                                  2.45073128e-05, 2.68096054e-05, 2.92163420e-05, 1.99269432e-05,
-                                  2.15332477e-05, 2.32726190e-05, 2.51068287e-05, 2.70499442e-05,
-                                  2.90850735e-05, 3.12143579e-05, 3.34390888e-05, 3.57606328e-05,
-                                  3.81810110e-05, 4.07109020e-05, 4.33566740e-05, 4.61081874e-05,
-                                  4.89663832e-05, 5.19342068e-05, 5.50092594e-05, 5.81952784e-05,
-                                  6.14950533e-05, 6.49069814e-05, 6.84326118e-05, 7.20745366e-05,
-                                  7.58320671e-05, 7.97392476e-05, 8.37930712e-05, 8.79696403e-05,
-                                  9.22722203e-05, 9.66991799e-05, 1.01254296e-04, 1.05935695e-04,
-                                  1.10745003e-04, 1.15686534e-04, 1.20756232e-04, 1.25977939e-04,
-                                  1.31365089e-04, 1.36890012e-04, 1.42551567e-04, 1.48351972e-04,
-                                  1.54290824e-04, 1.60366939e-04, 1.66584684e-04, 1.72943591e-04,
-                                  1.79440083e-04, 1.86083525e-04, 1.92866175e-04, 1.99789869e-04,
-                                  2.06859516e-04, 2.14074597e-04, 2.21432043e-04, 2.28971821e-04,
-                                  2.36785318e-04, 2.44789163e-04, 2.52956288e-04, 2.61270529e-04,
-                                  2.69748772e-04, 2.78374465e-04, 2.87160014e-04, 2.96098601e-04,
-                                  3.05197594e-04, 3.14457023e-04, 3.23869498e-04, 3.33440320e-04,
-                                  3.43178015e-04, 3.53053462e-04, 3.63091886e-04, 3.73283283e-04,
-                                  3.83651351e-04, 3.94156444e-04, 4.04836771e-04, 4.15653703e-04,
-                                  4.26625960e-04, 4.37759844e-04, 4.49053794e-04, 4.60495597e-04,
-                                  4.72077099e-04, 4.83837118e-04, 4.95744109e-04, 5.07781340e-04,
-                                  5.19964672e-04, 5.32316813e-04, 5.44823489e-04, 5.57483665e-04,
-                                  5.70297686e-04, 5.83249863e-04, 5.96338131e-04, 6.09594120e-04,
-                                  6.23013435e-04, 6.36594830e-04, 6.50297249e-04, 6.64142222e-04,
-                                  6.78147980e-04, 6.92282395e-04, 7.06561344e-04, 7.20987946e-04,
-                                  7.35548731e-04, 7.50255560e-04, 7.65122247e-04, 7.80063756e-04,
-                                  7.95147555e-04, 8.10396744e-04, 8.25793330e-04, 8.41276246e-04,
-                                  8.56872987e-04, 8.72612687e-04, 8.88496254e-04, 9.04519016e-04,
-                                  9.20619462e-04, 9.36881518e-04, 9.53292628e-04, 9.69782092e-04,
-                                  9.86397315e-04, 1.00312754e-03, 1.01996070e-03, 1.03689757e-03,
-                                  1.05395590e-03, 1.07113920e-03, 1.08845123e-03, 1.10583974e-03,
-                                  1.12333211e-03, 1.14094222e-03]}
+        # X-ray attenuation lengths z for Si and CdTe in meter [m]
+        # table values from Chantler (2000), see geometry.py
+        self.att_lengths = geometry.ATT_LENGTHS
 
     def rot_100(self, a, cc=1):
         """
@@ -3766,13 +3688,7 @@ class MainWindow(QtWidgets.QMainWindow):
         Returns:
         numpy.ndarray: A 3x3 rotation matrix.
         """
-        #Omega in radians
-        ca = np.cos(a)
-        sa = np.sin(a)
-        if cc: sa = -sa
-        return np.array([[1,   0,  0],
-                         [0,  ca, sa],
-                         [0, -sa, ca]])
+        return geometry.rot_100(a, cc=cc)
 
     def calc_hkld(self, ucp, res=0.2e-10, dec=4, cen='P'):
         """
@@ -3948,19 +3864,7 @@ class MainWindow(QtWidgets.QMainWindow):
             -------
             array: fwhm
             """
-            if len(self.att_lengths[mat]) > int(nrg):
-                thk = min(thk, self.att_lengths[mat][int(nrg)])
-            A = 2*np.log(2) / dis**2 * (pxs**2-2*thk**2-dia**2)
-            B = 2*np.log(2) / dis**2 * (2*thk**2 + 2*dia**2)
-            C = 2*np.log(2) * div**2
-            M = (4*np.sqrt(2*np.log(2)) * dEE)**2 * ((1-np.cos(tth))/(1+np.cos(tth)))
-            X = np.cos(tth)
-            H2 = A*X**4 + B*X**2 + C + M
-            fwhm = np.sqrt(H2)
-            if deg is True:
-                return fwhm * 180 / np.pi
-            else:
-                return fwhm
+            return geometry.calc_FWHM(dis, dia, thk, mat, pxs, tth, nrg, div, dEE, deg=deg)
 
     def gaussian(self, x, m, s):
         """
@@ -4148,40 +4052,18 @@ class MainWindow(QtWidgets.QMainWindow):
 
         Notes:
         ------
-        - The method uses two dictionaries, `_warn` and `_force`, to manage parameter constraints:
-            - `_warn` contains parameters with their allowed minimum, maximum, and default values.
-            - `_force` contains parameters that should be set to specific values regardless of the file content.
-        - If a parameter value is outside the allowed range specified in `_warn`, it is set to the default value,
+        - The method uses two dictionaries, `SETTINGS_WARN` and `SETTINGS_FORCE` (defaults.py), to manage parameter constraints:
+            - `SETTINGS_WARN` contains parameters with their allowed minimum, maximum, and default values.
+            - `SETTINGS_FORCE` contains parameters that should be set to specific values regardless of the file content.
+        - If a parameter value is outside the allowed range specified in `SETTINGS_WARN`, it is set to the default value,
           and a warning message is printed.
-        - If a parameter is in `_force`, it is set to the enforced value.
+        - If a parameter is in `SETTINGS_FORCE`, it is set to the enforced value.
         - The method updates the attributes of `self.geo`, `self.plo`, `self.thm`, and `self.lmt` based on the
           contents of the JSON file.
         - If 'geo' is not in the `skip` list, the initial values of `self.geo` are stored in `self._geo`.
         """
-        # Some parameters need to be protected to save
-        # the user some waiting time
-        #
-        # A check is performed if the value of the key
-        # is within 'minimum' and 'maximum', if not it
-        # is set to 'default'
-        #
-        # Add 'key':('minimum', 'maximum', 'default') to the dict
-        _warn = {'conic_ref_cif_kev':( 5,   25,  12),
-                    #'conic_tth_min':( 1,   10,   5),
-                    #'conic_tth_max':(10,  180,  90),
-                    #'conic_tth_num':( 1,  100,  20),
-                    #'conic_ref_num':( 1,  500, 200),
-                    'conic_steps':(10, 1000, 100),
-                        'ener_stp':( 1,  100,   1),
-                        'dist_stp':( 1,  100,   1),
-                        'hoff_stp':( 1,  100,   1),
-                        'voff_stp':( 1,  100,   1),
-                        'rota_stp':( 1,  100,   1),
-                        'tilt_stp':( 1,  100,   1),
-                        'bsdx_stp':( 1,  100,   1),
-                }
-        # Add 'key':'val to the dict to enforce 'key' to be set to 'val'
-        _force = {'show_fwhm':False}
+        # parameters outside of their allowed range (defaults.SETTINGS_WARN)
+        # are reset, parameters in defaults.SETTINGS_FORCE are enforced
         # Opening JSON file as dict
         try:
             with open(self.path_settings_current, 'r') as of:
@@ -4190,23 +4072,7 @@ class MainWindow(QtWidgets.QMainWindow):
             print(f"Error parsing settings file at: {self.path_settings_current}")
             raise SystemExit
         conv = {'geo':self.geo, 'plo':self.plo, 'thm':self.thm, 'lmt':self.lmt}
-        for key, vals in pars.items():
-            if key in skip:
-                continue
-            for p, x in vals.items():
-                if p in conv[key].__dict__.keys():
-                    # make sure the strings are in order.
-                    # this is bad!
-                    if isinstance(x, str) and x.lower() == 'none':
-                        x = 'None'
-                    if p in _warn and x not in range(_warn[p][0], _warn[p][1]+1):
-                            print(f'WARNING: {p} set to {x}!\nAllowed values are within {_warn[p][0], _warn[p][1]}, parameter set to {_warn[p][2]}.')
-                            x = _warn[p][2]
-                    if p in _force:
-                        x = _force[p]
-                    setattr(conv[key], p, x)
-                else:
-                    print(f'WARNING: "{p}" is not a valid key!')
+        defaults.apply_settings(pars, conv, skip)
         if 'geo' not in skip:
             # store the initial values of geo
             self._geo.__dict__.update(self.geo.__dict__)
@@ -4302,6 +4168,8 @@ class MainWindow(QtWidgets.QMainWindow):
         ###############################
         self.geo.det_bank = {}
         ###############################
+        # the source might change
+        self.follow_stop()
         self.settings_load_from_file()
         # missing entries in the
         # settings file will be added
@@ -4402,15 +4270,19 @@ class MainWindow(QtWidgets.QMainWindow):
         Args:
             event (QCloseEvent): The close event triggered when the window is closed.
         """
+        self.follow_stop()
+        # don't leave a running overlay behind
+        self.overlay_worker.cancel()
+        self.overlay_worker.pool.waitForDone()
         self.settings_set_active()
         event.accept()
 
     def hoverEvent(self, event):
         """
         Handles hover events linked to the cormap and updates labels accordingly.
-        This method is triggered when a hover event occurs and updates the 
-        `cor_label` and `unit_label` based on the event's position and the 
-        current state of the map overlays.
+        This method is triggered when a hover event occurs, it only stores the
+        position and starts the hover timer, the labels are updated by
+        hover_label_update() at most once per screen refresh.
         Parameters:
         event (QHoverEvent): The hover event containing information about the 
                              cursor's position and state.
@@ -4418,13 +4290,13 @@ class MainWindow(QtWidgets.QMainWindow):
         - Hides `cor_label` and updates `unit_label` when the cursor exits the area.
         - Shows `cor_label` when the cursor enters the area and any of the map 
           overlays are active.
-        - Updates `unit_label` with the calculated unit value if `_tth` is not a float.
-        - Updates `cor_label` with the correction values from `_polcor`, `_solang`, 
-          and `_fwhm` if they are not floats.
         """
         # Hover event linked to cormap and should only be active while
         # either or both maps are displayed
         if event.isExit():
+            self.hover_timer.stop()
+            self.hover_pos = None
+            self.hover_text = None
             self.cor_label.hide()
             self.unit_label.setText(f'{self.unit_names[self.geo.unit]}')
             return
@@ -4435,40 +4307,69 @@ class MainWindow(QtWidgets.QMainWindow):
         if event.isEnter() and (self.action_funct_fwhm_show.isChecked() or self.action_show_ang.isChecked() or self.action_show_pol.isChecked()):
             self.cor_label.show()
 
-        # cormap displays the product of both corrections
-        # but the individual values can be retrieves from their arrays
-        # -> _polcor and _solang
-        y, x = map(int, np.clip(event.pos(), [0,0], np.array(self.patches['overlay'].image.shape)[::-1]-1))
+        # image row, column
+        pos = event.pos()
+        self.hover_pos = (int(pos.y()), int(pos.x()))
+        if not self.hover_timer.isActive():
+            self.hover_timer.start()
 
-        # unit label value
-        if not isinstance(self._tth, float):
-            unit = self.calc_unit(self._tth[x,y])
-            if self.plo.show_grid:
-                self.unit_label.setText(f'{self.unit_names[self.geo.unit]} {unit:.2f}\nazi [\u00B0] {self._azi[x,y]*180/np.pi:.0f}')
-            else:
-                self.unit_label.setText(f'{self.unit_names[self.geo.unit]} {unit:.2f}')
-        
-        _text = []
+    def hover_maps_build(self):
+        """
+        Precomputes the maps shown by the hover labels, called once
+        after each overlay update (lazily, on the first hover).
+
+        self.hover_maps:
+        - 'unit': the 2-theta map converted to the current unit
+        - 'azi': the azimuthal angle in degrees (if the grid is shown)
+        - 'cor': list of (format, map) for the correction label
+        """
+        self.hover_maps = {'unit':None, 'azi':None, 'cor':[]}
+        if self._tth is not None and not isinstance(self._tth, float):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.hover_maps['unit'] = self.calc_unit(self._tth)
+            if self.plo.show_grid and self._azi is not None:
+                self.hover_maps['azi'] = np.rad2deg(self._azi)
         # calc_overlays returns either a np.array (if active)
         # or a float (inactive) for _polcor and _solang. 
         if not isinstance(self._polcor, float):
-            _text.append(f'P: {self._polcor[x,y]:.2f}')
+            self.hover_maps['cor'].append(('P: {:.2f}', self._polcor))
         if not isinstance(self._solang, float):
-            _text.append(f'S: {self._solang[x,y]:.2f}')
+            self.hover_maps['cor'].append(('S: {:.2f}', self._solang))
         if not isinstance(self._fwhm, float):
-            _text.append(f'H: {self._fwhm[x,y]:.4f}\u00B0')
-            #_text.append(f'H: {self.calc_unit(self._fwhm[x,y]):.4f}')
-        self.cor_label.setText('\n'.join(_text))
+            self.hover_maps['cor'].append(('H: {:.4f}\u00B0', self._fwhm))
+
+    def hover_label_update(self):
+        """
+        Updates `unit_label` and `cor_label` for the last hover position,
+        using integer index lookups into the precomputed hover maps.
+        The labels are only touched if their text changed.
+        """
+        if self.hover_pos is None or self.patches['overlay'].image is None:
+            return
+        if self.hover_maps is None:
+            self.hover_maps_build()
+        rows, cols = self.patches['overlay'].image.shape[:2]
+        x = min(max(self.hover_pos[0], 0), rows-1)
+        y = min(max(self.hover_pos[1], 0), cols-1)
+
+        # unit label value
+        unit_text = None
+        if self.hover_maps['unit'] is not None:
+            unit_text = f'{self.unit_names[self.geo.unit]} {self.hover_maps["unit"][x,y]:.2f}'
+            if self.hover_maps['azi'] is not None:
+                unit_text += f'\nazi [\u00B0] {self.hover_maps["azi"][x,y]:.0f}'
+        cor_text = '\n'.join([fmt.format(arr[x,y]) for fmt, arr in self.hover_maps['cor']])
+
+        _old_unit, _old_cor = self.hover_text if self.hover_text is not None else (None, None)
+        if unit_text is not None and unit_text != _old_unit:
+            self.unit_label.setText(unit_text)
+        if cor_text != _old_cor:
+            self.cor_label.setText(cor_text)
+        self.hover_text = (unit_text, cor_text)
 
 ############
 #   MISC   #
 ############
-class Container(object):
-    """
-    A class used to represent a Container.
-    """
-    pass
-
 class Ref(object):
     """
     Ref is a class that represents a reference object with attributes for name, dsp, hkl, and cif.
@@ -4589,6 +4490,119 @@ class Ref(object):
         """
         return np.all([self.has_cif, self.has_dsp, self.has_hkl])
 
+class OverlayJob(QtCore.QRunnable):
+    """
+    Calculates an overlay in a thread of the OverlayWorker pool.
+    """
+    def __init__(self, worker, generation, pars, buf):
+        super().__init__()
+        self.worker = worker
+        self.generation = generation
+        self.pars = pars
+        self.buf = buf
+
+    def run(self):
+        result = OverlayWorker.calculate(self.pars, self.buf)
+        # queued to the thread of the worker (GUI)
+        try:
+            self.worker.sigDone.emit(self.generation, result, self.buf)
+        except RuntimeError:
+            # the worker was deleted (shutdown), drop the result
+            pass
+
+class OverlayWorker(QtCore.QObject):
+    """
+    Calculates the overlays off the GUI thread.
+
+    Every request (submit) increments the generation counter. Only one
+    calculation runs at a time, requests that arrive while busy replace
+    each other and only the latest is started once the running one is
+    done. Results of requests made before the last cancel() are stale
+    and dropped, all others are passed on (sigResult) in order.
+    The arrays are calculated in-place into re-used buffer sets, a set
+    is handed to the receiver together with the result and must be
+    returned (release) once it is no longer displayed.
+    """
+    # generation, result, buffer set
+    sigResult = QtCore.pyqtSignal(int, object, object)
+    sigDone = QtCore.pyqtSignal(int, object, object)
+
+    def __init__(self, parent=None, max_free=2):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.generation = 0
+        # results of generations below are dropped
+        self.valid = 0
+        self.pending = None
+        self.busy = False
+        # free buffer sets
+        self.buffers = []
+        self.max_free = max_free
+        self.sigDone.connect(self.done)
+
+    @staticmethod
+    def calculate(pars, buf=None):
+        """
+        Calculates the overlay maps and image (geometry.calc_overlays).
+        """
+        start = time.perf_counter()
+        maps = geometry.calc_overlays(**pars, buf=buf)
+        img = geometry.overlay_image(maps[0], maps[3], maps[4], buf=buf)
+        return {'maps':maps, 'img':img, 'xdim':pars['xdim'], 'ydim':pars['ydim'],
+                'time':(start, time.perf_counter() - start)}
+
+    def submit(self, pars):
+        """
+        Requests a new overlay, returns the generation of the request.
+        """
+        self.generation += 1
+        if self.busy:
+            self.pending = (self.generation, pars)
+        else:
+            self.start(self.generation, pars)
+        return self.generation
+
+    def start(self, generation, pars):
+        buf = self.buffers.pop() if len(self.buffers) > 0 else {}
+        self.busy = True
+        self.pool.start(OverlayJob(self, generation, pars, buf))
+
+    def done(self, generation, result, buf):
+        self.busy = False
+        if self.pending is not None:
+            self.start(*self.pending)
+            self.pending = None
+        if generation >= self.valid:
+            self.sigResult.emit(generation, result, buf)
+        else:
+            # stale
+            self.release(buf)
+
+    def cancel(self):
+        """
+        Drops the pending and running requests, returns the new generation.
+        """
+        self.generation += 1
+        self.valid = self.generation + 1
+        self.pending = None
+        return self.generation
+
+    def release(self, buf):
+        """
+        Returns a buffer set that is no longer in use.
+        """
+        if buf is not None and len(self.buffers) < self.max_free:
+            self.buffers.append(buf)
+
+    def wait(self):
+        """
+        Blocks until all requests are calculated and delivered.
+        """
+        while self.busy:
+            self.pool.waitForDone()
+            QtCore.QCoreApplication.processEvents()
+
 ###############
 #   WIDGETS   #
 ###############
@@ -4712,6 +4726,8 @@ class SliderWidget(QtWidgets.QFrame):
         for i in reversed(range(self.grid.count())): 
             self.grid.itemAt(i).widget().deleteLater()
         # add new set of sliders with updated values
+        # token:(slider, spinbox) of the enabled sliders
+        self.sliders = {}
         _idx = 0
         self.box_width_dynamic = 0
         if self.parent().plo.enable_slider_ener:
@@ -4870,15 +4886,39 @@ class SliderWidget(QtWidgets.QFrame):
         slider.setValue(int(lval))
 
         slider.valueChanged.connect(self.parent().update_screen)
+        # reduced level of detail while dragging
+        slider.sliderPressed.connect(self.parent().lod_begin)
+        slider.sliderReleased.connect(self.parent().lod_end)
         slider.valueChanged.connect(lambda value: self.update_slider_value(slider_value, value))
         slider_value.valueChanged.connect(lambda value: self.update_slider_value(slider, value))
 
         layout.addWidget(slider_name, 0, idx, QtCore.Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(slider, 1, idx, QtCore.Qt.AlignmentFlag.AlignHCenter)
         layout.addWidget(slider_value, 2, idx, QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.sliders[token] = (slider, slider_value)
 
         return slider#(slider, slider_name, slider_value)
 
+    def set_slider_values(self, geo):
+        """
+        Sets the sliders and their spinboxes to the values of the geometry
+        without emitting valueChanged, the caller is responsible to redraw.
+
+        Args:
+            geo (Container): The geometry holding the slider values.
+        """
+        for token, (slider, slider_value) in self.sliders.items():
+            slider.blockSignals(True)
+            slider_value.blockSignals(True)
+            if token == 'bsdx':
+                # set beamstop distance slider max limit to detector distance
+                current_max = min(geo.dist, self.parent().lmt.bsdx_max)
+                self.update_slider_limits(slider, self.parent().lmt.bsdx_min, current_max)
+            slider.setValue(int(round(getattr(geo, token))))
+            slider_value.setValue(int(round(getattr(geo, token))))
+            slider.blockSignals(False)
+            slider_value.blockSignals(False)
+
     def toggle_panel(self, event):
         """
         Toggles the visibility of a panel based on the type of event received.
@@ -6638,7 +6678,7 @@ class FwhmWindow(HotkeyDialog):
         np.savez_compressed(target, fwhm=np.flipud(_fwhm_grid))
     
     def estimate_tch(self):
-        tth_max_rad = self.parent().calc_tth_max()
+        tth_max_rad = self.parent().get_extent().tth_max
         tth_min = 0.0
         tth_max = np.rad2deg(tth_max_rad)
         tth, fwhm = self.fwhm_curve.getData()
@@ -6682,12 +6722,389 @@ class FwhmWindow(HotkeyDialog):
     def highlight(self, index):
         # called by HoverableCurveItem:highlight
         self.fwhm_line.setPen(pg.mkPen(self.parent().conic_highlight))
-        self.fwhm_line.setPos(float(np.rad2deg(self.parent().dsp2tth(self.parent().cont_ref_dsp[index])[0])))
+        _tth, _ = self.parent().dsp2tth(self.parent().cont_ref_dsp[index])
+        if len(_tth) > 0:
+            self.fwhm_line.setPos(float(np.rad2deg(_tth[0])))
 
     def lowlight(self):
         # called by HoverableCurveItem:lowlight
         self.fwhm_line.setPen(pg.mkPen(None))
 
+class OptimizerWindow(HotkeyDialog):
+    def __init__(self, parent, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.setWindowTitle('Optimize geometry')
+        # ranked candidates of the last optimization
+        self.candidates = []
+        self.add_content()
+
+    def add_content(self):
+        self.setStyleSheet('QGroupBox { font-weight: bold; }')
+        layout = QtWidgets.QVBoxLayout()
+
+        # target resolution and peak separation
+        target_box = QtWidgets.QGroupBox('Target')
+        target_box_layout = QtWidgets.QFormLayout()
+        target_box.setLayout(target_box_layout)
+        self.opt_dsp = QtWidgets.QDoubleSpinBox(decimals=3, singleStep=0.05, minimum=0.05, maximum=100, value=1.0)
+        self.opt_dsp.setToolTip('Target resolution, the smallest d-spacing that has to be on the detector.')
+        target_box_layout.addRow('Resolution d-min [Å]', self.opt_dsp)
+        self.opt_sep = QtWidgets.QDoubleSpinBox(decimals=1, singleStep=0.5, minimum=0.0, maximum=100, value=2.0)
+        self.opt_sep.setToolTip('Minimum separation of neighbouring reference reflections in units of their FWHM, 0 disables it.')
+        # 0 disables the separation constraint
+        self.opt_sep.setSpecialValueText('Off')
+        target_box_layout.addRow('Peak separation [FWHM]', self.opt_sep)
+        self.opt_ref = QtWidgets.QCheckBox('Keep reference reflections resolved')
+        self.opt_ref.setToolTip('Reflections of the current reference (d ≥ d-min) have to be on the detector,\n'
+                                'outside of the beamstop shadow and separated by the given number of FWHM.\n'
+                                'The FWHM is estimated using the current FWHM setup.')
+        target_box_layout.addRow(self.opt_ref)
+        layout.addWidget(target_box)
+
+        # parameters to optimize
+        param_box = QtWidgets.QGroupBox('Optimize')
+        param_box_layout = QtWidgets.QHBoxLayout()
+        param_box.setLayout(param_box_layout)
+        self.opt_free = {}
+        for token, label in [('dist', 'Distance'), ('ener', 'Energy'), ('voff', 'Vertical offset'), ('rota', 'Rotation')]:
+            box = QtWidgets.QCheckBox(label)
+            box.setChecked(token in ['dist', 'ener'])
+            box.setToolTip('Optimize within the limits (lmt) of the settings file.')
+            param_box_layout.addWidget(box)
+            self.opt_free[token] = box
+        param_box_layout.addSpacing(20)
+        param_box_layout.addWidget(QtWidgets.QLabel('Grid points'))
+        self.opt_num = QtWidgets.QSpinBox(minimum=3, maximum=101, value=21)
+        self.opt_num.setToolTip('Number of grid points per parameter of the coarse search.')
+        param_box_layout.addWidget(self.opt_num)
+        layout.addWidget(param_box)
+
+        # optimize button
+        button_optimize = QtWidgets.QPushButton('Optimize')
+        button_optimize.setFocusPolicy(QtCore.Qt.FocusPolicy.NoFocus)
+        button_optimize.clicked.connect(self.optimize)
+        layout.addWidget(button_optimize)
+
+        # candidates
+        self.opt_header = ['Distance\n[mm]', 'Energy\n[keV]', 'Vertical\noffset [mm]', 'Rotation\n[°]',
+                           'd-min\n[Å]', 'Separation\n[FWHM]', 'Δd/d\n[·10⁻³]', 'Feasible']
+        self.opt_table = QtWidgets.QTableWidget(0, len(self.opt_header))
+        self.opt_table.setHorizontalHeaderLabels(self.opt_header)
+        self.opt_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.opt_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.opt_table.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
+        self.opt_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.ResizeToContents)
+        self.opt_table.verticalHeader().setVisible(False)
+        self.opt_table.cellDoubleClicked.connect(lambda row, col: self.apply(row))
+        layout.addWidget(self.opt_table)
+
+        # add description
+        description = QtWidgets.QLabel('Double-click a candidate to apply the geometry.')
+        description.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(description)
+
+        self.setWindowIcon(self.parent().icon)
+        self.setLayout(layout)
+        self.resize(self.opt_table.horizontalHeader().length() + 60, self.sizeHint().height())
+
+    def show(self, keep=False):
+        """
+        Shows the window, the target resolution is set to the current
+        resolution and the reference option is only available if a
+        reference is selected.
+        """
+        if not self.isVisible():
+            self.opt_dsp.setValue(float(geometry.calc_dsp(self.parent().get_extent().tth_max, self.parent().geo.ener)))
+            has_ref = self.parent().geo.reference != 'None' and self.parent().cont_ref_dsp is not None
+            self.opt_ref.setEnabled(has_ref)
+            self.opt_ref.setChecked(has_ref)
+        super().show(keep)
+
+    def optimize(self):
+        """
+        Runs the geometry optimizer for the current detector and
+        limits, and lists the ranked candidates.
+        """
+        free = [token for token, box in self.opt_free.items() if box.isChecked()]
+        dsp_ref = None
+        if self.opt_ref.isChecked() and self.parent().cont_ref_dsp is not None:
+            dsp_ref = np.asarray(self.parent().cont_ref_dsp)
+            dsp_ref = dsp_ref[dsp_ref > 0]
+        fwhm = {'thk':self.parent().plo.sensor_thickness,
+                'mat':self.parent().plo.sensor_material,
+                'dia':self.parent().plo.scattering_diameter,
+                'div':self.parent().plo.beam_divergence,
+                'dEE':self.parent().plo.energy_resolution}
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.CursorShape.WaitCursor)
+        try:
+            self.candidates = optimizer.optimize_geometry(self.parent().geo,
+                                                          self.parent().det,
+                                                          self.parent().lmt,
+                                                          dsp_min=self.opt_dsp.value(),
+                                                          dsp_ref=dsp_ref,
+                                                          sep_min=self.opt_sep.value(),
+                                                          fwhm=fwhm,
+                                                          free=free,
+                                                          num=self.opt_num.value(),
+                                                          # no process pool, forking a running Qt
+                                                          # application with live threads may deadlock
+                                                          processes=0,
+                                                          padding=self.parent().plo.plot_padding)
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        # fill the table
+        self.opt_table.setRowCount(len(self.candidates))
+        for row, cand in enumerate(self.candidates):
+            values = [f'{cand["dist"]:.0f}', f'{cand["ener"]:.0f}', f'{cand["voff"]:.0f}', f'{cand["rota"]:.0f}',
+                      f'{cand["dmin"]:.3f}', f'{cand["sep"]:.1f}' if np.isfinite(cand['sep']) else '-',
+                      f'{cand["ddd"]*1e3:.2f}', '✓' if cand['feasible'] else '✗']
+            for col, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                item.setTextAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+                if not cand['feasible']:
+                    item.setForeground(self.palette().placeholderText().color())
+                self.opt_table.setItem(row, col, item)
+
+    def apply(self, row):
+        """
+        Applies the geometry of the candidate in the given row.
+        """
+        if row < 0 or row >= len(self.candidates):
+            return
+        self.parent().apply_geometry(self.candidates[row])
+
+class QMapJob(QtCore.QRunnable):
+    """
+    Calculates the q-range map in a thread of the QMapWindow pool.
+    """
+    def __init__(self, window, generation, pars):
+        super().__init__()
+        self.window = window
+        self.generation = generation
+        self.pars = pars
+
+    def run(self):
+        result = qmap.calc_qmap(**self.pars)
+        # queued to the thread of the window (GUI)
+        try:
+            self.window.sigDone.emit(self.generation, result)
+        except RuntimeError:
+            # the window was deleted, drop the result
+            pass
+
+class QMapWindow(HotkeyDialog):
+    # generation, result
+    sigDone = QtCore.pyqtSignal(int, object)
+
+    def __init__(self, parent, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.setWindowTitle('Q-range map')
+        # maps of the last calculation, see qmap.calc_qmap
+        self.result = None
+        # the maps are calculated in a background thread
+        #  - one calculation at a time, queued requests are replaced
+        #  - results of outdated requests are dropped
+        #  - requests are delayed (calc_timer) to coalesce
+        #    the screen updates, e.g. keyboard steps
+        self.generation = 0
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.sigDone.connect(self.done)
+        self.calc_timer = QtCore.QTimer(self)
+        self.calc_timer.setSingleShot(True)
+        self.calc_timer.setInterval(250)
+        self.calc_timer.timeout.connect(self.calculate)
+        self.add_content()
+
+    def add_content(self):
+        self.setStyleSheet('QGroupBox { font-weight: bold; }')
+        layout = QtWidgets.QVBoxLayout()
+
+        # target q-range and map
+        target_box = QtWidgets.QGroupBox('Target')
+        target_box_layout = QtWidgets.QHBoxLayout()
+        target_box.setLayout(target_box_layout)
+        target_box_layout.addWidget(QtWidgets.QLabel('Q range [\u212B\u207B\u00B9]'))
+        self.qmap_qlo = QtWidgets.QDoubleSpinBox(decimals=2, singleStep=0.5, minimum=0.0, maximum=100, value=1.0)
+        self.qmap_qhi = QtWidgets.QDoubleSpinBox(decimals=2, singleStep=0.5, minimum=0.01, maximum=100, value=20.0)
+        for box in [self.qmap_qlo, self.qmap_qhi]:
+            box.setToolTip('Target q-range of the completeness, the fraction of the rings\n'
+                           'within this range that lands on the detector modules.')
+            box.valueChanged.connect(self.calc_timer.start)
+            target_box_layout.addWidget(box)
+        target_box_layout.addSpacing(20)
+        self.qmap_show = QtWidgets.QComboBox()
+        self.qmap_show.addItems(['Completeness', 'Q-max', 'Q-min'])
+        self.qmap_show.setToolTip('Completeness: mean ring coverage of the target q-range.\n'
+                                  'Q-max: largest q on the detector (corners).\n'
+                                  'Q-min: smallest q, limited by the beamstop.')
+        self.qmap_show.currentIndexChanged.connect(self.draw)
+        target_box_layout.addWidget(self.qmap_show)
+        target_box_layout.addSpacing(20)
+        target_box_layout.addWidget(QtWidgets.QLabel('Grid points'))
+        self.qmap_num = QtWidgets.QSpinBox(minimum=3, maximum=201, value=qmap.QMAP_NUM)
+        self.qmap_num.setToolTip('Number of distance and energy samples within the limits (lmt) of the settings file.')
+        self.qmap_num.valueChanged.connect(self.calc_timer.start)
+        target_box_layout.addWidget(self.qmap_num)
+        layout.addWidget(target_box)
+
+        # the map, distance x energy
+        self.qmap_plot = pg.PlotWidget(background=self.palette().base().color())
+        self.qmap_plot.viewport().setAttribute(QtCore.Qt.WidgetAttribute.WA_AcceptTouchEvents, False)
+        self.qmap_plot.setMenuEnabled(False)
+        self.qmap_plot.setLabel(axis='bottom', text='Distance [mm]', color=self.palette().text().color())
+        self.qmap_plot.setLabel(axis='left', text='Energy [keV]', color=self.palette().text().color())
+        self.qmap_plot.getPlotItem().getViewBox().setDefaultPadding(0.0)
+        self.qmap_image = pg.ImageItem()
+        self.qmap_plot.addItem(self.qmap_image)
+        self.qmap_bar = pg.ColorBarItem(values=(0, 1), colorMap=self.parent().cont_cmap, interactive=False)
+        self.qmap_bar.setImageItem(self.qmap_image, insert_in=self.qmap_plot.getPlotItem())
+        # the current geometry
+        self.qmap_marker = pg.ScatterPlotItem(size=12, symbol='+', pen=pg.mkPen(self.palette().text().color(), width=2))
+        self.qmap_plot.addItem(self.qmap_marker)
+        self.qmap_plot.scene().sigMouseMoved.connect(self.hover)
+        self.qmap_plot.scene().sigMouseClicked.connect(self.clicked)
+        layout.addWidget(self.qmap_plot)
+
+        # values at the mouse position
+        self.qmap_label = QtWidgets.QLabel('Click the map to apply the distance and energy.')
+        self.qmap_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.qmap_label)
+
+        self.setWindowIcon(self.parent().icon)
+        self.setLayout(layout)
+        self.resize(640, 560)
+
+    def show(self, keep=False):
+        """
+        Shows the window, the target q-range is set
+        to the q-range of the current geometry.
+        """
+        if not self.isVisible():
+            extent = self.parent().get_extent()
+            for box, tth in [(self.qmap_qlo, max(extent.tth_min, extent.bs_theta)), (self.qmap_qhi, extent.tth_max)]:
+                box.blockSignals(True)
+                box.setValue(float(qmap.calc_q(tth, self.parent().geo.ener)))
+                box.blockSignals(False)
+            self.calculate()
+        super().show(keep)
+
+    def refresh(self):
+        """
+        Called with the screen update (update_win_generic), the marker
+        follows the geometry. The maps only change with the fixed geometry,
+        they are recalculated once a slider is released or the motors
+        are no longer followed.
+        """
+        if not self.isVisible():
+            return
+        self.draw_marker()
+        if self.parent().lod_active or self.parent().motor_follower is not None:
+            return
+        self.calc_timer.start()
+
+    def calculate(self):
+        """
+        Requests the maps for the current detector and fixed geometry
+        (offsets, rotation, tilt and beamstop) within the limits (lmt),
+        the result is shown when ready (done).
+        """
+        self.calc_timer.stop()
+        geo = self.parent().geo
+        lmt = self.parent().lmt
+        q_lo, q_hi = sorted([self.qmap_qlo.value(), self.qmap_qhi.value()])
+        if q_hi <= q_lo:
+            return
+        pars = {'det':copy.copy(self.parent().det),
+                'dist':np.linspace(lmt.dist_min, lmt.dist_max, self.qmap_num.value()),
+                'ener':np.linspace(lmt.ener_min, lmt.ener_max, self.qmap_num.value()),
+                'voff':geo.voff, 'hoff':geo.hoff, 'rota':geo.rota, 'tilt':geo.tilt,
+                'bssz':geo.bssz, 'bsdx':geo.bsdx, 'q_range':(q_lo, q_hi),
+                'workers':self.parent().plo.overlay_workers}
+        self.generation += 1
+        # replace a queued request, the running one finishes
+        self.pool.clear()
+        self.pool.start(QMapJob(self, self.generation, pars))
+        self.qmap_label.setText('Calculating ...')
+
+    def done(self, generation, result):
+        if generation != self.generation:
+            # outdated
+            return
+        self.result = result
+        self.qmap_label.setText('Click the map to apply the distance and energy.')
+        self.draw()
+
+    def wait(self):
+        """
+        Blocks until the requested maps are calculated and shown.
+        """
+        if self.calc_timer.isActive():
+            self.calculate()
+        self.pool.waitForDone()
+        QtCore.QCoreApplication.processEvents()
+
+    def draw(self):
+        """
+        Shows the selected map and marks the current geometry.
+        """
+        if self.result is None:
+            return
+        key = ['completeness', 'q_max', 'q_min'][self.qmap_show.currentIndex()]
+        data = self.result[key]
+        dist, ener = self.result['dist'], self.result['ener']
+        # half a step around the samples
+        d_stp = (dist[-1] - dist[0]) / max(len(dist) - 1, 1) or 1.0
+        e_stp = (ener[-1] - ener[0]) / max(len(ener) - 1, 1) or 1.0
+        # row-major: energy (rows) x distance (columns)
+        self.qmap_image.setImage(data.T, autoLevels=False)
+        self.qmap_image.setRect(QtCore.QRectF(dist[0] - d_stp/2, ener[0] - e_stp/2, len(dist) * d_stp, len(ener) * e_stp))
+        self.qmap_bar.setColorMap(self.parent().cont_cmap)
+        self.qmap_bar.setLevels((0, 1) if key == 'completeness' else (float(np.nanmin(data)), float(np.nanmax(data))))
+        title = {'completeness':f'Completeness of Q = {self.result["q_range"][0]:.2f} - {self.result["q_range"][1]:.2f} \u212B\u207B\u00B9',
+                 'q_max':'Q-max [\u212B\u207B\u00B9]',
+                 'q_min':'Q-min (beamstop) [\u212B\u207B\u00B9]'}[key]
+        self.qmap_plot.setTitle(f'{title} ({self.parent().geo.det_type} {self.parent().geo.det_size})', color=self.palette().text().color())
+        self.draw_marker()
+
+    def draw_marker(self):
+        # the current geometry
+        self.qmap_marker.setData([self.parent().geo.dist], [self.parent().geo.ener])
+
+    def _index(self, pos):
+        # nearest sample (distance, energy) of a scene position, None if outside
+        if self.result is None or not self.qmap_plot.getPlotItem().sceneBoundingRect().contains(pos):
+            return None
+        point = self.qmap_plot.getPlotItem().getViewBox().mapSceneToView(pos)
+        dist, ener = self.result['dist'], self.result['ener']
+        n = int(np.abs(dist - point.x()).argmin())
+        m = int(np.abs(ener - point.y()).argmin())
+        d_stp = (dist[-1] - dist[0]) / max(len(dist) - 1, 1) or 1.0
+        e_stp = (ener[-1] - ener[0]) / max(len(ener) - 1, 1) or 1.0
+        if abs(dist[n] - point.x()) > d_stp/2 or abs(ener[m] - point.y()) > e_stp/2:
+            return None
+        return n, m
+
+    def hover(self, pos):
+        idx = self._index(pos)
+        if idx is None:
+            return
+        n, m = idx
+        self.qmap_label.setText(f'{self.result["dist"][n]:.0f} mm, {self.result["ener"][m]:.1f} keV: '
+                                f'Q-max {self.result["q_max"][n,m]:.2f}, Q-min {self.result["q_min"][n,m]:.3f} \u212B\u207B\u00B9, '
+                                f'completeness {self.result["completeness"][n,m]*100:.1f} %')
+
+    def clicked(self, event):
+        """
+        Applies the distance and energy of the sample that was clicked.
+        """
+        idx = self._index(event.scenePos())
+        if idx is None or event.button() != QtCore.Qt.MouseButton.LeftButton:
+            return
+        n, m = idx
+        self.parent().apply_geometry({'dist':float(self.result['dist'][n]), 'ener':float(self.result['ener'][m])})
+
 ##################
 #   PLOT ITEMS   #
 ##################
@@ -6739,6 +7156,193 @@ class HoverableCurveItem(pg.PlotCurveItem):
             self.lowlight()
         return super().mouseClickEvent(ev)
 
+class ReferenceRing():
+    """
+    Data of a single reference contour that is drawn by
+    the ReferenceRingsItem, offers the same highlight interface
+    as the HoverableCurveItem.
+    """
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.xData = None
+        self.yData = None
+        self.name = None
+        self.index = None
+        self.visible = False
+
+    def setData(self, x, y):
+        self.xData = x
+        self.yData = y
+
+    def setVisible(self, visible):
+        self.visible = visible
+
+    def isVisible(self):
+        return self.visible
+
+    def highlight(self, pos=None):
+        self.parent.patches['ref_hl_curve'].setData(self.xData, self.yData)
+        self.parent.patches['ref_hl_curve'].setVisible(True)
+        self.parent.patches['ref_hl_curve'].index = self.index
+        self.parent.patches['ref_hl_label'].setText(str(self.name))
+        self.parent.patches['ref_hl_label'].setVisible(True)
+        if pos is None:
+            self.parent.patches['ref_hl_label'].setPos(self.xData[0], self.yData[0])
+        else:
+            self.parent.patches['ref_hl_label'].setPos(pos)
+
+        self.parent.win_pxrd_highlight(self.index)
+        self.parent.fwhm_win.highlight(self.index)
+
+    def lowlight(self):
+        self.parent.patches['ref_hl_label'].setVisible(False)
+        self.parent.patches['ref_hl_curve'].setVisible(False)
+        self.parent.win_pxrd_lowlight()
+        self.parent.fwhm_win.lowlight()
+
+class ReferenceRingsItem(pg.GraphicsObject):
+    """
+    Draws all reference contours as a single plot item.
+    Contours sharing color and linewidth are joined into
+    one QPainterPath, mouse events are resolved using the
+    x-sorted contour vertices instead of per-item shapes.
+    """
+    def __init__(self, parent=None, mouseWidth=1):
+        super().__init__()
+        self.parent = parent
+        # tolerance of the contour picking [px]
+        self.mouseWidth = mouseWidth
+        # list of (pen, path)
+        self.groups = []
+        self.bounds = QtCore.QRectF()
+        # contour vertices, connection to the next vertex and contour index
+        self.points = np.empty((0, 2))
+        self.connect = np.empty(0, dtype=bool)
+        self.ring = np.empty(0, dtype=int)
+        self.seg_max = 0.0
+        # vertex order along x, sorted on the first mouse event
+        self.order = None
+        self.xsort = None
+        self.setAcceptHoverEvents(True)
+
+    def setRings(self, rings):
+        """
+        Sets the contours to be drawn.
+
+        Parameters:
+        rings (list): (x, y, color, width, index) per contour,
+                      color (QColor) and width (float) of the pen
+                      and the index in patches['reference'].
+        """
+        self.prepareGeometryChange()
+        groups = {}
+        points, connect, ring = [], [], []
+        for x, y, color, width, index in rings:
+            x = np.asarray(x, dtype=float)
+            y = np.asarray(y, dtype=float)
+            # drop non-finite vertices and break the
+            # contour where they have been
+            finite = np.isfinite(x) & np.isfinite(y)
+            con = finite.copy()
+            con[:-1] &= finite[1:]
+            con[-1] = False
+            x, y, con = x[finite], y[finite], con[finite]
+            if len(x) == 0:
+                continue
+            # group by pen, widths are rounded to 0.1 px
+            key = (color.rgba(), round(width, 1))
+            if key not in groups:
+                groups[key] = (color, [], [], [])
+            groups[key][1].append(x)
+            groups[key][2].append(y)
+            groups[key][3].append(con)
+            points.append(np.column_stack([x, y]))
+            connect.append(con)
+            ring.append(np.full(len(x), index))
+        
+        self.groups = []
+        self.bounds = QtCore.QRectF()
+        for (_, width), (color, xs, ys, cons) in groups.items():
+            path = pg.arrayToQPath(np.concatenate(xs), np.concatenate(ys), connect=np.concatenate(cons).astype(np.int32))
+            self.groups.append((self.parent.pool_pen(color, width), path))
+            self.bounds = self.bounds.united(path.boundingRect())
+        
+        if len(points) > 0:
+            self.points = np.concatenate(points)
+            self.connect = np.concatenate(connect)
+            self.ring = np.concatenate(ring)
+            _seg = np.linalg.norm(np.diff(self.points, axis=0), axis=1)[self.connect[:-1]]
+            self.seg_max = _seg.max() if len(_seg) > 0 else 0.0
+        else:
+            self.points = np.empty((0, 2))
+            self.connect = np.empty(0, dtype=bool)
+            self.ring = np.empty(0, dtype=int)
+            self.seg_max = 0.0
+        self.order = None
+        self.update()
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, p, *args):
+        for pen, path in self.groups:
+            p.setPen(pen)
+            p.drawPath(path)
+
+    def pick(self, pos):
+        """
+        Returns the index of the contour closest to pos
+        (within the mouseWidth tolerance) or None.
+        """
+        if len(self.points) == 0:
+            return None
+        # picking tolerance in data coordinates
+        px, py = self.pixelVectors()
+        if px is None:
+            return None
+        tol = self.mouseWidth * max(px.length(), py.length())
+        if self.order is None:
+            self.order = np.argsort(self.points[:, 0], kind='stable')
+            self.xsort = self.points[self.order, 0]
+        q = np.array([pos.x(), pos.y()])
+        # any segment within tol has a vertex within tol + half its length
+        rad = tol + self.seg_max/2
+        lo = np.searchsorted(self.xsort, q[0] - rad, side='left')
+        hi = np.searchsorted(self.xsort, q[0] + rad, side='right')
+        idx = np.sort(self.order[lo:hi])
+        idx = idx[np.linalg.norm(self.points[idx] - q, axis=1) <= rad]
+        if len(idx) == 0:
+            return None
+        # segments starting or ending at the candidate vertices
+        seg = np.concatenate([idx[self.connect[idx]], idx[idx > 0] - 1])
+        seg = np.unique(seg[self.connect[seg]])
+        if len(seg) == 0:
+            # isolated vertices
+            d = np.linalg.norm(self.points[idx] - q, axis=1)
+            return self.ring[idx[d.argmin()]] if d.min() <= tol else None
+        a = self.points[seg]
+        ab = self.points[seg + 1] - a
+        t = np.clip(np.einsum('ij,ij->i', q - a, ab) / np.maximum(np.einsum('ij,ij->i', ab, ab), 1e-12), 0, 1)
+        d = np.linalg.norm(a + t[:, None] * ab - q, axis=1)
+        if d.min() > tol:
+            return None
+        return self.ring[seg[d.argmin()]]
+
+    def hoverEvent(self, ev):
+        if not ev.isExit() and ev.buttons() == QtCore.Qt.MouseButton.LeftButton:
+            index = self.pick(ev.pos())
+            if index is not None:
+                self.parent.patches['reference'][index].highlight(ev.pos())
+
+    def mouseClickEvent(self, ev):
+        index = self.pick(ev.pos())
+        if index is None:
+            return
+        if ev.buttons() == QtCore.Qt.MouseButton.LeftButton:
+            self.parent.patches['reference'][index].highlight(ev.pos())
+        else:
+            self.parent.patches['reference'][index].lowlight()
+
 class ClickableScatterPlotItem(pg.ScatterPlotItem):
     """
     Reimplementation of the ScatterPlotItem class with added click event handling.
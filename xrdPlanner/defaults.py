@@ -0,0 +1,605 @@
+import os
+import json
+
+####################
+#     DEFAULTS     #
+# QT-INDEPENDENT   #
+####################
+# Default settings (geo, plo, thm, lmt), the detector library and
+# the settings file parser. Used by the MainWindow and the headless
+# tools that can't (or shouldn't) create a window.
+
+class Container(object):
+    """
+    A class used to represent a Container.
+    """
+    pass
+
+# Some parameters need to be protected to save
+# the user some waiting time
+#
+# A check is performed if the value of the key
+# is within 'minimum' and 'maximum', if not it
+# is set to 'default'
+#
+# Add 'key':('minimum', 'maximum', 'default') to the dict
+SETTINGS_WARN = {'conic_ref_cif_kev':( 5,   25,  12),
+                    #'conic_tth_min':( 1,   10,   5),
+                    #'conic_tth_max':(10,  180,  90),
+                    #'conic_tth_num':( 1,  100,  20),
+                    #'conic_ref_num':( 1,  500, 200),
+                    'conic_steps':(10, 1000, 100),
+                       'ener_stp':( 1,  100,   1),
+                       'dist_stp':( 1,  100,   1),
+                       'hoff_stp':( 1,  100,   1),
+                       'voff_stp':( 1,  100,   1),
+                       'rota_stp':( 1,  100,   1),
+                       'tilt_stp':( 1,  100,   1),
+                       'bsdx_stp':( 1,  100,   1),
+                }
+# Add 'key':'val to the dict to enforce 'key' to be set to 'val'
+SETTINGS_FORCE = {'show_fwhm':False}
+
+def get_path_home():
+    """
+    Returns the xrdPlanner home path, the environmental
+    variable 'XRDPLANNER' or the package folder.
+    """
+    return os.getenv('XRDPLANNER', os.path.dirname(__file__))
+
+def get_defaults_geo():
+    """
+    Sets up and returns the default geometry configuration for the detector.
+
+    Returns:
+        Container: An object containing the default geometry settings
+    """
+    ######################
+    # Setup the geometry #
+    ######################
+    geo = Container()
+    geo.det_type = 'EIGER2'  # [str]  Pilatus3 / Eiger2
+    geo.det_size = '4M'      # [str]  300K 1M 2M 6M / 1M 4M 9M 16M
+    geo.ener = 25            # [keV]  Beam energy
+    geo.dist = 100           # [mm]   Detector distance
+    geo.voff = 0             # [mm]   Detector offset (vertical)
+    geo.hoff = 0             # [mm]   Detector offset (horizontal)
+    geo.rota = 0             # [deg]  Detector rotation
+    geo.tilt = 0             # [deg]  Detector tilt
+    geo.bssz = 3.0           # [mm]   Current beamstop size (or None)
+    geo.bsdx = 40            # [mm]   Beamstop distance
+    geo.unit = 1             # [0-3]  Contour legend
+                             #          0: 2-Theta
+                             #          1: d-spacing
+                             #          2: q-space
+                             #          3: sin(theta)/lambda
+    geo.reference = 'None'   # [str]  Plot reference contours
+                             #          pick from pyFAI
+    geo.darkmode = True      # [bool] Darkmode
+    geo.colormap = 'viridis' # [cmap] Contour colormap
+    geo.bs_list = [1.5,      # [list] Available beamstop sizes
+                   2.0,
+                   2.5,
+                   3.0,
+                   5.0]
+    geo.det_bank = {}        # available detectors
+                             # 'key':['value'] or ['value1', 'value2']
+                             # 'key': Detector name
+                             # 'value': Detector model/size/type
+                             # e.g. {'PLATUS3:['1M', '2M'], 'EIGER2':['4M']}
+                             # empty dict enables all detectors
+    return geo
+
+def get_defaults_plo():
+    """
+    Get default plot settings.
+
+    Returns:
+        Container: An object containing default plot settings.
+
+    Default Plot Settings:
+        - geometry contour section
+        - reference contour section
+        - module section
+        - general section
+        - pxrd plot
+        - extra functions
+        - slider section
+        - update/reset
+        - debug/testing
+    """
+    ################
+    # Plot Details #
+    ################
+    plo = Container()
+    # - geometry contour section - 
+    plo.conic_tth_min = 5               # [int]    Minimum 2-theta contour line
+    plo.conic_tth_max = 100             # [int]    Maximum 2-theta contour line
+    plo.conic_tth_num = 12              # [int]    Number of contour lines
+    plo.conic_tth_auto = True           # [bool]   Dynamic contour levels
+    plo.beamcenter_marker = 'o'         # [marker] Beamcenter marker
+    plo.beamcenter_size = 6             # [int]    Beamcenter size
+    plo.poni_marker = 'x'               # [marker] Poni marker
+    plo.poni_size = 8                   # [int]    Poni size
+    plo.conic_linewidth = 2.0           # [float]  Contour linewidth (lw)
+    plo.conic_label_size = 14           # [int]    Contour labelsize
+    plo.conic_label_auto = True         # [bool]   Dynamic label positions
+    plo.colored_reference = False       # [bool]   Color reference cones instead
+    # - reference contour section - 
+    plo.conic_ref_linewidth = 2.0       # [float]  Reference contour linewidth
+    plo.conic_ref_timeout = 500         # [int]    highlight contour on click (msec)
+    plo.conic_ref_num = 250             # [int]    Number of reference contours
+    plo.conic_ref_batch = True          # [bool]   Draw reference contours as a single item
+    plo.conic_ref_cif_int = 0.01        # [float]  Minimum display intensity (cif)
+    plo.conic_ref_cif_kev = 10.0        # [float]  Energy [keV] for intensity calculation
+    plo.conic_ref_cif_irel = True       # [bool]   Linewidth relative to intensity
+    plo.conic_ref_cif_lw_min = 0.1      # [float]  Minimum linewidth when using irel
+    plo.conic_ref_cif_lw_mult = 3.0     # [float]  Linewidth multiplier when using irel
+    plo.conic_hkl_show_int = False      # [bool]   Show intensity in hkl tooltip
+    plo.conic_hkl_label_size = 14       # [int]    Font size of hkl tooltip
+    # - module section - 
+    plo.det_module_alpha = 0.20         # [float]  Detector module alpha
+    plo.det_module_width = 1            # [int]    Detector module border width
+    # - general section - 
+    plo.conic_steps = 100               # [int]    Conic resolution
+    plo.conic_tolerance = 0.1           # [float]  Adaptive conic resolution, px (0 for fixed)
+    plo.plot_size = 0                   # [int]    Plot size, px (0 for auto)
+    plo.plot_size_fixed = True          # [bool]   Fix window size
+    plo.plot_padding = 0                # [int]    Padding of the detector screen
+    plo.unit_label_size = 16            # [int]    Label size, px
+    plo.polarisation_fac = 0.99         # [float]  Horizontal polarisation factor
+    plo.show_polarisation = True        # [bool]   Show polarisation overlay
+    plo.show_solidangle = False         # [bool]   Show solid angle overlay
+    plo.show_unit_hover = True          # [bool]   Show unit value on hover
+    plo.show_grid = False               # [bool]   Show azimuthal grid
+    plo.azimuth_num = 13                # [int]    Number of azimuthal grid lines
+    plo.overlay_resolution = 300        # [int]    Overlay resolution
+    plo.overlay_toggle_warn = True      # [bool]   Overlay warn color threshold
+    plo.overlay_async = True            # [bool]   Calculate overlays in the background
+    plo.overlay_workers = 0             # [int]    Overlay threads, 0: all CPUs
+    # - pxrd plot -
+    plo.pxrd_marker_symbol = 'arrow_up' # [marker] Symbol to mark peaks
+    plo.pxrd_marker_offset = 0.05       # [float]  offset of marker from x-axis
+    plo.pxrd_coverage_steps = 720       # [int]    Azimuthal samples per ring of the coverage
+    # - extra functions -
+    plo.show_fwhm = False               # [bool]   Show delta_d/d function
+    plo.sensor_thickness = 1000e-6      # [float]  Detector sensor thickness [m]
+    plo.sensor_material = 'CdTe'        # [str]    Detector sensor material
+    plo.beam_divergence = 10e-6         # [float]  X-ray beam divergence [rad]
+    plo.scattering_diameter = 100e-6    # [float]  Scattering volume diameter [m]
+    plo.energy_resolution = 1.4e-4      # [float]  X-ray beam resolution [eV/keV]
+    #plo.funct_fwhm_thresh = 1e-3       # 
+    # - slider section - 
+    plo.slider_margin = 12              # [int]    Slider frame top margin
+    plo.slider_border_width = 1         # [int]    Slider frame border width
+    plo.slider_border_radius = 1        # [int]    Slider frame border radius (px)
+    plo.slider_label_size = 14          # [int]    Slider frame label size
+    plo.slider_column_width = 75        # [int]    Slider label column width
+    plo.slider_lod = True               # [bool]   Reduce detail while dragging a slider
+    plo.slider_lod_conic_steps = 25     # [int]    Conic resolution while dragging
+    plo.slider_lod_overlay_res = 60     # [int]    Overlay resolution while dragging
+    plo.slider_lod_ref_num = 50         # [int]    Number of reference contours while dragging
+    plo.enable_slider_ener = True       # [bool]   Show energy slider
+    plo.enable_slider_dist = True       # [bool]   Show distance slider
+    plo.enable_slider_rota = True       # [bool]   Show rotation slider
+    plo.enable_slider_voff = True       # [bool]   Show vertical offset slider
+    plo.enable_slider_hoff = True       # [bool]   Show horizontal offset slider
+    plo.enable_slider_tilt = True       # [bool]   Show tilt slider
+    plo.enable_slider_bsdx = True       # [bool]   Show beamstop distance slider
+    plo.slider_label_ener = 'Energy\n[keV]'            # [str] Label for energy slider
+    plo.slider_label_dist = 'Distance\n[mm]'           # [str] Label for distance slider
+    plo.slider_label_rota = 'Rotation\n[\u02da]'       # [str] Label for rotation slider
+    plo.slider_label_voff = 'Vertical\noffset\n[mm]'   # [str] Label for vertical offset slider
+    plo.slider_label_hoff = 'Horizontal\noffset\n[mm]' # [str] Label for horizontal offset slider
+    plo.slider_label_tilt = 'Tilt\n[\u02da]'           # [str] Label for tilt slider
+    plo.slider_label_bsdx = 'Beamstop\ndistance\n[mm]' # [str] Label for beamstop distance slider
+    # - motor follower -
+    plo.follow_source = ''              # [str]    Position source, udp://host:port or file ('' to disable)
+    plo.follow_names = {}               # [dict]   Position names of the source, {'name':'dist', ...}
+    plo.follow_rate = 10.0              # [float]  Maximum screen updates per second (0: no limit)
+    plo.follow_deadband = 0.5           # [float]  Ignore changes below this fraction of the slider step
+    # - update/reset - 
+    plo.update_settings = True          # [bool]   Update settings file after load
+    plo.update_det_bank = True          # [bool]   Update detector bank after load
+    plo.reset_settings = False          # [bool]   Reset settings file
+    plo.reset_det_bank = False          # [bool]   Reset detector bank
+    # - debug/testing -
+    plo.use_native_menubar = True       # [bool]   Use native menubar
+    plo.set_debug = False               # [bool]   Debug mode
+
+    return plo
+
+def get_defaults_thm():
+    """
+    Returns a Container object with default theme settings for both light and dark modes.
+
+    The theme settings include various color configurations for different UI elements such as:
+    - Global colors
+    - Contour labels
+    - Reference contours
+    - Beamstop colors and edges
+    - Detector module borders and backgrounds
+    - Plot backgrounds
+    - Label colors and fills
+    - Slider frame borders, backgrounds, and hover colors
+    - Slider frame label colors
+    - Map threshold colors
+
+    Returns:
+        Container: An object containing the default theme settings.
+    """
+    #################
+    # Theme Details #
+    #################
+    thm = Container()
+    thm.color_dark = '#404040'                    # [color]  Global dark color
+    thm.color_light = '#EEEEEE'                   # [color]  Global light color
+    # light mode
+    thm.light_conic_label_fill = '#FFFFFF'        # [color]  Contour label fill color
+    thm.light_conic_ref_color = '#DCDCDC'         # [color]  Reference contour color
+    thm.light_conic_highlight = '#FF0000'         # [color]  Reference contour highlight color
+    thm.light_beamstop_color = '#80FF0000'        # [color]  Beamstop color
+    thm.light_beamstop_edge_color = '#FF0000'     # [color]  Beamstop edge color
+    thm.light_det_module_color = '#404040'        # [color]  Detector module border color
+    thm.light_det_module_fill = '#404040'         # [color]  Detector module background color
+    thm.light_plot_bg_color = '#FFFFFF'           # [color]  Plot background color
+    thm.light_unit_label_color = '#808080'        # [color]  Label color
+    thm.light_unit_label_fill = '#FFFFFF'         # [color]  Label fill color
+    thm.light_slider_border_color = '#808080'     # [color]  Slider frame border color
+    thm.light_slider_bg_color = '#AAC0C0C0'       # [color]  Slider frame background color
+    thm.light_slider_bg_hover = '#C0C0C0'         # [color]  Slider frame hover color
+    thm.light_slider_label_color = '#000000'      # [color]  Slider frame label color
+    thm.light_overlay_threshold_color = '#FF0000' # [color]  Map threshold color
+    thm.light_grid_color = '#AAAAAA'              # [color]  Grid color
+    # dark mode
+    thm.dark_conic_label_fill = '#000000'         # [color]  Contour label fill color
+    thm.dark_conic_ref_color = '#303030'          # [color]  Reference contour color
+    thm.dark_conic_highlight = '#FF0000'          # [color]  Reference contour highlight color
+    thm.dark_beamstop_color = '#AAFF0000'         # [color]  Beamstop color
+    thm.dark_beamstop_edge_color = '#FF0000'      # [color]  Beamstop edge color
+    thm.dark_det_module_color = '#EEEEEE'         # [color]  Detector module border color
+    thm.dark_det_module_fill = '#EEEEEE'          # [color]  Detector module background color
+    thm.dark_plot_bg_color = '#000000'            # [color]  Plot background color
+    thm.dark_unit_label_color = '#C0C0C0'         # [color]  Label color
+    thm.dark_unit_label_fill = '#000000'          # [color]  Label fill color
+    thm.dark_slider_border_color = '#202020'      # [color]  Slider frame border color
+    thm.dark_slider_bg_color = '#AA303030'        # [color]  Slider frame background color
+    thm.dark_slider_bg_hover = '#303030'          # [color]  Slider frame hover color
+    thm.dark_slider_label_color = '#C0C0C0'       # [color]  Slider frame label color
+    thm.dark_overlay_threshold_color = '#FF0000'  # [color]  Map threshold color
+    thm.dark_grid_color = '#606060'               # [color]  Grid color
+
+    return thm
+
+def get_defaults_lmt():
+    """
+    Get default limits for various parameters.
+    Returns:
+        Container: An object containing default limits
+    """
+    ##########
+    # Limits #
+    ##########
+    lmt = Container()
+    lmt.ener_min =  5    # [int] Energy minimum [keV]
+    lmt.ener_max =  100  # [int] Energy maximum [keV]
+    lmt.ener_stp =  1    # [int] Energy step size [keV]
+
+    lmt.dist_min =  40   # [int] Distance minimum [mm]
+    lmt.dist_max =  1000 # [int] Distance maximum [mm]
+    lmt.dist_stp =  1    # [int] Distance step size [mm]
+
+    lmt.hoff_min = -150  # [int] Horizontal offset minimum [mm]
+    lmt.hoff_max =  150  # [int] Horizontal offset maximum [mm]
+    lmt.hoff_stp =  1    # [int] Horizontal offset step size [mm]
+
+    lmt.voff_min = -250  # [int] Vertical offset minimum [mm]
+    lmt.voff_max =  250  # [int] Vertical offset maximum [mm]
+    lmt.voff_stp =  1    # [int] Vertical offset step size [mm]
+
+    lmt.rota_min = -45   # [int] Rotation minimum [deg]
+    lmt.rota_max =  45   # [int] Rotation maximum [deg]
+    lmt.rota_stp =  1    # [int] Rotation step size [deg]
+
+    lmt.tilt_min = -40   # [int] Tilt minimum [deg]
+    lmt.tilt_max =  40   # [int] Tilt maximum [deg]
+    lmt.tilt_stp =  1    # [int] Tilt step size [deg]
+
+    lmt.bsdx_min =   5   # [int] Beamstop distance minimum [mm]
+    lmt.bsdx_max = 1000  # [int] Beamstop distance maximum [mm]
+    lmt.bsdx_stp =   1   # [int] Beamstop distance step size [mm]
+    
+    return lmt
+
+def get_det_library():
+    """
+    Returns the default detector specifications library.
+
+    Returns:
+    dict: A dictionary containing the specifications for various detectors.
+    Each detector specification includes:
+    - pxs: Pixel size in mm
+    - hmp: Module size (horizontal) in pixels
+    - vmp: Module size (vertical) in pixels
+    - hgp: Module gap (horizontal) in pixels
+    - vgp: Module gap (vertical) in pixels
+    - cbh: Central beam hole in pixels
+    - size: Dictionary mapping detector model to its dimensions (rows, columns)
+    """
+    ###########################
+    # Detector Specifications #
+    ###########################
+    detectors = dict()
+    ###############################
+    # Specifications for Pilatus3 #
+    ###############################
+    detectors['PILATUS3'] = {
+        'pxs' : 172e-3, # [mm] Pixel size
+        'hmp' : 487,    # [px] Module size (horizontal
+        'vmp' : 195,    # [px] Module size (vertical)
+        'hgp' : 7,      # [px] Module gap (horizontal)
+        'vgp' : 17,     # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : {'300K':(1,3),
+                    '1M':(2,5),
+                    '2M':(3,8),
+                    '6M':(5,12)},
+        }
+    
+    ###############################
+    # Specifications for Pilatus4 #
+    ###############################
+    # Note: These are probably not
+    # the correct PILATUS4 specs
+    # and are only meant to play
+    # around!
+    detectors['PILATUS4'] = {
+        'pxs' : 150e-3, # [mm] Pixel size
+        'hmp' : 513,    # [px] Module size (horizontal
+        'vmp' : 255,    # [px] Module size (vertical)
+        'hgp' : 7,      # [px] Module gap (horizontal)
+        'vgp' : 20,     # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : {'1M':(2,4),
+                  '2M':(3,6),
+                  '4M':(4,8)}
+        }
+    
+    #############################
+    # Specifications for Eiger2 #
+    #############################
+    detectors['EIGER2'] = {
+        'pxs' : 75e-3,  # [mm] Pixel size
+        'hmp' : 1028,   # [px] Module size (horizontal
+        'vmp' : 512,    # [px] Module size (vertical)
+        'hgp' : 12,     # [px] Module gap (horizontal)
+        'vgp' : 38,     # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : {'500K':(1,2),
+                    '1M':(1,2),
+                    '4M':(2,4),
+                    '9M':(3,6),
+                   '16M':(4,8)},
+        }
+    
+    #############################
+    # Specifications for MPCCD #
+    #############################
+    detectors['MPCCD'] = {
+        'pxs' : 50e-3,   # [mm] Pixel size
+        'hmp' : 1024,    # [px] Module size (horizontal
+        'vmp' : 512,     # [px] Module size (vertical)
+        'hgp' : 18,      # [px] Module gap (horizontal)
+        'vgp' : 27,      # [px] Module gap (vertical)
+        'cbh' : 60,      # [px] Central beam hole
+        'size' : {'4M':(2,4)},
+        }
+
+    ##############################
+    # Specifications for RAYONIX #
+    ##############################
+    detectors['RAYONIX'] = {
+        'pxs' : 39e-3,  # [mm] Pixel size
+        'hmp' : 1920,   # [px] Module size (horizontal
+        'vmp' : 1920,   # [px] Module size (vertical)
+        'hgp' : 0,      # [px] Module gap (horizontal)
+        'vgp' : 0,      # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : {'MX225-HS':(3,3),
+                  'MX300-HS':(4,4)},
+        }
+    
+    #############################
+    # Specifications for PHOTON #
+    #############################
+    detectors['PHOTON-II'] = {
+        'pxs' : 135e-3, # [mm] Pixel size
+        'hmp' : 768,    # [px] Module size (horizontal
+        'vmp' : 512,    # [px] Module size (vertical)
+        'hgp' : 0,      # [px] Module gap (horizontal)
+        'vgp' : 0,      # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : { '7':(1,1),
+                  '14':(1,2)},
+        }
+    
+    #############################
+    # Specifications for PHOTON #
+    #############################
+    detectors['PHOTON-III'] = {
+        'pxs' : 135e-3, # [mm] Pixel size
+        'hmp' : 768,    # [px] Module size (horizontal
+        'vmp' : 512,    # [px] Module size (vertical)
+        'hgp' : 0,      # [px] Module gap (horizontal)
+        'vgp' : 0,      # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : { '7':(1,1),
+                  '14':(1,2),
+                  '28':(2,2)},
+        }
+    
+    ###################################
+    # Specifications for Perkin-Elmer #
+    ###################################
+    detectors['Perkin-Elmer XRD'] = {
+        'pxs' : 100e-3, # [mm] Pixel size
+        'hmp' : 2048,   # [px] Module size (horizontal
+        'vmp' : 2048,   # [px] Module size (vertical)
+        'hgp' : 0,      # [px] Module gap (horizontal)
+        'vgp' : 0,      # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : {'0822':(1,1),
+                  '1611':(2,2),
+                  '1620':(2,2),
+                  '1621':(2,2),
+                  '1622':(2,2),
+                  '1642':(2,2)},
+        }
+    
+    ############################
+    # Specifications for Varex #
+    ############################
+    detectors['VAREX XRpad2'] = {
+        'pxs' : 100e-3, # [mm] Pixel size
+        'hmp' : 4288,   # [px] Module size (horizontal)
+        'vmp' : 4288,   # [px] Module size (vertical)
+        'hgp' : 0,      # [px] Module gap (horizontal)
+        'vgp' : 0,      # [px] Module gap (vertical)
+        'cbh' : 0,      # [px] Central beam hole
+        'size' : {'4343':(1,1)},
+        }
+    
+    #############################
+    # Specifications for CITIUS #
+    #############################
+    detectors['CITIUS'] = {
+        'pxs' : 72.6e-3, # [mm] Pixel size
+        'hmp' : 728,     # [px] Module size (horizontal)
+        'vmp' : 384,     # [px] Module size (vertical)
+        'hgp' : 22,      # [px] Module gap (horizontal)
+        'vgp' : 36,      # [px] Module gap (vertical)
+        'cbh' : 0,       # [px] Central beam hole
+        'size' : {'20.2':(6,12)},
+        }
+
+    return detectors
+
+def load_det_library(path_detdb=None):
+    """
+    Returns the default detector library updated with the
+    entries of the detector db file, the file is not changed.
+
+    Parameters:
+    path_detdb (str, optional): Path to the detector db, defaults to
+                                detector_db.json in the xrdPlanner home path.
+
+    Returns:
+    dict: A dictionary containing the specifications for various detectors.
+    """
+    detectors = get_det_library()
+    if path_detdb is None:
+        path_detdb = os.path.join(get_path_home(), 'detector_db.json')
+    if os.path.exists(path_detdb):
+        try:
+            with open(path_detdb, 'r') as of:
+                temp = json.load(of)
+        except: # any error is critical here!
+            print(f"Error parsing Detector db at: {path_detdb}")
+            raise SystemExit
+        # skip the old [mm] 'hms' detector module format
+        if temp and 'hms' not in next(iter(temp.values())):
+            detectors.update(temp)
+    return detectors
+
+def get_det_params(detector_db, det_type, det_size):
+    """
+    Picks the detector parameters from the detector library.
+
+    Parameters:
+    detector_db (dict): The detector library.
+    det_type (str): Detector type, e.g. 'PILATUS3'.
+    det_size (str): Detector size, e.g. '2M'.
+
+    Returns:
+    Container: An object containing the detector parameters.
+
+    Raises:
+    SystemExit: If the detector type or size is not found in the library.
+    """
+    if det_type not in detector_db.keys():
+        print(f'Unknown detector type: {det_type}')
+        print(f'Current databank entries: {", ".join(detector_db.keys())}.')
+        raise SystemExit
+    if det_size not in detector_db[det_type]['size'].keys():
+        print(f'Unknown detector type/size combination: {det_type}/{det_size}')
+        print(f'Current {det_type} databank sizes: {", ".join(detector_db[det_type]["size"].keys())}.')
+        raise SystemExit
+    det = Container()
+    det.hmp = detector_db[det_type]['hmp']
+    det.vmp = detector_db[det_type]['vmp']
+    det.pxs = detector_db[det_type]['pxs']
+    det.hgp = detector_db[det_type]['hgp']
+    det.vgp = detector_db[det_type]['vgp']
+    det.cbh = detector_db[det_type]['cbh']
+    det.hmn, det.vmn = detector_db[det_type]['size'][det_size]
+    det.name = f'{det_type} {det_size}'
+    return det
+
+def apply_settings(pars, conv, skip=[]):
+    """
+    Applies the parameters of a settings dict to the containers.
+
+    Parameters:
+    pars (dict): Settings, {'geo':{...}, 'plo':{...}, 'thm':{...}, 'lmt':{...}}.
+    conv (dict): Containers to update, {'geo':geo, 'plo':plo, 'thm':thm, 'lmt':lmt}.
+    skip (list, optional): Sections to skip, default is an empty list.
+
+    Notes:
+    - If a parameter value is outside the allowed range specified in SETTINGS_WARN,
+      it is set to the default value, and a warning message is printed.
+    - If a parameter is in SETTINGS_FORCE, it is set to the enforced value.
+    """
+    for key, vals in pars.items():
+        if key in skip or key not in conv:
+            continue
+        for p, x in vals.items():
+            if p in conv[key].__dict__.keys():
+                # make sure the strings are in order.
+                # this is bad!
+                if isinstance(x, str) and x.lower() == 'none':
+                    x = 'None'
+                if p in SETTINGS_WARN and x not in range(SETTINGS_WARN[p][0], SETTINGS_WARN[p][1]+1):
+                        print(f'WARNING: {p} set to {x}!\nAllowed values are within {SETTINGS_WARN[p][0], SETTINGS_WARN[p][1]}, parameter set to {SETTINGS_WARN[p][2]}.')
+                        x = SETTINGS_WARN[p][2]
+                if p in SETTINGS_FORCE:
+                    x = SETTINGS_FORCE[p]
+                setattr(conv[key], p, x)
+            else:
+                print(f'WARNING: "{p}" is not a valid key!')
+
+def load_settings(path=None):
+    """
+    Loads a settings file on top of the defaults.
+
+    Parameters:
+    path (str, optional): Path to the settings file (.json), None returns the defaults.
+
+    Returns:
+    tuple: Containers geo, plo, thm, lmt
+
+    Raises:
+    SystemExit: If there is an error parsing the settings file.
+    """
+    geo = get_defaults_geo()
+    plo = get_defaults_plo()
+    thm = get_defaults_thm()
+    lmt = get_defaults_lmt()
+    if path is not None:
+        try:
+            with open(path, 'r') as of:
+                pars = json.load(of)
+        except: # any error is critical here!
+            print(f"Error parsing settings file at: {path}")
+            raise SystemExit
+        apply_settings(pars, {'geo':geo, 'plo':plo, 'thm':thm, 'lmt':lmt})
+    return geo, plo, thm, lmt
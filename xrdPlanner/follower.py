@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import numpy as np
+
+#####################
+#     FOLLOWER      #
+#  QT-INDEPENDENT   #
+#####################
+# Follow the detector motors of a control system.
+#
+#  source -> Follower.poll() -> changed geometry parameters (or None)
+#
+# A position source delivers updates of the geometry parameters, an
+# update may hold any subset. Sources don't block, read() returns the
+# messages that arrived since the last call:
+#  - UdpSource: datagrams sent to a local port (udp://127.0.0.1:5555)
+#  - FileSource: lines appended to a file (like tail -f)
+# Other sources (e.g. EPICS, Tango, ZeroMQ) subclass PositionSource.
+# A message is a json object or 'name=value' pairs, the names are
+# mapped to the geometry parameters (names), unknown names are ignored.
+#
+# The Follower coalesces the updates, only the latest value of every
+# parameter is kept, and limits what is passed on:
+#  - dead band: changes smaller than deadband[parameter] are dropped
+#  - rate: at most rate changes per second
+# The MainWindow polls the follower (FOLLOW_POLL) and applies the
+# changes via apply_geometry, a script may feed Planner.set_geometry.
+#
+# Stand-in for testing, streams a scan to a source:
+#  python -m xrdPlanner.follower udp://127.0.0.1:5555 --scan dist 100 300
+
+# geometry parameters that can be followed
+FOLLOW_PARAMS = ('ener', 'dist', 'voff', 'hoff', 'tilt', 'rota', 'bsdx')
+# default udp port
+FOLLOW_PORT = 5555
+# poll interval of the GUI [ms]
+FOLLOW_POLL = 20
+# the tail of a file source that is read on start [bytes],
+# picks up the current position
+FOLLOW_TAIL = 4096
+
+def parse_message(text, names=None):
+    """
+    Parses a position message, a json object or 'name=value'
+    pairs separated by whitespace or commas.
+
+    Parameters:
+    text (str): The message.
+    names (dict, optional): Source name: geometry parameter, e.g. {'det_z':'dist'},
+                            the geometry parameters themselves are always accepted.
+
+    Returns:
+    dict: geometry parameter: value, invalid entries are skipped.
+    """
+    text = text.strip()
+    if text.startswith('{'):
+        try:
+            pairs = json.loads(text).items()
+        except (ValueError, AttributeError):
+            return {}
+    else:
+        pairs = [p.split('=', 1) for p in text.replace(',', ' ').split() if '=' in p]
+    values = {}
+    for name, val in pairs:
+        key = names.get(name, name) if names else name
+        if key not in FOLLOW_PARAMS:
+            continue
+        try:
+            val = float(val)
+        except (TypeError, ValueError):
+            continue
+        if np.isfinite(val):
+            values[key] = val
+    return values
+
+class PositionSource(object):
+    """
+    Base class of the position sources, read() returns the messages (str)
+    that arrived since the last call and must not block.
+    """
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class UdpSource(PositionSource):
+    """
+    Receives the messages as udp datagrams, a datagram may
+    hold several messages (lines).
+    """
+    def __init__(self, host='127.0.0.1', port=FOLLOW_PORT):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind((host, port))
+
+    def read(self):
+        messages = []
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            messages.extend(data.decode('utf-8', 'replace').splitlines())
+        return messages
+
+    def close(self):
+        self.sock.close()
+
+class FileSource(PositionSource):
+    """
+    Reads the lines appended to a file, a truncated or
+    replaced file is read from the start.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.ino = None
+        self.rest = b''
+        # start with the last lines to get the current position
+        self.pos = 0
+        if os.path.exists(path):
+            st = os.stat(path)
+            self.ino = st.st_ino
+            self.pos = max(st.st_size - FOLLOW_TAIL, 0)
+            # the first line is incomplete
+            self.skip = self.pos > 0
+        else:
+            self.skip = False
+
+    def read(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if st.st_size < self.pos or (self.ino is not None and st.st_ino != self.ino):
+            self.pos = 0
+            self.rest = b''
+        self.ino = st.st_ino
+        if st.st_size == self.pos:
+            return []
+        with open(self.path, 'rb') as rf:
+            rf.seek(self.pos)
+            data = rf.read()
+            self.pos = rf.tell()
+        lines = (self.rest + data).split(b'\n')
+        # keep the incomplete last line
+        self.rest = lines.pop()
+        if self.skip and len(lines) > 0:
+            lines.pop(0)
+            self.skip = False
+        return [line.decode('utf-8', 'replace') for line in lines]
+
+def parse_address(uri):
+    """
+    Returns (host, port) of udp://host:port, the host defaults
+    to 127.0.0.1 and the port to FOLLOW_PORT.
+
+    Raises:
+    ValueError: If the port is invalid.
+    """
+    host, _, port = uri[6:].rpartition(':')
+    if not host and not port.isdigit():
+        host, port = port, ''
+    try:
+        port = int(port) if port else FOLLOW_PORT
+    except ValueError:
+        raise ValueError(f'Invalid port in {uri}.') from None
+    if not 0 < port < 65536:
+        raise ValueError(f'Invalid port in {uri}.')
+    return host or '127.0.0.1', port
+
+def open_source(source):
+    """
+    Opens a position source from its uri, udp://host:port or a file
+    path (optionally file://path). A PositionSource is returned as is.
+
+    Raises:
+    ValueError: If the uri is empty or the port is invalid.
+    OSError: If the port can't be bound.
+    """
+    if isinstance(source, PositionSource):
+        return source
+    if not source:
+        raise ValueError('No position source given.')
+    if source.startswith('udp://'):
+        host, port = parse_address(source)
+        return UdpSource(host, port)
+    if source.startswith('file://'):
+        source = source[7:]
+    return FileSource(source)
+
+class Follower(object):
+    """
+    Coalesces, dead-bands and rate limits the updates of a position source.
+
+    Parameters:
+    source (PositionSource or str): The source or its uri, see open_source.
+    names (dict, optional): Source name: geometry parameter, see parse_message.
+    rate (float, optional): Maximum number of changes per second, 0 for no limit. Default 10.
+    deadband (dict, optional): Geometry parameter: smallest change that is passed on.
+    current (dict, optional): The current geometry, the dead band refers to it.
+
+    Attributes:
+    received (int): Number of valid messages.
+    passed (int): Number of changes passed on.
+    """
+    def __init__(self, source, names=None, rate=10, deadband=None, current=None):
+        self.source = open_source(source)
+        self.names = names or {}
+        self.rate = rate
+        self.deadband = deadband or {}
+        # last passed on values
+        self.current = dict(current) if current else {}
+        # latest values, not passed on yet
+        self.pending = {}
+        self.last = -np.inf
+        self.received = 0
+        self.passed = 0
+
+    def feed(self, messages):
+        """
+        Adds messages, the latest value of every parameter is kept.
+        """
+        for message in messages:
+            values = parse_message(message, self.names)
+            if values:
+                self.received += 1
+                self.pending.update(values)
+
+    def poll(self, now=None):
+        """
+        Reads the source and returns the changed parameters
+        that are due, None if there is nothing to do.
+
+        Parameters:
+        now (float, optional): Time [s], default time.monotonic().
+        """
+        self.feed(self.source.read())
+        if not self.pending:
+            return None
+        now = time.monotonic() if now is None else now
+        if self.rate > 0 and now - self.last < 1/self.rate:
+            return None
+        changes = {k:v for k, v in self.pending.items()
+                   if k not in self.current or abs(v - self.current[k]) >= self.deadband.get(k, 0)}
+        # changes within the dead band are dropped, a slow
+        # drift passes once it adds up to the dead band
+        self.pending = {}
+        if not changes:
+            return None
+        self.current.update(changes)
+        self.last = now
+        self.passed += 1
+        return changes
+
+    def close(self):
+        self.source.close()
+
+class PositionSender(object):
+    """
+    Sends messages to a udp or file source, the counterpart of open_source.
+    """
+    def __init__(self, target):
+        self.sock = None
+        self.path = None
+        if target.startswith('udp://'):
+            self.addr = parse_address(target)
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.path = target[7:] if target.startswith('file://') else target
+
+    def send(self, values):
+        message = ' '.join(f'{k}={v:.6g}' for k, v in values.items())
+        if self.sock is not None:
+            self.sock.sendto(message.encode(), self.addr)
+        else:
+            with open(self.path, 'a') as af:
+                af.write(message + '\n')
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m xrdPlanner.follower',
+                                     description='Stream a motor scan to a position source, a stand-in for a control system.')
+    parser.add_argument('target', help='udp://host:port or a file path')
+    parser.add_argument('--scan', nargs=3, action='append', required=True, metavar=('PAR', 'START', 'STOP'),
+                        help=f'move PAR back and forth between START and STOP, PAR: {", ".join(FOLLOW_PARAMS)}, can be repeated')
+    parser.add_argument('--period', type=float, default=10, help='duration of one back and forth move [s], default 10')
+    parser.add_argument('--rate', type=float, default=100, help='messages per second, default 100')
+    parser.add_argument('--duration', type=float, default=None, help='stop after [s], default: run until interrupted')
+    args = parser.parse_args(argv)
+    scans = []
+    for p, start, stop in args.scan:
+        if p not in FOLLOW_PARAMS:
+            parser.error(f'--scan: unknown parameter {p}, choose from {", ".join(FOLLOW_PARAMS)}')
+        try:
+            scans.append((p, float(start), float(stop)))
+        except ValueError:
+            parser.error(f'--scan {p}: start and stop must be numbers')
+
+    sender = PositionSender(args.target)
+    t0 = time.monotonic()
+    sent = 0
+    try:
+        while args.duration is None or time.monotonic() - t0 < args.duration:
+            # triangle wave, 0 -> 1 -> 0 per period
+            f = 1 - abs(1 - 2 * (((time.monotonic() - t0) / args.period) % 1))
+            sender.send({p:start + (stop - start) * f for p, start, stop in scans})
+            sent += 1
+            time.sleep(1/args.rate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+    print(f'{sent} messages sent to {args.target}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
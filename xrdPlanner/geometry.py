@@ -0,0 +1,1146 @@
+import os
+import functools
+import threading
+from types import SimpleNamespace
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+try:
+    # optional, fused overlay kernels
+    import numexpr
+except ImportError:
+    numexpr = None
+
+####################
+#     GEOMETRY     #
+# QT-INDEPENDENT   #
+####################
+# Numerical kernels shared by the GUI (classes.py) and the
+# headless tools. Everything here is plain numpy and works
+# element-wise on scalars or on (broadcastable) arrays of
+# geometries, e.g. dist.shape == ener.shape == (n,).
+#
+# Conventions follow the MainWindow:
+#  - omega = -(tilt + rota) [rad]
+#  - pixel vector: [x - hoff, y + voff - tilt*dist, dist]
+#  - distances in [mm], energies in [keV], angles in [rad]
+
+# X-ray attenuation lengths z for Si and CdTe in meter [m] where z = ln(1/e)/mu
+# calculated in 1 keV steps from 1-150 keV
+# table values from Chantler (2000) https://doi.org/10.1063/1.1321055
+# calculated using the xraydb python module https://xraypy.github.io/XrayDB/
+ATT_LENGTHS = {'Si':[2.92336338e-06, 1.52940940e-06, 4.41817449e-06, 9.68094927e-06,
+                     1.81408951e-05, 3.02711037e-05, 4.66249577e-05, 6.77473199e-05,
+                     9.52638566e-05, 1.30549774e-04, 1.73447018e-04, 2.24595659e-04,
+                     2.84605387e-04, 3.54031165e-04, 4.33380209e-04, 5.23140541e-04,
+                     6.23712068e-04, 7.35455743e-04, 8.58680607e-04, 9.93585970e-04,
+                     1.14037836e-03, 1.29916870e-03, 1.46997950e-03, 1.65282867e-03,
+                     1.84755219e-03, 2.05413078e-03, 2.27435657e-03, 2.51166980e-03,
+                     2.76076718e-03, 3.02154479e-03, 3.29339416e-03, 3.57595496e-03,
+                     3.86839569e-03, 4.17070154e-03, 4.48147168e-03, 4.80065791e-03,
+                     5.12767462e-03, 5.46137164e-03, 5.80102998e-03, 6.15160747e-03,
+                     6.50892811e-03, 6.87076056e-03, 7.23575505e-03, 7.60377581e-03,
+                     7.97432820e-03, 8.34584473e-03, 8.71928990e-03, 9.09192353e-03,
+                     9.46569452e-03, 9.83772142e-03, 1.02072666e-02, 1.05776192e-02,
+                     1.09433726e-02, 1.13091543e-02, 1.16704952e-02, 1.20265003e-02,
+                     1.23811631e-02, 1.27324096e-02, 1.30769437e-02, 1.34176491e-02,
+                     1.37548957e-02, 1.40888666e-02, 1.44155703e-02, 1.47396457e-02,
+                     1.50576116e-02, 1.53688649e-02, 1.56783348e-02, 1.59792892e-02,
+                     1.62758741e-02, 1.65681895e-02, 1.68560238e-02, 1.71398554e-02,
+                     1.74122248e-02, 1.76875177e-02, 1.79512540e-02, 1.82145339e-02,
+                     1.84671438e-02, 1.87236452e-02, 1.89677703e-02, 1.92079643e-02,
+                     1.94519568e-02, 1.96857927e-02, 1.99143713e-02, 2.01393629e-02,
+                     2.03608585e-02, 2.05788754e-02, 2.07833706e-02, 2.09941098e-02,
+                     2.12017351e-02, 2.14014048e-02, 2.15968609e-02, 2.17951736e-02,
+                     2.19821326e-02, 2.21717840e-02, 2.23511828e-02, 2.25366433e-02,
+                     2.27091166e-02, 2.28903416e-02, 2.30570644e-02, 2.32331077e-02,
+                     2.33946370e-02, 2.35541564e-02, 2.37235475e-02, 2.38780490e-02,
+                     2.40302885e-02, 2.41803970e-02, 2.43399625e-02, 2.44882422e-02,
+                     2.46323882e-02, 2.47746094e-02, 2.49149003e-02, 2.50533840e-02,
+                     2.51901681e-02, 2.53252522e-02, 2.54586507e-02, 2.55903974e-02,
+                     2.57204103e-02, 2.58490340e-02, 2.59762024e-02, 2.61018936e-02,
+                     2.62261777e-02, 2.63492097e-02, 2.64707961e-02, 2.65910939e-02,
+                     2.67101422e-02, 2.68280390e-02, 2.69448830e-02, 2.70602934e-02,
+                     2.71637201e-02, 2.72706288e-02, 2.73828591e-02, 2.74939145e-02,
+                     2.76039513e-02, 2.77130685e-02, 2.78212863e-02, 2.79285825e-02,
+                     2.80224089e-02, 2.81218802e-02, 2.82264203e-02, 2.83300579e-02,
+                     2.84220811e-02, 2.85159760e-02, 2.86172018e-02, 2.87175212e-02,
+                     2.88171887e-02, 2.89147878e-02, 2.89995540e-02, 2.90922933e-02,
+                     2.91891453e-02, 2.92852862e-02],
+             'CdTe':[8.86140064e-08, 4.41597213e-07, 1.15951587e-06, 8.36374589e-07,
+                     8.36034310e-07, 1.32724815e-06, 1.97362567e-06, 2.79221097e-06,
+                     3.79736962e-06, 5.07172559e-06, 6.58646052e-06, 8.34536221e-06,
+                     1.03633319e-05, 1.26445947e-05, 1.51992203e-05, 1.80585164e-05,
+                     2.12380712e-05, 2.47559111e-05, 2.86220163e-05, 3.28393095e-05,
+                     3.74211141e-05, 4.23847110e-05, 4.77396937e-05, 5.34604046e-05,
+                     5.95357580e-05, 6.58583493e-05, 2.02635396e-05, 2.23180704e-05,
+                     2.45073128e-05, 2.68096054e-05, 2.92163420e-05, 1.99269432e-05,
+                     2.15332477e-05, 2.32726190e-05, 2.51068287e-05, 2.70499442e-05,
+                     2.90850735e-05, 3.12143579e-05, 3.34390888e-05, 3.57606328e-05,
+                     3.81810110e-05, 4.07109020e-05, 4.33566740e-05, 4.61081874e-05,
+                     4.89663832e-05, 5.19342068e-05, 5.50092594e-05, 5.81952784e-05,
+                     6.14950533e-05, 6.49069814e-05, 6.84326118e-05, 7.20745366e-05,
+                     7.58320671e-05, 7.97392476e-05, 8.37930712e-05, 8.79696403e-05,
+                     9.22722203e-05, 9.66991799e-05, 1.01254296e-04, 1.05935695e-04,
+                     1.10745003e-04, 1.15686534e-04, 1.20756232e-04, 1.25977939e-04,
+                     1.31365089e-04, 1.36890012e-04, 1.42551567e-04, 1.48351972e-04,
+                     1.54290824e-04, 1.60366939e-04, 1.66584684e-04, 1.72943591e-04,
+                     1.79440083e-04, 1.86083525e-04, 1.92866175e-04, 1.99789869e-04,
+                     2.06859516e-04, 2.14074597e-04, 2.21432043e-04, 2.28971821e-04,
+                     2.36785318e-04, 2.44789163e-04, 2.52956288e-04, 2.61270529e-04,
+                     2.69748772e-04, 2.78374465e-04, 2.87160014e-04, 2.96098601e-04,
+                     3.05197594e-04, 3.14457023e-04, 3.23869498e-04, 3.33440320e-04,
+                     3.43178015e-04, 3.53053462e-04, 3.63091886e-04, 3.73283283e-04,
+                     3.83651351e-04, 3.94156444e-04, 4.04836771e-04, 4.15653703e-04,
+                     4.26625960e-04, 4.37759844e-04, 4.49053794e-04, 4.60495597e-04,
+                     4.72077099e-04, 4.83837118e-04, 4.95744109e-04, 5.07781340e-04,
+                     5.19964672e-04, 5.32316813e-04, 5.44823489e-04, 5.57483665e-04,
+                     5.70297686e-04, 5.83249863e-04, 5.96338131e-04, 6.09594120e-04,
+                     6.23013435e-04, 6.36594830e-04, 6.50297249e-04, 6.64142222e-04,
+                     6.78147980e-04, 6.92282395e-04, 7.06561344e-04, 7.20987946e-04,
+                     7.35548731e-04, 7.50255560e-04, 7.65122247e-04, 7.80063756e-04,
+                     7.95147555e-04, 8.10396744e-04, 8.25793330e-04, 8.41276246e-04,
+                     8.56872987e-04, 8.72612687e-04, 8.88496254e-04, 9.04519016e-04,
+                     9.20619462e-04, 9.36881518e-04, 9.53292628e-04, 9.69782092e-04,
+                     9.86397315e-04, 1.00312754e-03, 1.01996070e-03, 1.03689757e-03,
+                     1.05395590e-03, 1.07113920e-03, 1.08845123e-03, 1.10583974e-03,
+                     1.12333211e-03, 1.14094222e-03]}
+
+def rot_100(a, cc=1):
+    """
+    Generate a rotation matrix for a rotation around the [100] axis.
+
+    Parameters:
+    a (float): The angle of rotation in radians.
+    cc (int, optional): Clockwise rotation if 1 (default), counterclockwise if 0.
+
+    Returns:
+    numpy.ndarray: A 3x3 rotation matrix.
+    """
+    #Omega in radians
+    ca = np.cos(a)
+    sa = np.sin(a)
+    if cc: sa = -sa
+    return np.array([[1,   0,  0],
+                     [0,  ca, sa],
+                     [0, -sa, ca]])
+
+def calc_det_dims(det, padding=0):
+    """
+    Half width and half height of the detector screen in mm,
+    the same extent the MainWindow uses for the plot (xdim, ydim).
+
+    Parameters:
+    det (Container): Detector parameters (hmp, vmp, hgp, vgp, cbh, pxs, hmn, vmn).
+    padding (float, optional): Padding of the detector screen (plo.plot_padding).
+
+    Returns:
+    tuple: xdim, ydim
+    """
+    xdim = (det.hmp * det.hmn + det.hgp * (det.hmn-1) + det.cbh)/2 * det.pxs + padding
+    ydim = (det.vmp * det.vmn + det.vgp * (det.vmn-1) + det.cbh)/2 * det.pxs + padding
+    return xdim, ydim
+
+def det_modules(det):
+    """
+    The module layout of the detector, as drawn by the MainWindow (build_detector).
+    The beam position is between the modules (even number of modules) or at the
+    center module (odd number of modules).
+
+    Parameters:
+    det (Container): Detector parameters (hmp, vmp, hgp, vgp, cbh, pxs, hmn, vmn).
+
+    Returns:
+    tuple: x, y (arrays) of the lower left module corners [mm] and the
+           module width, height [mm]. The modules are ordered column by column.
+    """
+    # pixel -> mm
+    _hms = det.hmp * det.pxs
+    _vms = det.vmp * det.pxs
+    _hgs = det.hgp * det.pxs
+    _vgs = det.vgp * det.pxs
+    _cbh = det.cbh * det.pxs
+    xs, ys = [], []
+    for i in range(-det.hmn//2+det.hmn%2, det.hmn-det.hmn//2):
+        for j in range(-det.vmn//2+det.vmn%2, det.vmn-det.vmn//2):
+            # - place modules along x (i) and y (j) keeping the gaps in mind ( + (det.hgp*det.pxs)/2)
+            # - the " - ((det.hmp+det.hgp*det.pxs)/2)" positions the origin (the beam) at the center of a module
+            #   and "det.hmn%2" makes sure this is only active for detectors with an odd number of modules
+            # - define sets of panels that collectively move to realize a central hole offset for MPCCD detectors
+            #   that are used at SACLA/SPring-8:
+            #   x = (...) + (det.cbh/2)*(2*(j&det.vmn)//det.vmn-1)
+            #   y = (...) + (det.cbh/2)*(1-2*(i&det.hmn)//det.hmn)
+            # - negative values of det.cbh for 'clockwise' offset order
+            xs.append(i * (_hms + _hgs) \
+                      - ((_hms + _hgs)/2) * (det.hmn % 2) \
+                      + (_hgs)/2 \
+                      + (_cbh/2) * (2*(j & det.vmn) // det.vmn-1))
+            ys.append(j * (_vms + _vgs) \
+                      - ((_vms + _vgs)/2) * (det.vmn%2) \
+                      + (_vgs/2) \
+                      + (_cbh/2) * (1-2*(i & det.hmn) // det.hmn))
+    return np.array(xs), np.array(ys), _hms, _vms
+
+def det_module_index(det, x, y):
+    """
+    Index of the module (see det_modules) at screen
+    coordinates x, y [mm], -1 in a gap or off the modules.
+    """
+    x0, y0, w, h = det_modules(det)
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    shape = x.shape
+    # flat, scalars included
+    x, y = x.ravel(), y.ravel()
+    idx = np.full(x.shape, -1, dtype=np.int32)
+    if det.cbh == 0:
+        # regular grid, bisect the columns and rows
+        cols = np.unique(x0)
+        rows = np.unique(y0)
+        ix = np.searchsorted(cols, x, side='right') - 1
+        iy = np.searchsorted(rows, y, side='right') - 1
+        inside = (ix >= 0) & (iy >= 0)
+        inside[inside] = (x[inside] < cols[ix[inside]] + w) & (y[inside] < rows[iy[inside]] + h)
+        idx[inside] = ix[inside] * len(rows) + iy[inside]
+    else:
+        # the central hole shifts the modules, few modules
+        for m in range(len(x0)):
+            idx[(x >= x0[m]) & (x < x0[m] + w) & (y >= y0[m]) & (y < y0[m] + h)] = m
+    return idx.reshape(shape)
+
+def calc_bs_theta(bssz, bsdx):
+    """
+    Scattering angle covered by the beamstop, uses the
+    same expression as the beamstop conic of the MainWindow.
+
+    Parameters:
+    bssz (float): Beamstop size [mm], None or 'None' for no beamstop.
+    bsdx (float): Beamstop distance [mm].
+
+    Returns:
+    float or array: beamstop angle in radians, 0 if there is no beamstop.
+    """
+    if not bssz or (isinstance(bssz, str) and bssz.lower() == 'none'):
+        return np.zeros(np.shape(bsdx))
+    return np.tan((float(bssz)/2) / np.asarray(bsdx, dtype=float))
+
+def calc_dsp(tth, ener):
+    """
+    Convert 2-theta [rad] to d-spacing [A] at energy ener [keV].
+    """
+    return (12.398/ener) / (2*np.sin(np.asarray(tth)/2))
+
+def cell_dsp(cell, hkl):
+    """
+    d-spacings of reflections of a unit cell.
+
+    Parameters:
+    cell (list): Unit cell [a, b, c, alpha, beta, gamma], [A] and [deg].
+    hkl (array): Reflections, n x 3.
+
+    Returns:
+    array: d-spacings [A], inf for (0, 0, 0).
+    """
+    a, b, c = np.asarray(cell[:3], dtype=float)
+    ca, cb, cg = np.cos(np.deg2rad(np.asarray(cell[3:6], dtype=float)))
+    # metric tensor of the direct lattice, its inverse is the reciprocal one
+    G = np.array([[a*a,    a*b*cg, a*c*cb],
+                  [a*b*cg, b*b,    b*c*ca],
+                  [a*c*cb, b*c*ca, c*c   ]])
+    hkl = np.atleast_2d(np.asarray(hkl, dtype=float))
+    with np.errstate(divide='ignore'):
+        return 1/np.sqrt(np.einsum('ni,ij,nj->n', hkl, np.linalg.inv(G), hkl))
+
+def calc_unit(tth, ener, unit):
+    """
+    Convert 2-theta [rad] to the unit of the contour labels (geo.unit).
+
+    Parameters:
+    tth (float or array): 2-theta [rad].
+    ener (float): Beam energy [keV].
+    unit (int): 0: 2-theta [deg]
+                1: d-spacing [A]
+                2: q-space, 4pi sin(theta)/lambda [1/A]
+                3: sin(theta)/lambda [1/A]
+                4: ptycho pixel size [nm]
+
+    Returns:
+    float or array: tth in the given unit.
+    """
+    if unit == 0:
+        return np.rad2deg(tth)
+    # Conversion factor keV to Angstrom: 12.398
+    # sin(t)/l: np.sin(Theta) / lambda -> (12.398/geo_energy)
+    stl = np.sin(np.asarray(tth)/2)/(12.398/ener)
+    if unit == 2:
+        return stl*4*np.pi
+    if unit == 3:
+        return stl
+    # d-spacing: l = 2 d sin(t) -> 1/2(sin(t)/l)
+    dsp = 1/(2*stl)
+    if unit == 4:
+        return 0.5*0.1*dsp
+    return dsp
+
+def dsp2tth(dsp, ener):
+    """
+    Converts d-spacing to 2-theta
+     uses arcsin -> restricted to
+     the interval -pi/2 - pi/2
+    
+    Returns
+    -------
+      np.arr, np.arr: tth values, valid indices
+    """
+    lambda_2d = (12.398/ener) / (2*np.atleast_1d(dsp))
+    idx = np.nonzero(lambda_2d < 1)
+    tth = 2 * np.arcsin(lambda_2d[idx])
+    return tth, idx
+
+def _rotated_corners(xdim, ydim, dist, voff, hoff, rota, tilt, scale=1.0):
+    """
+    Corners of the detector screen in the rotated (lab) frame.
+    The corners are ordered such that consecutive corners
+    share an edge: (-x,-y), (x,-y), (x,y), (-x,y).
+
+    Returns
+    -------
+    array, 3 x ... x 4
+    """
+    dist, voff, hoff, rota, tilt = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (dist, voff, hoff, rota, tilt)])
+    _gx = np.array([-1, 1, 1, -1]) * xdim * scale
+    _gy = np.array([-1, -1, 1, 1]) * ydim * scale
+    # build vector -> ... x 4
+    _v0 = _gx - hoff[..., None]
+    # Compensate for vertical offset and PONI offset caused by the tilt (sdd*tilt)
+    _v1 = _gy + (voff - np.deg2rad(tilt) * dist)[..., None]
+    _v2 = np.broadcast_to(dist[..., None], _v0.shape)
+    # apply combined rotation and tilt, see rot_100
+    _omega = -np.deg2rad(tilt + rota)[..., None]
+    _ca = np.cos(_omega)
+    _sa = np.sin(_omega)
+    return np.stack([_v0, _ca*_v1 - _sa*_v2, _sa*_v1 + _ca*_v2])
+
+def calc_tth_corners(xdim, ydim, dist, voff, hoff, rota, tilt, scale=1.0):
+    """
+    2-theta angles of the four detector corners, ordered
+    (-x,-y), (x,-y), (x,y), (-x,y) along the last axis.
+    All geometry parameters broadcast against each other.
+
+    Returns
+    -------
+    array, ... x 4, 2-theta in radians
+    """
+    _res = _rotated_corners(xdim, ydim, dist, voff, hoff, rota, tilt, scale)
+    # Distance POBI - pixel on grid
+    R_a = np.sqrt(_res[0]**2 + _res[1]**2)
+    # POBI distance
+    D_a = _res[2]
+    # 2theta - Angle between pixel, sample, and POBI
+    return np.arctan2(R_a, D_a)
+
+def calc_tth_max(xdim, ydim, dist, voff, hoff, rota, tilt, scale=1.0):
+    """
+    Calculate the maximum 2theta angle for the given geometry
+     - the 2-theta angle is quasi-convex on the detector plane,
+       the maximum is found at one of the corners
+     - scale is a multiplier used to shrink the detector
+       to keep the maximum resolution conic visible
+    
+    Returns
+    -------
+    float or array, maximum 2-theta in radians
+    """
+    return calc_tth_corners(xdim, ydim, dist, voff, hoff, rota, tilt, scale).max(axis=-1)
+
+def calc_tth_min(xdim, ydim, dist, voff, hoff, rota, tilt, scale=1.0):
+    """
+    Calculate the minimum 2theta angle on the detector screen
+     - zero if the beam center is on the screen
+     - otherwise the minimum is on one of the edges, the
+       closest point along an edge is found analytically
+    
+    Returns
+    -------
+    float or array, minimum 2-theta in radians
+    """
+    _res = _rotated_corners(xdim, ydim, dist, voff, hoff, rota, tilt, scale)
+    # edges: p(s) = p0 + s*e, s in [0, 1]
+    p0 = _res
+    e = np.roll(_res, -1, axis=-1) - _res
+    # maximise cos(2theta) = p_z/|p| along the edge
+    # d/ds = 0 -> s = (a*q1 - c*q0) / (c*q1 - a*q2)
+    a = p0[2]
+    c = e[2]
+    q0 = np.sum(p0**2, axis=0)
+    q1 = np.sum(p0*e, axis=0)
+    q2 = np.sum(e**2, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (a*q1 - c*q0) / (c*q1 - a*q2)
+    s = np.clip(np.nan_to_num(s, nan=0.0, posinf=0.0, neginf=0.0), 0, 1)
+    p = p0 + s*e
+    tth = np.arctan2(np.sqrt(p[0]**2 + p[1]**2), p[2]).min(axis=-1)
+    # beam center on screen
+    dist, voff, hoff, rota, tilt = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (dist, voff, hoff, rota, tilt)])
+    _omega = -np.deg2rad(tilt + rota)
+    bc_x = hoff
+    bc_y = -(voff - dist * np.tan(_omega) - np.deg2rad(tilt) * dist)
+    inside = (np.abs(bc_x) <= xdim*scale) & (np.abs(bc_y) <= ydim*scale)
+    return np.where(inside, 0.0, tth)
+
+class DetectorExtent(object):
+    """
+    Angular extent of the detector screen for one geometry.
+
+    Attributes:
+        tth_min (float): Minimum 2-theta on the screen [rad], 0 if the beam center is on the screen.
+        tth_max (float): Maximum 2-theta on the screen [rad].
+        tth_corners (tuple): 2-theta of the corners (-x,-y), (x,-y), (x,y), (-x,y) [rad].
+        bs_theta (float): Beamstop angle [rad], 0 if there is no beamstop.
+        scale (float): Scale applied to the screen dimensions.
+    """
+    __slots__ = ('tth_min', 'tth_max', 'tth_corners', 'bs_theta', 'scale')
+
+    def __init__(self, tth_min, tth_max, tth_corners, bs_theta, scale):
+        self.tth_min = tth_min
+        self.tth_max = tth_max
+        self.tth_corners = tth_corners
+        self.bs_theta = bs_theta
+        self.scale = scale
+
+    def __repr__(self):
+        return (f'DetectorExtent(tth_min={np.rad2deg(self.tth_min):.3f}, tth_max={np.rad2deg(self.tth_max):.3f}, '
+                f'bs_theta={np.rad2deg(self.bs_theta):.3f}, scale={self.scale})')
+
+@functools.lru_cache(maxsize=64)
+def get_extent(xdim, ydim, dist, voff, hoff, rota, tilt, bssz=None, bsdx=None, scale=1.0):
+    """
+    Memoized angular extent of the detector screen for a single geometry.
+    The record is shared between callers and must not be modified.
+
+    Parameters:
+    xdim, ydim (float): Detector screen half width/height [mm].
+    dist, voff, hoff (float): Geometry [mm].
+    rota, tilt (float): Geometry [deg].
+    bssz (float, optional): Beamstop size [mm], None or 'None' for no beamstop.
+    bsdx (float, optional): Beamstop distance [mm].
+    scale (float, optional): Scale applied to the screen dimensions, default 1.0.
+
+    Returns:
+    DetectorExtent
+    """
+    corners = calc_tth_corners(xdim, ydim, dist, voff, hoff, rota, tilt, scale)
+    tth_min = calc_tth_min(xdim, ydim, dist, voff, hoff, rota, tilt, scale)
+    bs_theta = calc_bs_theta(bssz, bsdx) if bsdx else 0.0
+    return DetectorExtent(tth_min=float(tth_min),
+                          tth_max=float(corners.max()),
+                          tth_corners=tuple(float(c) for c in corners),
+                          bs_theta=float(bs_theta),
+                          scale=scale)
+
+# margin to slightly extend conics outside of the visible area
+CONIC_MARGIN = 1.05
+# number of pilot samples per interval for the adaptive sampling
+CONIC_PILOT = 64
+
+def conic_params(omega, theta, dist, voff, hoff, tilt):
+    """
+    Parameterise the conic section formed by the intersection
+    of the detector plane and the cone of 2-theta angle theta.
+
+    Parameters:
+    omega (float): Combined rotation and tilt, -(tilt + rota) [rad].
+    theta (float): 2-theta angle of the cone [rad].
+    dist, voff, hoff (float): Detector distance and offsets [mm].
+    tilt (float): Detector tilt [deg].
+
+    Returns:
+    dict or None: 'type' ('circle', 'ellipse', 'parabola', 'hyperbola' or 'line')
+                  and the parameters of x(t), y(t), see conic_xy.
+                  None if the conic can't be drawn.
+    """
+    # skip drawing smaller/larger +-90 deg contours
+    # reject overlap of the 'backscattering'
+    # -> limitation of the current implementation
+    if theta > np.pi/2 + abs(omega):
+        return None
+
+    # y axis offset of the cone center
+    dy_cone = dist * np.tan(omega)
+    # change in 'r', the length of the cones primary axis
+    dz_cone = np.sqrt(dist**2 + dy_cone**2)
+    # tilt is handled as a rotation but
+    # has its travel distance (y) reset.
+    comp_tilt = np.deg2rad(tilt) * dist
+    # eccentricity of the resulting conic section
+    ecc = np.round(np.cos(np.pi/2 - omega) / np.cos(theta), 10)
+    # y ('height') components/distances from central axis of the cone
+    # intersecting the detector plane and the distance to
+    # the y intersection of the conic section.
+    y1 = dz_cone * np.sin(theta) / np.cos(omega + theta)
+    y2 = dz_cone * np.sin(theta) / np.cos(omega - theta)
+
+    # add x/y offsets
+    # revert tilt rotation
+    y0 = dy_cone - voff + comp_tilt
+    x0 = hoff
+
+    if abs(ecc) == 0:
+        # x = x0 + w sin(t), y = yc + h cos(t)
+        h = (y1+y2)/2
+        return {'type':'circle', 'x0':x0, 'yc':y0 + (y1-y2)/2, 'w':h, 'h':h}
+    elif 0 < abs(ecc) < 1:
+        # x = x0 + w sin(t), y = yc + h cos(t)
+        w = dz_cone * np.sin(theta) * (y1+y2) / (2 * np.sqrt(y1*y2) * np.cos(theta))
+        return {'type':'ellipse', 'x0':x0, 'yc':y0 + (y1-y2)/2, 'w':w, 'h':(y1+y2)/2}
+    elif abs(ecc) == 1:
+        # x = x0 + a t, y = yc + a/2 t^2
+        yd = np.sign(ecc) * dist * np.tan(abs(omega) - theta)
+        a = np.sign(ecc) * dist * np.tan(theta)
+        return {'type':'parabola', 'x0':x0, 'yc':y0 - dy_cone + yd, 'a':a}
+    elif 1 < abs(ecc) < 100:
+        # x = x0 + w sinh(t), y = yc - h cosh(t)
+        h = np.sign(omega) * (y1+y2)/2
+        if h == 0:
+            return None
+        return {'type':'hyperbola', 'x0':x0, 'yc':y0 + (y1-y2)/2, 'w':h * np.sqrt(ecc**2-1), 'h':h}
+    # x = t, y = yc
+    return {'type':'line', 'x0':0.0, 'yc':y0 + y1}
+
+def conic_xy(par, t):
+    """
+    Evaluate the conic parameterised by conic_params at t.
+    """
+    if par['type'] in ['circle', 'ellipse']:
+        return par['x0'] + par['w'] * np.sin(t), par['yc'] + par['h'] * np.cos(t)
+    elif par['type'] == 'parabola':
+        return par['x0'] + par['a'] * t, par['yc'] + par['a']/2 * t**2
+    elif par['type'] == 'hyperbola':
+        return par['x0'] + par['w'] * np.sinh(t), par['yc'] - par['h'] * np.cosh(t)
+    return t, np.full(np.shape(t), par['yc'], dtype=float)
+
+def conic_curvature(par, t):
+    """
+    Returns |x'y'' - y'x''| and the speed |(x', y')| of the conic at t,
+    the curvature is |x'y'' - y'x''| / speed**3.
+    """
+    if par['type'] in ['circle', 'ellipse']:
+        dx, dy = par['w'] * np.cos(t), -par['h'] * np.sin(t)
+        ddx, ddy = -par['w'] * np.sin(t), -par['h'] * np.cos(t)
+    elif par['type'] == 'parabola':
+        dx, dy = np.full(np.shape(t), par['a'], dtype=float), par['a'] * t
+        ddx, ddy = np.zeros(np.shape(t)), np.full(np.shape(t), par['a'], dtype=float)
+    elif par['type'] == 'hyperbola':
+        dx, dy = par['w'] * np.cosh(t), -par['h'] * np.sinh(t)
+        ddx, ddy = par['w'] * np.sinh(t), -par['h'] * np.cosh(t)
+    else:
+        dx, dy = np.ones(np.shape(t)), np.zeros(np.shape(t))
+        ddx, ddy = np.zeros(np.shape(t)), np.zeros(np.shape(t))
+    return abs(dx*ddy - dy*ddx), np.hypot(dx, dy)
+
+def conic_domain(par, xlim):
+    """
+    The parameter range to draw the conic without clipping, the full
+    period of closed conics and the range -xlim < x < xlim otherwise.
+    Returns (t_min, t_max, periodic).
+    """
+    if par['type'] in ['circle', 'ellipse']:
+        return 0.0, 2*np.pi, True
+    if par['type'] == 'parabola':
+        t = np.array([-xlim - par['x0'], xlim - par['x0']]) / par['a']
+    elif par['type'] == 'hyperbola':
+        t = np.arcsinh(np.array([-xlim - par['x0'], xlim - par['x0']]) / par['w'])
+    else:
+        t = np.array([-xlim, xlim])
+    return t.min(), t.max(), False
+
+def conic_crossings(par, xlim, ylim):
+    """
+    Parameters t where the conic crosses the lines x = +-xlim and y = +-ylim.
+    """
+    t = []
+    if par['type'] in ['circle', 'ellipse']:
+        if par['w'] != 0:
+            s = np.array([-xlim - par['x0'], xlim - par['x0']]) / par['w']
+            s = s[abs(s) <= 1]
+            t += [np.arcsin(s), np.pi - np.arcsin(s)]
+        if par['h'] != 0:
+            c = np.array([-ylim - par['yc'], ylim - par['yc']]) / par['h']
+            c = c[abs(c) <= 1]
+            t += [np.arccos(c), -np.arccos(c)]
+    elif par['type'] == 'parabola':
+        q = 2 * np.array([-ylim - par['yc'], ylim - par['yc']]) / par['a']
+        q = q[q >= 0]
+        t += [np.sqrt(q), -np.sqrt(q)]
+    elif par['type'] == 'hyperbola':
+        c = np.array([par['yc'] + ylim, par['yc'] - ylim]) / par['h']
+        c = c[c >= 1]
+        t += [np.arccosh(c), -np.arccosh(c)]
+    if len(t) == 0:
+        return np.empty(0)
+    return np.concatenate(t)
+
+def conic_intervals(par, xlim, ylim):
+    """
+    Analytically clip the conic to the rectangle |x| <= xlim, |y| <= ylim.
+
+    Returns:
+    list: (t_start, t_stop) of the visible parameter intervals.
+    """
+    lo, hi, periodic = conic_domain(par, xlim)
+    t = conic_crossings(par, xlim, ylim)
+    if periodic:
+        t = np.mod(t, 2*np.pi)
+    t = np.unique(np.concatenate([[lo, hi], t[(t > lo) & (t < hi)]]))
+    # keep the segments between crossings that are inside
+    mid = (t[:-1] + t[1:]) / 2
+    x, y = conic_xy(par, mid)
+    inside = (abs(x) <= xlim) & (abs(y) <= ylim)
+    intervals = []
+    for start, stop, keep in zip(t[:-1], t[1:], inside):
+        if not keep:
+            continue
+        if len(intervals) > 0 and intervals[-1][1] == start:
+            intervals[-1] = (intervals[-1][0], stop)
+        else:
+            intervals.append((start, stop))
+    # join the intervals across the end of the period
+    if periodic and len(intervals) > 1 and intervals[0][0] == lo and intervals[-1][1] == hi:
+        first = intervals.pop(0)
+        intervals[-1] = (intervals[-1][0], first[1] + 2*np.pi)
+    return intervals
+
+def conic_sample(intervals, steps, par=None, tol=0):
+    """
+    Sample the parameter intervals, disjoint intervals are separated by NaN.
+
+    Parameters:
+    intervals (list): (t_start, t_stop) of the parameter intervals.
+    steps (int): (Maximum) number of samples.
+    par (dict, optional): Conic parameters (conic_params), needed if tol > 0.
+    tol (float, optional): Maximum distance between the conic and the
+                           sampled polyline, 0 samples uniformly in t.
+
+    The adaptive sampling places the points according to the curvature:
+    a chord of length L deviates L**2 * k / 8 from an arc of curvature k,
+    the number of points per unit t is therefore speed * sqrt(k / (8 tol)).
+    If that exceeds steps, the points are distributed the same way but
+    their number is limited to steps.
+    """
+    if tol > 0 and par is not None:
+        pilot, cumul = [], []
+        for start, stop in intervals:
+            t = np.linspace(start, stop, CONIC_PILOT)
+            cross, speed = conic_curvature(par, t)
+            density = np.sqrt(cross / (8 * tol * np.maximum(speed, 1e-12)))
+            pilot.append(t)
+            cumul.append(np.concatenate([[0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(t))]))
+        total = np.array([c[-1] for c in cumul])
+        num = np.ceil(total).astype(int) + 1
+        if num.sum() > steps:
+            num = np.round(steps * total / max(total.sum(), 1e-12)).astype(int)
+        num = np.maximum(2, num)
+        parts = []
+        for t, c, n in zip(pilot, cumul, num):
+            if len(parts) > 0:
+                parts.append([np.nan])
+            if c[-1] > 0:
+                parts.append(np.interp(np.linspace(0, c[-1], n), c, t))
+            else:
+                parts.append(np.linspace(t[0], t[-1], n))
+        return np.concatenate(parts)
+
+    lengths = np.array([stop - start for start, stop in intervals])
+    num = np.maximum(2, np.round(steps * lengths / lengths.sum())).astype(int)
+    parts = []
+    for (start, stop), n in zip(intervals, num):
+        if len(parts) > 0:
+            parts.append([np.nan])
+        parts.append(np.linspace(start, stop, n))
+    return np.concatenate(parts)
+
+def calc_conic(omega, theta, dist, voff, hoff, tilt, xdim, ydim, steps=100, clip=True, tol=0):
+    """
+    Calculate the conic section formed by the intersection of the detector plane and a cone.
+
+    Parameters:
+    omega (float): Combined rotation and tilt, -(tilt + rota) [rad].
+    theta (float): 2-theta angle of the cone [rad].
+    dist, voff, hoff (float): Detector distance and offsets [mm].
+    tilt (float): Detector tilt [deg].
+    xdim, ydim (float): Half width/height of the visible area [mm].
+    steps (int, optional): Number of samples (doubled for closed conics), default 100.
+    clip (bool, optional): Only sample the part of the conic that is inside the
+                           visible area (plus CONIC_MARGIN), disjoint parts are
+                           separated by NaN. Otherwise closed conics are sampled
+                           over the full period. Default True.
+    tol (float, optional): Curvature adaptive sampling with a maximum deviation
+                           of tol [mm], steps is then the maximum number of samples.
+                           Default 0, uniform sampling.
+
+    Returns:
+    tuple: (x, y) arrays, (False, False) if the conic is not visible.
+    """
+    par = conic_params(omega, theta, dist, voff, hoff, tilt)
+    if par is None:
+        return False, False
+    xlim = xdim * CONIC_MARGIN
+    ylim = ydim * CONIC_MARGIN
+    periodic = par['type'] in ['circle', 'ellipse']
+    if clip:
+        intervals = conic_intervals(par, xlim, ylim)
+    else:
+        lo, hi, _ = conic_domain(par, xlim)
+        intervals = [(lo, hi)]
+    if len(intervals) == 0:
+        return False, False
+    t = conic_sample(intervals, 2*steps if periodic else steps, par=par, tol=tol)
+    return conic_xy(par, t)
+
+# flags of project_reflections
+PROJ_MODULE = 0
+PROJ_GAP = 1
+PROJ_BEAMSTOP = 2
+PROJ_OFF = 3
+PROJ_UNREACHABLE = 4
+# azimuthal samples per ring of ring_coverage
+PROJ_AZI_STEPS = 3600
+
+def project_reflections(dsp, azi, ener, omega, dist, voff, hoff, tilt, det, bs_theta=0.0):
+    """
+    Projects reflections onto the detector screen, the inverse
+    of the 2-theta and azimuth maps of calc_overlays.
+
+    Parameters:
+    dsp (array): d-spacings [A].
+    azi (array): Azimuthal angles [rad] (as the azimuth map of calc_overlays),
+                 broadcast against dsp, e.g. dsp[:,None] and azi[None,:].
+    ener (float): Beam energy [keV].
+    omega (float): Combined rotation and tilt, -(tilt + rota) [rad].
+    dist, voff, hoff (float): Detector distance and offsets [mm].
+    tilt (float): Detector tilt [deg].
+    det (Container): Detector parameters, the module layout (see det_modules).
+    bs_theta (float, optional): Beamstop angle [rad], see calc_bs_theta. Default 0, no beamstop.
+
+    Returns:
+    dict: 'x', 'y': screen coordinates [mm], NaN if the detector plane is not hit
+          'tth': 2-theta [rad], NaN if not reachable
+          'module': index of the module that is hit (see det_modules), -1 if none
+          'flag': PROJ_MODULE, PROJ_GAP (gaps and the central hole),
+                  PROJ_BEAMSTOP, PROJ_OFF (off the modules) or PROJ_UNREACHABLE
+    """
+    dsp, azi = np.broadcast_arrays(np.asarray(dsp, dtype=float), np.asarray(azi, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lambda_2d = (12.398/ener) / (2*dsp)
+        reach = (dsp > 0) & (lambda_2d < 1)
+    tth = np.full(dsp.shape, np.nan)
+    tth[reach] = 2 * np.arcsin(lambda_2d[reach])
+    proj = project_angles(tth, azi, omega, dist, voff, hoff, tilt, det, bs_theta)
+    proj['flag'][~reach] = PROJ_UNREACHABLE
+    return proj
+
+def project_angles(tth, azi, omega, dist, voff, hoff, tilt, det, bs_theta=0.0):
+    """
+    Projects scattering directions (2-theta, azimuth) onto the detector
+    screen, see project_reflections. A NaN 2-theta is off the modules.
+    """
+    tth, azi = np.broadcast_arrays(np.asarray(tth, dtype=float), np.asarray(azi, dtype=float))
+    # scattered beam, inverts
+    # tth = atan2(hypot(r0, r1), r2) and azi = -atan2(r0, r1)
+    _sin = np.sin(tth)
+    u0 = -_sin * np.sin(azi)
+    u1 = _sin * np.cos(azi)
+    u2 = np.cos(tth)
+    # back to the detector frame, the rotation
+    # is orthogonal and keeps x (u0)
+    rot = rot_100(omega).T
+    v1 = rot[1,1] * u1 + rot[1,2] * u2
+    v2 = rot[2,1] * u1 + rot[2,2] * u2
+    # intersect the detector plane (z = dist)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(v2 > 0, dist / v2, np.nan)
+    x = u0 * scale + hoff
+    # revert vertical offset and tilt (see calc_overlays)
+    y = v1 * scale - voff + np.deg2rad(tilt) * dist
+
+    module = det_module_index(det, x, y)
+    x0, y0, w, h = det_modules(det)
+    with np.errstate(invalid='ignore'):
+        on = (x >= x0.min()) & (x < x0.max() + w) & (y >= y0.min()) & (y < y0.max() + h)
+        blocked = tth <= bs_theta
+    flag = np.full(tth.shape, PROJ_MODULE, dtype=np.uint8)
+    flag[module < 0] = PROJ_GAP
+    flag[~on] = PROJ_OFF
+    flag[blocked] = PROJ_BEAMSTOP
+    module[flag != PROJ_MODULE] = -1
+    return {'x':x, 'y':y, 'tth':tth, 'module':module, 'flag':flag}
+
+def ring_coverage(dsp, ener, omega, dist, voff, hoff, tilt, det, bs_theta=0.0, steps=PROJ_AZI_STEPS):
+    """
+    Fraction of the rings (uniform in azimuth) that lands on the modules,
+    gaps, the central hole and the beamstop excluded. Same parameters
+    as project_reflections, steps azimuthal samples per ring.
+
+    Returns:
+    array: coverage [0-1] per d-spacing.
+    """
+    dsp = np.atleast_1d(np.asarray(dsp, dtype=float))
+    azi = np.linspace(-np.pi, np.pi, steps, endpoint=False)
+    proj = project_reflections(dsp[:,None], azi[None,:], ener, omega, dist, voff, hoff, tilt, det, bs_theta)
+    return np.count_nonzero(proj['flag'] == PROJ_MODULE, axis=1) / steps
+
+# detector parameters of the module layout, see det_modules
+DET_LAYOUT = ('hmp', 'vmp', 'hgp', 'vgp', 'cbh', 'hmn', 'vmn', 'pxs')
+
+@functools.lru_cache(maxsize=16)
+def get_ring_coverage(dsp, ener, omega, dist, voff, hoff, tilt, layout, bs_theta=0.0, steps=PROJ_AZI_STEPS):
+    """
+    Memoized ring_coverage for a single geometry.
+    The array is shared between callers and read-only.
+
+    Parameters:
+    dsp (tuple): d-spacings [A].
+    layout (tuple): Detector parameters, see DET_LAYOUT.
+    Others, see ring_coverage.
+
+    Returns:
+    array: coverage [0-1] per d-spacing.
+    """
+    det = SimpleNamespace(**dict(zip(DET_LAYOUT, layout)))
+    cov = ring_coverage(np.array(dsp, dtype=float), ener, omega, dist, voff, hoff, tilt, det, bs_theta, steps)
+    cov.flags.writeable = False
+    return cov
+
+def calc_FWHM(dis, dia, thk, mat, pxs, tth, nrg, div, dEE, deg=True):
+    """
+    Calculate FWHM
+
+    Parameters
+    ----------
+    dis: poni distance
+    dia: sample scattering diameter
+    thk: detector sensor thickness
+    mat: detector sensor material
+    pix: detector pixel size
+    tth: 2-theta angle
+    nrg: X-ray energy
+    div: X-ray beam divergence
+    dEE: X-ray energy resolution
+    thk: detector sensor thickness
+    deg: return degrees (True) or radians (False)
+    
+    Returns
+    -------
+    array: fwhm
+    """
+    A, B, C, M = fwhm_terms(dis, dia, thk, mat, pxs, nrg, div, dEE)
+    M = M * ((1-np.cos(tth))/(1+np.cos(tth)))
+    X = np.cos(tth)
+    H2 = A*X**4 + B*X**2 + C + M
+    fwhm = np.sqrt(H2)
+    if deg is True:
+        return fwhm * 180 / np.pi
+    else:
+        return fwhm
+
+def fwhm_terms(dis, dia, thk, mat, pxs, nrg, div, dEE):
+    """
+    The 2-theta independent terms of calc_FWHM:
+    H2 = A*X**4 + B*X**2 + C + M*(1-X)/(1+X), X = cos(tth)
+    """
+    # the effective sensor thickness is limited by the attenuation length
+    _att = np.asarray(ATT_LENGTHS[mat])
+    _idx = np.asarray(nrg).astype(int)
+    thk = np.where(_idx < len(_att), np.minimum(thk, _att[np.clip(_idx, 0, len(_att)-1)]), thk)
+    A = 2*np.log(2) / dis**2 * (pxs**2-2*thk**2-dia**2)
+    B = 2*np.log(2) / dis**2 * (2*thk**2 + 2*dia**2)
+    C = 2*np.log(2) * div**2
+    M = (4*np.sqrt(2*np.log(2)) * dEE)**2
+    return A, B, C, M
+
+def overlay_shape(xdim, ydim, res, det=None):
+    """
+    Returns the (rows, columns) of the overlay grid, the aspect
+    follows the detector dimensions. If res is None or 0 the
+    detector pixel dimensions are used (det is needed).
+    """
+    if res is not None and res > 0:
+        return int(round(ydim/xdim * res, 0)), int(res)
+    cols = det.hmp * det.hmn + det.hgp * (det.hmn-1) + det.cbh
+    rows = det.vmp * det.vmn + det.vgp * (det.vmn-1) + det.cbh
+    return int(rows), int(cols)
+
+def _buffer(buf, key, shape):
+    # re-use the array buf[key] if it has the right shape
+    if buf is None:
+        return np.empty(shape)
+    if key not in buf or buf[key].shape != shape:
+        buf[key] = np.empty(shape)
+    return buf[key]
+
+# overlays with fewer pixels are calculated serially
+OVERLAY_PARALLEL_MIN = 2**16
+# number of row blocks per worker
+OVERLAY_BLOCKS = 4
+
+# thread pools, (name, workers): executor
+_pools = {}
+_pools_lock = threading.Lock()
+
+def overlay_pool(workers, name='overlay'):
+    """
+    Thread pool for the row blocks of calc_overlays. Every name
+    (e.g. 'qmap') and number of workers owns a separate pool that
+    is kept alive, a pool that was handed out is never shut down
+    (callers in other threads may use different numbers of workers).
+    """
+    with _pools_lock:
+        if (name, workers) not in _pools:
+            _pools[(name, workers)] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name}_{workers}')
+        return _pools[(name, workers)]
+
+def overlay_blocks(rows, cols, workers=1):
+    """
+    Splits rows into (start, stop) blocks for workers threads,
+    workers of None or 0 uses all CPUs.
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or rows * cols < OVERLAY_PARALLEL_MIN:
+        return [(0, rows)], 1
+    step = max(-(-rows // (workers * OVERLAY_BLOCKS)), 1)
+    return [(r, min(r + step, rows)) for r in range(0, rows, step)], workers
+
+def calc_overlays(omega, xdim, ydim, dist, voff, hoff, tilt, shape, pol=0.99,
+                  show_tth=True, show_azi=False, show_pol=True, show_sa=False, fwhm=None, buf=None, workers=1, fused=True):
+    """
+    Calculate the overlays for the detector grid.
+
+    Parameters:
+    omega (float): Combined rotation and tilt, -(tilt + rota) [rad].
+    xdim, ydim (float): Half width/height of the detector screen [mm].
+    dist, voff, hoff (float): Detector distance and offsets [mm].
+    tilt (float): Detector tilt [deg].
+    shape (tuple): (rows, columns) of the grid, see overlay_shape.
+    pol (float, optional): Horizontal polarisation factor, default 0.99.
+    show_tth, show_azi, show_pol, show_sa (bool, optional): Calculate the 2-theta,
+                           azimuth, polarisation and solid angle maps.
+    fwhm (dict, optional): Calculate the FWHM map, keys: dia, thk, mat, pxs [m],
+                           ener [keV], div and dEE, see calc_FWHM. Default None.
+    buf (dict, optional): Preallocated arrays that are re-used (and filled) if
+                          their shape matches. The returned maps are views into
+                          buf and are overwritten by the next call with the same buf.
+    workers (int, optional): Number of threads, the grid is split into row blocks
+                             that are evaluated in parallel, None or 0 uses all CPUs.
+                             Default 1.
+    fused (bool, optional): Use the fused kernels (overlay_fused) if numexpr
+                            is installed, default True.
+
+    Returns:
+    tuple: grd, tth, azi, pc, sa, fwhm
+           - grd: neutral overlay grid (ones)
+           - tth: 2-theta [rad], 1.0 if not calculated
+           - azi: azimuthal angle [rad], None if not calculated
+           - pc: polarisation correction, 1.0 if not calculated
+           - sa: solid angle correction, 1.0 if not calculated
+           - fwhm: FWHM [deg], 1.0 if not calculated
+    """
+    if fused and numexpr is not None:
+        return overlay_fused(omega, xdim, ydim, dist, voff, hoff, tilt, shape, pol=pol,
+                             show_tth=show_tth, show_azi=show_azi, show_pol=show_pol,
+                             show_sa=show_sa, fwhm=fwhm, buf=buf, workers=workers)
+    rows, cols = shape
+    # neutral overlay grid
+    grd = _buffer(buf, 'grd', shape)
+    grd.fill(1.0)
+
+    # make screen grid
+    size_h = np.linspace(-xdim, xdim, cols, endpoint=False)
+    size_v = np.linspace(-ydim, ydim, rows, endpoint=False)
+    # omega is the combination of rotation and tilt, in radians
+    rot = rot_100(omega)
+    # vector -> 3 x n x m, rotated vector res
+    vec = _buffer(buf, 'vec', (3, rows, cols))
+    res = _buffer(buf, 'res', (3, rows, cols))
+    # the output maps, filled block by block
+    tth = _buffer(buf, 'tth', shape) if show_tth else 1.0
+    azi = _buffer(buf, 'azi', shape) if show_tth and show_azi else None
+    pc = _buffer(buf, 'pc', shape) if show_pol else 1.0
+    if show_pol:
+        tmp = _buffer(buf, 'tmp', shape)
+        mag = _buffer(buf, 'mag', shape)
+    sa = _buffer(buf, 'sa', shape) if show_sa else 1.0
+    H = _buffer(buf, 'fwhm', shape) if fwhm is not None else 1.0
+
+    def block(rng):
+        r0, r1 = rng
+        _vec = vec[:, r0:r1]
+        _res = res[:, r0:r1]
+        _vec[0] = size_h[None, :] - hoff
+        # Compensate for vertical offset and PONI offset caused by the tilt (sdd*tilt)
+        _vec[1] = size_v[r0:r1, None] + voff - np.deg2rad(tilt) * dist
+        _vec[2] = dist
+        # _rot: 3 x 3 @ _vec: 3 x n*m -> _res: 3 x n x m
+        np.matmul(rot, _vec.reshape(3, -1), out=_res.reshape(3, -1))
+
+        # unit hover
+        if show_tth:
+            # 2theta - Angle between pixel, sample, and POBI
+            # atan(distance POBI - pixel / POBI distance)
+            _tth = tth[r0:r1]
+            np.hypot(_res[0], _res[1], out=_tth)
+            np.arctan2(_tth, _res[2], out=_tth)
+            # remove very small values (tth < 0.057 deg) to avoid zero divide
+            _tth[_tth < 1e-3] = np.nan
+            if show_azi:
+                # calculate the azimuthal angle eta
+                _azi = azi[r0:r1]
+                np.arctan2(_res[0], _res[1], out=_azi)
+                np.negative(_azi, out=_azi)
+
+        # polarisation
+        if show_pol:
+            # this notation is equivalent to cos(psi)**2,
+            # psi angle of polarization direction to the observer
+            # res / |res| is direct cos(psi)
+            _pc, _tmp, _mag = pc[r0:r1], tmp[r0:r1], mag[r0:r1]
+            np.square(_res[0], out=_pc)
+            np.square(_res[1], out=_tmp)
+            np.add(_pc, _tmp, out=_mag)
+            _mag += np.square(_res[2])
+            # add pol fractions (-> 1.0)
+            _pc *= pol
+            _tmp *= (1-pol)
+            _pc += _tmp
+            _pc /= _mag
+            np.subtract(1.0, _pc, out=_pc)
+
+        # solid angle, normalised after all blocks are done
+        if show_sa:
+            _sa = sa[r0:r1]
+            np.square(_vec[0], out=_sa)
+            _sa += np.square(_vec[1])
+            _sa += dist**2
+            np.power(_sa, -1.5, out=_sa)
+
+        # delta d / d
+        if fwhm is not None:
+            # use the "unrotated" vector coordinates to define
+            # R and D in the detector plane
+            # radial component of the unrotated detector
+            # i.e. radius away from the PONI
+            # 2theta-alpha - Angle between pixel, sample, and PONI
+            tth_a = np.arctan2(np.hypot(_vec[0], _vec[1]), dist)
+            # remove very small values (tth < 0.057 deg) to avoid zero divide
+            tth_a[tth_a < 1e-3] = np.nan
+            # H2, FWHM
+            H[r0:r1] = calc_FWHM(dist * 1e-3, fwhm['dia'], fwhm['thk'], fwhm['mat'], fwhm['pxs'],
+                                 tth_a, fwhm['ener'], fwhm['div'], fwhm['dEE'])
+
+    blocks, workers = overlay_blocks(rows, cols, workers)
+    if workers > 1:
+        # numpy releases the GIL, the blocks write into
+        # disjoint rows of the shared output arrays
+        list(overlay_pool(workers).map(block, blocks))
+    else:
+        block(blocks[0])
+
+    if show_sa:
+        sa /= sa.max()
+
+    return grd, tth, azi, pc, sa, H
+
+def overlay_fused(omega, xdim, ydim, dist, voff, hoff, tilt, shape, pol=0.99,
+                  show_tth=True, show_azi=False, show_pol=True, show_sa=False, fwhm=None, buf=None, workers=1):
+    """
+    Fused (numexpr) kernels for calc_overlays, same parameters and returns.
+
+    Every map is evaluated in a single pass from the pixel row and column
+    coordinates (broadcast), the rotated vectors and the intermediate
+    squares and norms are never stored. numexpr splits the evaluation
+    across workers threads (None or 0 uses all CPUs).
+    The arctan2 is left to NumPy, which vectorizes it much better.
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    workers = min(workers, numexpr.MAX_THREADS)
+    if numexpr.get_num_threads() != workers:
+        numexpr.set_num_threads(workers)
+    rows, cols = shape
+    # neutral overlay grid
+    grd = _buffer(buf, 'grd', shape)
+    grd.fill(1.0)
+
+    # screen grid: h (1 x m), v (n x 1)
+    # Compensate for vertical offset and PONI offset caused by the tilt (sdd*tilt)
+    h = np.linspace(-xdim, xdim, cols, endpoint=False)[None, :] - hoff
+    v = np.linspace(-ydim, ydim, rows, endpoint=False)[:, None] + voff - np.deg2rad(tilt) * dist
+    # rotated vector components as expressions in h and v
+    rot = rot_100(omega)
+    var = {'h':h, 'v':v, 'd':float(dist), 'pol':float(pol)}
+    res = []
+    for i in range(3):
+        var.update({f'r{i}{j}':float(rot[i, j]) for j in range(3)})
+        res.append(f'(r{i}0*h + r{i}1*v + r{i}2*d)')
+    x, y, z = res
+
+    # unit hover
+    tth = 1.0
+    azi = None
+    if show_tth:
+        # 2theta - Angle between pixel, sample, and POBI
+        tth = _buffer(buf, 'tth', shape)
+        tmp = _buffer(buf, 'tmp', shape)
+        numexpr.evaluate(f'sqrt({x}**2 + {y}**2)', local_dict=var, out=tth)
+        numexpr.evaluate(z, local_dict=var, out=tmp)
+        np.arctan2(tth, tmp, out=tth)
+        # remove very small values (tth < 0.057 deg) to avoid zero divide
+        tth[tth < 1e-3] = np.nan
+        if show_azi:
+            # calculate the azimuthal angle eta = -arctan2(x, y)
+            azi = _buffer(buf, 'azi', shape)
+            mag = _buffer(buf, 'mag', shape)
+            numexpr.evaluate(f'-{x}', local_dict=var, out=tmp)
+            numexpr.evaluate(y, local_dict=var, out=mag)
+            np.arctan2(tmp, mag, out=azi)
+
+    # polarisation
+    pc = 1.0
+    if show_pol:
+        # cos(psi)**2 with the pol fractions added (-> 1.0)
+        pc = _buffer(buf, 'pc', shape)
+        numexpr.evaluate(f'1 - (pol*{x}**2 + (1-pol)*{y}**2) / ({x}**2 + {y}**2 + {z}**2)',
+                         local_dict=var, out=pc)
+
+    # solid angle
+    sa = 1.0
+    if show_sa:
+        sa = _buffer(buf, 'sa', shape)
+        numexpr.evaluate('(h**2 + v**2 + d**2)**-1.5', local_dict=var, out=sa)
+        sa /= sa.max()
+
+    # delta d / d
+    H = 1.0
+    if fwhm is not None:
+        # 2theta-alpha - Angle between pixel, sample, and PONI
+        # of the "unrotated" detector
+        H = _buffer(buf, 'fwhm', shape)
+        A, B, C, M = fwhm_terms(dist * 1e-3, fwhm['dia'], fwhm['thk'], fwhm['mat'], fwhm['pxs'],
+                                fwhm['ener'], fwhm['div'], fwhm['dEE'])
+        var.update({'A':float(A), 'B':float(B), 'C':float(C), 'M':float(M), 'nan':np.nan,
+                    'lim':float((dist * np.tan(1e-3))**2)})
+        # X = cos(tth_a) = d / sqrt(h**2 + v**2 + d**2)
+        X = '(d / sqrt(h**2 + v**2 + d**2))'
+        # remove very small values (tth_a < 0.057 deg) to avoid zero divide
+        numexpr.evaluate(f'where(h**2 + v**2 < lim, nan, '
+                         f'sqrt(A*{X}**4 + B*{X}**2 + C + M*(1-{X})/(1+{X})) * {180/np.pi})',
+                         local_dict=var, out=H)
+
+    return grd, tth, azi, pc, sa, H
+
+def overlay_image(grd, pc, sa, buf=None):
+    """
+    The overlay image, product of the neutral grid and the corrections.
+    """
+    img = _buffer(buf, 'img', grd.shape)
+    np.multiply(grd, pc, out=img)
+    img *= sa
+    return img
@@ -0,0 +1,247 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from xrdPlanner import geometry
+
+#####################
+#     OPTIMIZER     #
+#  QT-INDEPENDENT   #
+#####################
+# Search the geometry (dist, ener, voff, rota) that reaches a target
+# resolution (d-min) while keeping a set of reflections on the screen,
+# outside of the beamstop shadow and separated by more than a given
+# multiple of their FWHM.
+#
+#  1. coarse grid search within the limits (lmt), fully vectorized,
+#     large grids are split into chunks and evaluated by a process pool
+#  2. local refinement of the best grid points on the slider step
+#     lattice (lmt.*_stp), a simple pattern search
+#  3. rank and return the best candidates
+#
+# The candidates are sorted by (violation, -separation, ddd):
+#  violation:  sum of the relative constraint violations, 0 if feasible
+#  separation: smallest peak separation in units of the FWHM
+#  ddd:        estimated resolution (delta d/d) at the target d-spacing
+
+# parameters that can be optimized, in this order
+OPT_PARAMS = ('dist', 'ener', 'voff', 'rota')
+# evaluate grids larger than this using the process pool
+OPT_POOL_MIN = 100000
+
+def evaluate_geometry(par, static):
+    """
+    Evaluate geometries, vectorized over the parameter arrays.
+
+    Parameters:
+    par (dict): 'dist', 'ener', 'voff', 'hoff', 'rota', 'tilt' and 'bsdx', broadcastable arrays.
+    static (dict): Geometry independent parameters
+                   - xdim, ydim: detector screen half width/height [mm]
+                   - pxs: pixel size [mm]
+                   - bssz: beamstop size [mm] or None
+                   - dsp_min: target d-spacing [A]
+                   - dsp_ref: reflections to keep resolved [A]
+                   - sep_min: minimum separation in units of the FWHM, 0: off
+                   - fwhm: dict, sensor thickness (thk) and material (mat),
+                           scattering diameter (dia), beam divergence (div)
+                           and energy resolution (dEE)
+
+    Returns:
+    dict: arrays of 'dmin', 'tth_max', 'tth_min', 'bs_theta', 'sep', 'ddd', 'violation'
+    """
+    dist, ener, voff, hoff, rota, tilt, bsdx = np.broadcast_arrays(*[np.asarray(par[k], dtype=float) for k in ('dist', 'ener', 'voff', 'hoff', 'rota', 'tilt', 'bsdx')])
+    xdim, ydim = static['xdim'], static['ydim']
+    fpar = static['fwhm']
+    # visible 2-theta range and resolution
+    tth_max = geometry.calc_tth_max(xdim, ydim, dist, voff, hoff, rota, tilt)
+    tth_min = geometry.calc_tth_min(xdim, ydim, dist, voff, hoff, rota, tilt)
+    dmin = geometry.calc_dsp(tth_max, ener)
+    # the beamstop can't be further away than the detector
+    bs_theta = geometry.calc_bs_theta(static['bssz'], np.minimum(bsdx, dist))
+    # resolution at the target d-spacing
+    lambda_2d = np.clip((12.398/ener) / (2*static['dsp_min']), 0, 1)
+    tth_tar = 2 * np.arcsin(lambda_2d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fwhm_tar = geometry.calc_FWHM(dist*1e-3, fpar['dia'], fpar['thk'], fpar['mat'], static['pxs']*1e-3,
+                                      tth_tar, ener, fpar['div'], fpar['dEE'], deg=False)
+        # delta d/d = delta 2theta / (2 tan(theta))
+        ddd = fwhm_tar / (2*np.tan(tth_tar/2))
+    # violation of the target resolution
+    violation = np.maximum(dmin - static['dsp_min'], 0) / static['dsp_min']
+
+    sep = np.full(dist.shape, np.inf)
+    dsp = static['dsp_ref']
+    if len(dsp) > 0:
+        # reflections -> ... x n
+        lambda_2d = (12.398/ener)[..., None] / (2*dsp)
+        tth = 2 * np.arcsin(np.clip(lambda_2d, 0, 1))
+        valid = lambda_2d < 1
+        # reflections in the beamstop shadow or off the screen
+        lost = ~valid | (tth <= bs_theta[..., None]) | (tth < tth_min[..., None]) | (tth > tth_max[..., None])
+        violation = violation + lost.sum(axis=-1) / len(dsp)
+        # separation of neighbouring reflections, dsp is sorted
+        # descending -> tth ascending
+        if len(dsp) > 1:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fwhm = geometry.calc_FWHM(dist[..., None]*1e-3, fpar['dia'], fpar['thk'], fpar['mat'], static['pxs']*1e-3,
+                                          tth, ener[..., None], fpar['div'], fpar['dEE'], deg=False)
+                ratio = np.diff(tth, axis=-1) / (0.5 * (fwhm[..., 1:] + fwhm[..., :-1]))
+            ratio = np.where(valid[..., 1:] & valid[..., :-1], ratio, np.inf)
+            sep = ratio.min(axis=-1)
+            # a minimum separation of 0 disables the constraint
+            if static['sep_min'] > 0:
+                violation = violation + np.maximum(static['sep_min'] - sep, 0) / static['sep_min']
+
+    return {'dmin':dmin,
+            'tth_max':tth_max,
+            'tth_min':tth_min,
+            'bs_theta':bs_theta,
+            'sep':sep,
+            'ddd':ddd,
+            'violation':violation}
+
+def _evaluate_chunk(args):
+    # unpack for the process pool map
+    return evaluate_geometry(*args)
+
+def _rank(res):
+    # sort by violation (ascending), separation (descending) and ddd (ascending)
+    return np.lexsort((res['ddd'], -res['sep'], res['violation']))
+
+def optimize_geometry(geo, det, lmt, dsp_min, dsp_ref=None, sep_min=2.0, fwhm=None,
+                      free=('dist', 'ener'), num=21, top=10, refine=True, processes=None, padding=0):
+    """
+    Find geometries that reach a target resolution while
+    keeping the given reflections resolved and visible.
+
+    Parameters:
+    geo (Container): Current geometry, provides the fixed parameters.
+    det (Container): Detector parameters.
+    lmt (Container): Geometry limits, *_min, *_max and *_stp.
+    dsp_min (float): Target d-spacing [A].
+    dsp_ref (array, optional): Reflections [A] to keep resolved, default None.
+    sep_min (float, optional): Minimum separation of reflections in units of the FWHM, default 2.0, 0 disables it.
+    fwhm (dict, optional): FWHM parameters (thk, mat, dia, div, dEE), defaults to a CdTe sensor.
+    free (tuple, optional): Parameters to optimize, subset of OPT_PARAMS.
+    num (int, optional): Number of grid points per free parameter, default 21.
+    top (int, optional): Number of candidates to return, default 10.
+    refine (bool, optional): Refine the best grid points on the step lattice, default True.
+    processes (int, optional): Number of processes for large grids, None uses all CPUs, 0 disables the pool.
+    padding (float, optional): Padding of the detector screen (plo.plot_padding).
+
+    Returns:
+    list: dicts, ranked candidate geometries with their figures of merit.
+    """
+    free = [p for p in OPT_PARAMS if p in free]
+    if fwhm is None:
+        fwhm = {'thk':1000e-6, 'mat':'CdTe', 'dia':100e-6, 'div':10e-6, 'dEE':1.4e-4}
+    if dsp_ref is None:
+        dsp_ref = []
+    # unique reflections, sorted descending in d (ascending in 2-theta)
+    # equal d-spacings can't be resolved and are merged
+    dsp_ref = np.unique(np.round(np.asarray(dsp_ref, dtype=float), 4))[::-1]
+    dsp_ref = dsp_ref[dsp_ref >= dsp_min]
+    xdim, ydim = geometry.calc_det_dims(det, padding)
+    bssz = geo.bssz if not (isinstance(geo.bssz, str) and geo.bssz.lower() == 'none') else None
+    static = {'xdim':xdim, 'ydim':ydim, 'pxs':det.pxs, 'bssz':bssz,
+              'dsp_min':dsp_min, 'dsp_ref':dsp_ref, 'sep_min':sep_min, 'fwhm':fwhm}
+    fixed = {'dist':geo.dist, 'ener':geo.ener, 'voff':geo.voff, 'hoff':geo.hoff,
+             'rota':geo.rota, 'tilt':geo.tilt, 'bsdx':geo.bsdx}
+
+    # limits and step lattice of the free parameters
+    lim = {p:(getattr(lmt, f'{p}_min'), getattr(lmt, f'{p}_max'), max(getattr(lmt, f'{p}_stp'), 1e-6)) for p in free}
+
+    def snap(p, val):
+        # snap values to the step lattice and the limits
+        lmin, lmax, stp = lim[p]
+        return np.clip(lmin + np.round((val - lmin) / stp) * stp, lmin, lmax)
+
+    def build(values):
+        # values: dict of free parameter arrays -> full parameter dict
+        par = dict(fixed)
+        par.update(values)
+        return par
+
+    ##############
+    # GRID STAGE #
+    ##############
+    axes = [np.unique(snap(p, np.linspace(lim[p][0], lim[p][1], num))) for p in free]
+    mesh = [m.ravel() for m in np.meshgrid(*axes, indexing='ij')]
+    grid = dict(zip(free, mesh))
+    size = mesh[0].size if mesh else 1
+    if processes != 0 and size >= OPT_POOL_MIN:
+        processes = processes or os.cpu_count() or 1
+        chunks = np.array_split(np.arange(size), processes * 4)
+        jobs = [(build({p:v[c] for p, v in grid.items()}), static) for c in chunks if c.size]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_evaluate_chunk, jobs))
+        res = {k:np.concatenate([np.broadcast_to(r[k], r['dmin'].shape) for r in parts]) for k in parts[0]}
+    else:
+        res = {k:np.broadcast_to(v, (size,)) for k, v in evaluate_geometry(build(grid), static).items()}
+
+    # keep the best grid points
+    order = _rank(res)[:max(top, 1) * 2]
+    cand = {p:grid[p][order] for p in free}
+
+    ################
+    # REFINE STAGE #
+    ################
+    # pattern search on the step lattice, all neighbours of all
+    # candidates are evaluated at once, the step size is halved
+    # until it reaches the slider step
+    if refine and free:
+        span = {p:max((axes[i][-1] - axes[i][0]) / max(len(axes[i]) - 1, 1), lim[p][2]) for i, p in enumerate(free)}
+        step = {p:span[p] / 2 for p in free}
+        cur = {p:cand[p].copy() for p in free}
+        cur_res = evaluate_geometry(build(cur), static)
+        cur_res = {k:np.array(np.broadcast_to(v, cur[free[0]].shape)) for k, v in cur_res.items()}
+        while any(step[p] >= lim[p][2] for p in free):
+            # n candidates x 2*len(free) neighbours
+            trial = {p:np.repeat(cur[p][:, None], 2 * len(free), axis=1) for p in free}
+            for i, p in enumerate(free):
+                trial[p][:, 2*i] = snap(p, cur[p] - step[p])
+                trial[p][:, 2*i+1] = snap(p, cur[p] + step[p])
+            t_res = evaluate_geometry(build(trial), static)
+            t_res = {k:np.broadcast_to(v, trial[free[0]].shape) for k, v in t_res.items()}
+            improved = False
+            for n in range(cur[free[0]].size):
+                # best neighbour of candidate n
+                best = _rank({k:v[n] for k, v in t_res.items()})[0]
+                a = (t_res['violation'][n, best], -t_res['sep'][n, best], t_res['ddd'][n, best])
+                b = (cur_res['violation'][n], -cur_res['sep'][n], cur_res['ddd'][n])
+                if a < b:
+                    for p in free:
+                        cur[p][n] = trial[p][n, best]
+                    for k in cur_res:
+                        cur_res[k][n] = t_res[k][n, best]
+                    improved = True
+            if not improved:
+                for p in free:
+                    step[p] /= 2
+        cand = cur
+        res = cur_res
+    else:
+        res = {k:v[order] for k, v in res.items()}
+
+    ##########
+    #  RANK  #
+    ##########
+    candidates = []
+    seen = set()
+    for n in _rank(res):
+        values = build({p:float(cand[p][n]) for p in free})
+        key = tuple(round(values[p], 6) for p in free)
+        if key in seen:
+            continue
+        seen.add(key)
+        values.update({'dmin':float(res['dmin'][n]),
+                       'tth_max':float(np.rad2deg(res['tth_max'][n])),
+                       'tth_min':float(np.rad2deg(res['tth_min'][n])),
+                       'bs_tth':float(np.rad2deg(res['bs_theta'][n])),
+                       'sep':float(res['sep'][n]),
+                       'ddd':float(res['ddd'][n]),
+                       'violation':float(res['violation'][n]),
+                       'feasible':bool(res['violation'][n] == 0)})
+        candidates.append(values)
+        if len(candidates) >= top:
+            break
+    return candidates
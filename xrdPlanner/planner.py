@@ -0,0 +1,517 @@
+import os
+import json
+import collections
+import numpy as np
+from xrdPlanner import geometry, defaults
+
+#####################
+#      PLANNER      #
+#  QT-INDEPENDENT   #
+#####################
+# Scripting interface with the state of the GUI, e.g. for beamline
+# control software that follows the motors without a window.
+#
+#  planner = Planner('settings/DanMAX_PXRD.json')
+#  planner.set_reference('LaB6')
+#  planner.set_geometry(dist=150, ener=25)
+#  tth, curves = planner.conics(reference=True)
+#
+# The state mirrors the MainWindow: geo, plo and lmt are the containers
+# of the settings file, det holds the detector parameters. The results
+# are NumPy arrays in the units of the GUI: screen coordinates in [mm],
+# 2-theta in [rad] and FWHM in [deg].
+#
+# Every result is cached (LRU) under the state it depends on, e.g. the
+# geometry conics don't depend on the energy, the overlays only if the
+# FWHM map is requested. Repeated calls for an unchanged state are free,
+# also after the state was changed and changed back. The cached arrays are shared
+# and read-only, copy them to modify.
+
+# number of cached results
+PLANNER_CACHE = 16
+# geometry parameters, see set_geometry
+PLANNER_GEO = ('ener', 'dist', 'voff', 'hoff', 'rota', 'tilt', 'bssz', 'bsdx', 'unit')
+# plot size [px] to convert plo.conic_tolerance to [mm] if plo.plot_size is 0 (auto)
+PLANNER_PLOT_SIZE = 800
+
+def cif_reflections(xtl, ener, int_min, num):
+    """
+    The strongest reflections of a crystal, as used for the reference contours.
+
+    Parameters:
+    xtl (Dans_Diffraction.Crystal): The crystal.
+    ener (float): Energy [keV] to calculate the intensities (plo.conic_ref_cif_kev).
+    int_min (float): Minimum intensity relative to the strongest reflection (plo.conic_ref_cif_int).
+    num (int): Maximum number of reflections (plo.conic_ref_num).
+
+    Returns:
+    tuple: d-spacings (array) and a list of (h, k, l, intensity, relative intensity),
+           sorted by decreasing intensity.
+    """
+    # :return xval: arrray : x-axis of powder scan (units)
+    # :return inten: array : intensity values at each point in x-axis
+    # :return reflections: (h, k, l, xval, intensity) array of reflection positions, grouped by min_overlap
+    xval, inten, reflections = xtl.Scatter.powder(scattering_type='xray', units='dspace', powder_average=True, min_overlap=0.02, energy_kev=ener)
+    # reject low intensities: based on median or mean?
+    # median is always around unity -> useless
+    # mean rejects many, add adjustable multiplicator?
+    used = reflections[reflections[:,4] > reflections[:,4].max() * int_min]
+    # sort by intensity -> ascending -> flip
+    ordered = used[used[:, 4].argsort()][::-1]
+    # pick the strongest
+    ordered = ordered[:num]
+    # cast hkl array to list of tuples (for easy display)
+    irel = ordered[:,4]/ordered[:,4].max()
+    return ordered[:,3], list(zip(ordered[:,0], ordered[:,1], ordered[:,2], ordered[:,4], irel))
+
+def reference_path(reference):
+    """
+    Path of a cif reference, a cif file or the name of a cif
+    known to the GUI (cif db of the home path), None if there is none.
+    """
+    if os.path.isfile(reference):
+        return reference
+    path_cif_db = os.path.join(defaults.get_path_home(), 'settings', 'cif_db.json')
+    if os.path.exists(path_cif_db):
+        with open(path_cif_db, 'r') as of:
+            path = json.load(of).get(reference, {}).get('cif')
+        if path is not None and os.path.isfile(path):
+            return path
+    return None
+
+def load_reference(reference, plo):
+    """
+    Loads a reference, a pyFAI calibrant, a cif file or the
+    name of a cif known to the GUI (cif db of the home path).
+
+    Parameters:
+    reference (str): The reference.
+    plo (Container): Plot settings, conic_ref_num and conic_ref_cif_*.
+
+    Returns:
+    tuple: name, d-spacings (array) and (h, k, l, intensity, relative intensity)
+           per d-spacing (cif) or None.
+
+    Raises:
+    ValueError: If the reference is unknown.
+    """
+    from pyFAI import calibrant
+    if reference in calibrant.names():
+        dsp = np.array(calibrant.get_calibrant(reference).get_dSpacing()[:plo.conic_ref_num])
+        return reference, dsp, None
+    path = reference_path(reference)
+    if path is None:
+        raise ValueError(f'Unknown reference "{reference}", not a pyFAI calibrant or cif file.')
+    import Dans_Diffraction as dif
+    dsp, hkl = cif_reflections(dif.Crystal(path), plo.conic_ref_cif_kev, plo.conic_ref_cif_int, plo.conic_ref_num)
+    return os.path.basename(path), dsp, hkl
+
+def _frozen(*arrays):
+    # cached arrays are shared, make them read-only
+    for a in arrays:
+        if isinstance(a, np.ndarray):
+            a.setflags(write=False)
+
+class Planner(object):
+    """
+    Geometry engine with the state of the GUI, no Qt involved.
+
+    Parameters:
+    settings (str, optional): Settings file (.json), default None uses the defaults.
+    detdb (str, optional): Detector db (.json), default detector_db.json in the xrdPlanner home path.
+    cache (int, optional): Number of cached results, 0 disables the cache. Default PLANNER_CACHE.
+
+    Attributes:
+    geo, plo, thm, lmt (Container): Settings, see the settings file documentation.
+    det (Container): Detector parameters.
+    xdim, ydim (float): Half width/height of the detector screen [mm].
+    ref_name (str): Name of the reference, 'None' if there is none.
+    ref_dsp (array): Reference d-spacings [A].
+    ref_hkl (list or None): (h, k, l, intensity, relative intensity) of the reference
+                            reflections (cif only), needed for pxrd().
+    """
+    def __init__(self, settings=None, detdb=None, cache=PLANNER_CACHE):
+        self.geo, self.plo, self.thm, self.lmt = defaults.load_settings(settings)
+        self.detector_db = defaults.load_det_library(detdb)
+        self.cache_size = cache
+        self._cache = collections.OrderedDict()
+        # counts the reference changes, part of the cache keys
+        self._ref_id = 0
+        self.set_detector()
+        try:
+            self.set_reference(self.geo.reference)
+        except ValueError as e:
+            print(f'WARNING: {e} Reference set to None.')
+            self.set_reference(None)
+
+    #############
+    #    SET    #
+    #############
+    def set_geometry(self, **kwargs):
+        """
+        Sets geometry parameters, e.g. set_geometry(dist=150, ener=25),
+        the others are left unchanged.
+
+        Parameters:
+        ener (float): Beam energy [keV].
+        dist, voff, hoff (float): Detector distance and offsets [mm].
+        rota, tilt (float): Detector rotation and tilt [deg].
+        bssz (float): Beamstop size [mm], None for no beamstop.
+        bsdx (float): Beamstop distance [mm], limited to the detector distance.
+        unit (int): Unit of the labels and of pxrd(), see geometry.calc_unit.
+
+        Returns:
+        Planner: self
+
+        Raises:
+        KeyError: If a parameter is unknown, nothing is changed.
+        """
+        for key in kwargs:
+            if key not in PLANNER_GEO:
+                raise KeyError(f'Unknown geometry parameter "{key}", choose from {", ".join(PLANNER_GEO)}.')
+        for key, val in kwargs.items():
+            if key == 'bssz':
+                val = 'None' if val is None or (isinstance(val, str) and val.lower() == 'none') else float(val)
+            elif key == 'unit':
+                val = int(val)
+            else:
+                val = float(val)
+            setattr(self.geo, key, val)
+        # the beamstop can't be further away than the detector
+        self.geo.bsdx = min(self.geo.bsdx, self.geo.dist)
+        return self
+
+    def set_detector(self, det_type=None, det_size=None):
+        """
+        Sets the detector, e.g. set_detector('PILATUS3', '2M').
+
+        Parameters:
+        det_type (str, optional): Detector type, default geo.det_type.
+        det_size (str, optional): Detector size, default geo.det_size.
+
+        Returns:
+        Planner: self
+
+        Raises:
+        ValueError: If the detector is not in the detector db.
+        """
+        det_type = self.geo.det_type if det_type is None else det_type
+        det_size = self.geo.det_size if det_size is None else det_size
+        if det_type not in self.detector_db or det_size not in self.detector_db[det_type]['size']:
+            raise ValueError(f'Unknown detector type/size combination: {det_type}/{det_size}.')
+        self.geo.det_type = det_type
+        self.geo.det_size = det_size
+        self.det = defaults.get_det_params(self.detector_db, det_type, det_size)
+        self.xdim, self.ydim = geometry.calc_det_dims(self.det, self.plo.plot_padding)
+        return self
+
+    def set_reference(self, reference=None, dsp=None, hkl=None):
+        """
+        Sets the reference rings.
+
+        Parameters:
+        reference (str, optional): pyFAI calibrant (e.g. 'LaB6'), path to a cif file,
+                                   name of a cif known to the GUI or None for no reference.
+                                   With dsp given, the name of the reference.
+        dsp (array, optional): d-spacings [A].
+        hkl (list, optional): (h, k, l, intensity, relative intensity) per d-spacing.
+
+        Returns:
+        Planner: self
+
+        Raises:
+        ValueError: If the reference is unknown.
+        """
+        if dsp is not None:
+            name = 'custom' if reference is None else str(reference)
+            dsp = np.asarray(dsp, dtype=float)
+            if hkl is not None and len(hkl) != len(dsp):
+                raise ValueError(f'Reference {name}: {len(hkl)} hkl for {len(dsp)} d-spacings.')
+        elif reference is None or (isinstance(reference, str) and reference.lower() == 'none'):
+            name = 'None'
+            dsp = np.empty(0)
+        else:
+            name, dsp, hkl = self._load_reference(reference)
+        self.ref_name = name
+        self.ref_dsp = dsp
+        self.ref_hkl = None if hkl is None else [tuple(h) for h in hkl]
+        self.geo.reference = name
+        self._ref_id += 1
+        return self
+
+    def _load_reference(self, reference):
+        return load_reference(reference, self.plo)
+
+    #############
+    #   CACHE   #
+    #############
+    def _cached(self, key, func):
+        # LRU cache of the results, keyed by the state they depend on
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        result = func()
+        if self.cache_size > 0:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def _key_det(self):
+        return (self.geo.det_type, self.geo.det_size, self.xdim, self.ydim)
+
+    def _key_geo(self):
+        # everything that moves the detector
+        return (float(self.geo.dist), float(self.geo.voff), float(self.geo.hoff), float(self.geo.rota), float(self.geo.tilt))
+
+    def _key_fwhm(self):
+        return (self.plo.scattering_diameter, self.plo.sensor_thickness, self.plo.sensor_material,
+                self.plo.beam_divergence, self.plo.energy_resolution, self.det.pxs)
+
+    #############
+    #  RESULTS  #
+    #############
+    def extent(self, scale=1.0):
+        """
+        The angular extent of the detector screen (minimum/maximum 2-theta,
+        the corners and the beamstop angle), see geometry.DetectorExtent.
+        """
+        return geometry.get_extent(float(self.xdim), float(self.ydim), *self._key_geo(),
+                                   bssz=self.geo.bssz, bsdx=float(self.geo.bsdx), scale=scale)
+
+    def ref_tth(self):
+        """
+        2-theta [rad] of the reference rings, NaN if the d-spacing is not reachable.
+        """
+        def calc():
+            tth = np.full(len(self.ref_dsp), np.nan)
+            with np.errstate(divide='ignore'):
+                lambda_2d = (12.398/self.geo.ener) / (2*self.ref_dsp)
+            valid = (self.ref_dsp > 0) & (lambda_2d < 1)
+            tth[valid] = 2 * np.arcsin(lambda_2d[valid])
+            _frozen(tth)
+            return tth
+        return self._cached(('ref_tth', self._ref_id, float(self.geo.ener)), calc)
+
+    def conics(self, reference=False, steps=None):
+        """
+        Conic sections on the detector screen.
+
+        Parameters:
+        reference (bool, optional): The reference rings (ref_dsp) instead of the
+                                    2-theta contours of the GUI (plo.conic_tth_*).
+        steps (int, optional): Number of samples per conic, default plo.conic_steps.
+
+        Returns:
+        tuple: tth (array, [rad]) and a list of (x, y) arrays [mm] per conic, None if the
+               conic is not on the screen. Disjoint parts are separated by NaN.
+        """
+        steps = self.plo.conic_steps if steps is None else int(steps)
+        plot_size = self.plo.plot_size if self.plo.plot_size > 0 else PLANNER_PLOT_SIZE
+        # tolerance: pixel -> mm
+        tol = self.plo.conic_tolerance * 2 * self.ydim / plot_size
+        if reference:
+            key = ('conics', self._key_det(), self._key_geo(), steps, tol, self._ref_id, float(self.geo.ener))
+        elif self.plo.conic_tth_auto:
+            key = ('conics', self._key_det(), self._key_geo(), steps, tol, self.plo.conic_tth_num)
+        else:
+            key = ('conics', self._key_det(), self._key_geo(), steps, tol, self.plo.conic_tth_num,
+                   self.plo.conic_tth_min, self.plo.conic_tth_max)
+
+        def calc():
+            if reference:
+                tth = self.ref_tth()
+            elif self.plo.conic_tth_auto:
+                theta_max = self.extent(scale=0.90).tth_max
+                tth = np.linspace(theta_max/self.plo.conic_tth_num, theta_max, self.plo.conic_tth_num)
+            else:
+                tth = np.deg2rad(np.linspace(self.plo.conic_tth_min, self.plo.conic_tth_max, self.plo.conic_tth_num))
+            omega = -np.deg2rad(self.geo.tilt + self.geo.rota)
+            curves = []
+            for theta in tth:
+                x, y = (False, False) if np.isnan(theta) else \
+                    geometry.calc_conic(omega, theta, self.geo.dist, self.geo.voff, self.geo.hoff, self.geo.tilt,
+                                        self.xdim, self.ydim, steps=steps, clip=True, tol=tol)
+                if x is False or x.size == 0:
+                    curves.append(None)
+                    continue
+                _frozen(x, y)
+                curves.append((x, y))
+            _frozen(tth)
+            return tth, curves
+        return self._cached(key, calc)
+
+    def beamstop(self, steps=None):
+        """
+        The beamstop shadow on the detector screen.
+
+        Returns:
+        tuple: (x, y) arrays [mm] of the closed contour, None if
+               there is no beamstop or it is not on the screen.
+        """
+        steps = self.plo.conic_steps if steps is None else int(steps)
+        bs_theta = self.extent().bs_theta
+
+        def calc():
+            if bs_theta <= 0:
+                return None
+            omega = -np.deg2rad(self.geo.tilt + self.geo.rota)
+            x, y = geometry.calc_conic(omega, bs_theta, self.geo.dist, self.geo.voff, self.geo.hoff, self.geo.tilt,
+                                       self.xdim, self.ydim, steps=steps, clip=False)
+            if x is False:
+                return None
+            _frozen(x, y)
+            return x, y
+        return self._cached(('beamstop', self._key_det(), self._key_geo(), bs_theta, steps), calc)
+
+    def overlays(self, res=None, tth=True, azi=False, pol=True, sa=True, fwhm=False):
+        """
+        Overlay maps of the detector screen, the grid spans
+        -xdim..xdim (columns) and -ydim..ydim (rows).
+
+        Parameters:
+        res (int, optional): Number of columns, default plo.overlay_resolution,
+                             0 uses the detector pixel dimensions.
+        tth, azi, pol, sa, fwhm (bool, optional): The maps to calculate: 2-theta [rad],
+                             azimuth [rad], polarisation and solid angle correction
+                             and FWHM [deg]. azi needs tth.
+
+        Returns:
+        dict: name ('tth', 'azi', 'pol', 'sa', 'fwhm'): 2d array, the requested maps.
+        """
+        res = self.plo.overlay_resolution if res is None else int(res)
+        shape = geometry.overlay_shape(self.xdim, self.ydim, res, self.det)
+        key = ('overlays', self._key_det(), self._key_geo(), shape, self.plo.polarisation_fac,
+               bool(tth), bool(tth and azi), bool(pol), bool(sa),
+               (float(self.geo.ener),) + self._key_fwhm() if fwhm else None)
+
+        def calc():
+            _fwhm = None
+            if fwhm:
+                _fwhm = {'dia':self.plo.scattering_diameter,
+                         'thk':self.plo.sensor_thickness,
+                         'mat':self.plo.sensor_material,
+                         'pxs':self.det.pxs * 1e-3,
+                         'ener':self.geo.ener,
+                         'div':self.plo.beam_divergence,
+                         'dEE':self.plo.energy_resolution}
+            _, _tth, _azi, _pc, _sa, _H = geometry.calc_overlays(-np.deg2rad(self.geo.tilt + self.geo.rota),
+                                                                 self.xdim, self.ydim, self.geo.dist,
+                                                                 self.geo.voff, self.geo.hoff, self.geo.tilt, shape,
+                                                                 pol=self.plo.polarisation_fac, show_tth=tth,
+                                                                 show_azi=tth and azi, show_pol=pol, show_sa=sa,
+                                                                 fwhm=_fwhm, workers=self.plo.overlay_workers)
+            maps = {'tth':_tth if tth else None,
+                    'azi':_azi if tth and azi else None,
+                    'pol':_pc if pol else None,
+                    'sa':_sa if sa else None,
+                    'fwhm':_H if fwhm else None}
+            maps = {k:v for k, v in maps.items() if v is not None}
+            _frozen(*maps.values())
+            return maps
+        return self._cached(key, calc)
+
+    def fwhm(self, tth=None):
+        """
+        Estimated FWHM [deg] (see instrumental broadening) of the current geometry.
+
+        Parameters:
+        tth (array, optional): 2-theta [rad], default the reference rings (ref_tth).
+
+        Returns:
+        array: FWHM [deg], NaN for unreachable reference rings.
+        """
+        def calc(_tth):
+            return geometry.calc_FWHM(self.geo.dist * 1e-3, self.plo.scattering_diameter, self.plo.sensor_thickness,
+                                      self.plo.sensor_material, self.det.pxs * 1e-3, _tth, self.geo.ener,
+                                      self.plo.beam_divergence, self.plo.energy_resolution, deg=True)
+        if tth is not None:
+            return calc(np.asarray(tth, dtype=float))
+
+        def calc_ref():
+            H = calc(self.ref_tth())
+            _frozen(H)
+            return H
+        return self._cached(('fwhm', self._ref_id, float(self.geo.dist), float(self.geo.ener)) + self._key_fwhm(), calc_ref)
+
+    def project(self, dsp, azi):
+        """
+        Projects reflections onto the detector screen, see geometry.project_reflections.
+
+        Parameters:
+        dsp (array): d-spacings [A].
+        azi (array): Azimuthal angles [rad], broadcast against dsp.
+
+        Returns:
+        dict: 'x', 'y' [mm], 'tth' [rad], 'module' and 'flag' (geometry.PROJ_*).
+        """
+        return geometry.project_reflections(dsp, azi, self.geo.ener, -np.deg2rad(self.geo.tilt + self.geo.rota),
+                                            self.geo.dist, self.geo.voff, self.geo.hoff, self.geo.tilt,
+                                            self.det, self.extent().bs_theta)
+
+    def coverage(self, steps=geometry.PROJ_AZI_STEPS):
+        """
+        Fraction of the reference rings that lands on the modules (gaps,
+        central hole and beamstop excluded), see geometry.ring_coverage.
+
+        Parameters:
+        steps (int, optional): Azimuthal samples per ring, default geometry.PROJ_AZI_STEPS.
+
+        Returns:
+        array: coverage [0-1] per reference ring (ref_dsp).
+        """
+        key = ('coverage', self._key_det(), self._key_geo(), self._ref_id, float(self.geo.ener), self.extent().bs_theta, steps)
+
+        def calc():
+            cov = geometry.ring_coverage(self.ref_dsp, self.geo.ener, -np.deg2rad(self.geo.tilt + self.geo.rota),
+                                         self.geo.dist, self.geo.voff, self.geo.hoff, self.geo.tilt,
+                                         self.det, self.extent().bs_theta, steps)
+            _frozen(cov)
+            return cov
+        return self._cached(key, calc)
+
+    def pxrd(self):
+        """
+        The estimated PXRD pattern of the reference (cif), the reflections are
+        gaussians with the estimated FWHM, see the PXRD pattern window.
+
+        Returns:
+        dict: 'x': positions within the visible range in geo.unit
+              'y': intensity [arb. units]
+              'peaks': reflection positions in geo.unit
+              'inten': reflection intensities
+              'hkl': h, k, l of the reflections (n x 3, int)
+              'visible': reflection is within the visible range (bool)
+
+        Raises:
+        ValueError: If the reference has no intensities (not a cif).
+        """
+        if self.ref_hkl is None or len(self.ref_dsp) == 0:
+            raise ValueError(f'The PXRD pattern needs the intensities of a cif reference, reference is {self.ref_name}.')
+        key = ('pxrd', self._key_det(), self._key_geo(), self._ref_id, float(self.geo.ener), self.geo.unit) + self._key_fwhm()
+
+        def calc():
+            peak_ttr, idx = geometry.dsp2tth(self.ref_dsp, self.geo.ener)
+            hkl = np.array(self.ref_hkl)
+            inten = hkl[:,4][idx]
+            fwhm = np.deg2rad(self.fwhm(peak_ttr))
+            # visible extent
+            extent = self.extent()
+            step = fwhm.mean()/10
+            ttr = np.arange(max(extent.tth_min, step), extent.tth_max, step)
+            # sigma = fwhm, as in the PXRD window
+            gauss = np.sum(1/(np.sqrt(2*np.pi)*fwhm[:,None])*np.exp(-np.square((ttr - peak_ttr[:,None])/fwhm[:,None])/2) * inten[:,None], axis=0)
+            xval = geometry.calc_unit(ttr, self.geo.ener, self.geo.unit)
+            peaks = geometry.calc_unit(peak_ttr, self.geo.ener, self.geo.unit)
+            result = {'x':xval,
+                      'y':gauss,
+                      'peaks':peaks,
+                      'inten':inten,
+                      'hkl':hkl[:,:3][idx].astype(int),
+                      'visible':(peak_ttr >= ttr.min()) & (peak_ttr <= ttr.max()) if ttr.size > 0 else np.zeros(peaks.shape, dtype=bool)}
+            _frozen(*result.values())
+            return result
+        return self._cached(key, calc)
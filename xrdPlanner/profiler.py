@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import collections
+import numpy as np
+
+#####################
+#     PROFILER      #
+#  QT-INDEPENDENT   #
+#####################
+# Frame-time instrumentation of the screen updates.
+#
+#  with profiler.frame('update_screen'):
+#      with profiler.stage('conics'):
+#          ...
+#
+# A frame collects the time spent in its stages, a stage that is
+# entered several times within a frame (e.g. per conic) adds up.
+# The last PROFILER_FRAMES frames are kept (rolling window) for the
+# statistics, the histogram and the export (json or Chrome trace,
+# chrome://tracing or https://ui.perfetto.dev).
+#
+# When disabled, frame() and stage() return a shared no-op context,
+# the overhead is one method call per stage.
+
+# number of frames to keep
+PROFILER_FRAMES = 600
+# histogram bin edges [ms], frame budgets of 120, 60, 30, 20 and 10 Hz
+PROFILER_BINS = (0, 8.3, 16.7, 33.3, 50, 100, 200, np.inf)
+
+class _Null:
+    # no-op context
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        return False
+
+_NULL = _Null()
+
+class _Stage:
+    def __init__(self, frame, name):
+        self.frame = frame
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.frame.add(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+class Frame:
+    """
+    Timings of one frame, start and durations in [s].
+    """
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+        self.total = 0.0
+        # stage: summed duration
+        self.stages = {}
+        # (stage, start, duration) for the trace
+        self.events = []
+
+    def add(self, name, start, duration):
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+        self.events.append((name, start, duration))
+
+    def __enter__(self):
+        self.profiler._frame = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.total = time.perf_counter() - self.start
+        self.profiler._frame = None
+        self.profiler.frames.append(self)
+        return False
+
+class FrameProfiler:
+    """
+    Rolling frame-time profiler, see module description.
+    """
+    def __init__(self, enabled=False, size=PROFILER_FRAMES):
+        self.enabled = enabled
+        self.frames = collections.deque(maxlen=size)
+        # (name, start, duration) of events outside of
+        # the frames, e.g. background calculations
+        self.records = collections.deque(maxlen=size)
+        self._frame = None
+
+    def frame(self, name='frame'):
+        """
+        Context of a frame, nested frames are part of the outer frame.
+        """
+        if not self.enabled or self._frame is not None:
+            return _NULL
+        return Frame(self, name)
+
+    def stage(self, name):
+        """
+        Context of a stage within the current frame.
+        """
+        if self._frame is None:
+            return _NULL
+        return _Stage(self._frame, name)
+
+    def record(self, name, start, duration):
+        """
+        Adds an event that is not part of a frame (perf_counter start and duration [s]).
+        """
+        if self.enabled:
+            self.records.append((name, start, duration))
+
+    def clear(self):
+        self.frames.clear()
+        self.records.clear()
+
+    def stage_names(self):
+        names = []
+        for f in self.frames:
+            names.extend(k for k in f.stages if k not in names)
+        return names
+
+    def summary(self):
+        """
+        Returns the statistics of the kept frames in [ms]:
+        {name: {'n', 'mean', 'p50', 'p95', 'max'}}, the frame
+        totals are listed as 'total'.
+        """
+        columns = {'total':[f.total for f in self.frames]}
+        for name in self.stage_names():
+            columns[name] = [f.stages[name] for f in self.frames if name in f.stages]
+        for name, _, duration in self.records:
+            columns.setdefault(name, []).append(duration)
+        stats = {}
+        for name, values in columns.items():
+            if len(values) == 0:
+                continue
+            ms = np.asarray(values) * 1e3
+            stats[name] = {'n':len(ms),
+                           'mean':float(ms.mean()),
+                           'p50':float(np.percentile(ms, 50)),
+                           'p95':float(np.percentile(ms, 95)),
+                           'max':float(ms.max())}
+        return stats
+
+    def histogram(self, bins=PROFILER_BINS):
+        """
+        Histogram of the frame totals, returns the counts and the bin edges [ms].
+        """
+        counts, edges = np.histogram([f.total * 1e3 for f in self.frames], bins=bins)
+        return counts, edges
+
+    def text(self):
+        """
+        Short report of the kept frames, e.g. for a debug overlay.
+        """
+        if len(self.frames) == 0:
+            return 'no frames'
+        stats = self.summary()
+        lines = [f'{"[ms]":<20} {"last":>6} {"mean":>6} {"p95":>6}']
+        # last values, the records are not part of the frames
+        last = dict(self.frames[-1].stages, total=self.frames[-1].total)
+        last.update({name:duration for name, _, duration in self.records})
+        for name, s in stats.items():
+            _last = last.get(name, 0.0)
+            lines.append(f'{name:<20} {_last*1e3:6.1f} {s["mean"]:6.1f} {s["p95"]:6.1f}')
+        counts, edges = self.histogram()
+        width = max(counts.max(), 1)
+        lines.append('')
+        for c, lo, hi in zip(counts, edges[:-1], edges[1:]):
+            _hi = f'{hi:.0f}' if np.isfinite(hi) else ''
+            lines.append(f'{lo:>4.0f}-{_hi:<4} {"#" * int(round(20 * c / width)):<20} {c}')
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        """
+        The kept frames, statistics and histogram, times in [ms].
+        """
+        counts, edges = self.histogram()
+        t0 = self._origin()
+        return {'frames':[{'name':f.name,
+                           'start':(f.start - t0) * 1e3,
+                           'total':f.total * 1e3,
+                           'stages':{k:v * 1e3 for k, v in f.stages.items()}} for f in self.frames],
+                'records':[{'name':name, 'start':(start - t0) * 1e3, 'duration':duration * 1e3}
+                           for name, start, duration in self.records],
+                'summary':self.summary(),
+                'histogram':{'edges':[float(e) if np.isfinite(e) else None for e in edges],
+                             'counts':counts.tolist()}}
+
+    def to_trace(self):
+        """
+        The kept frames in Chrome trace event format.
+        """
+        t0 = self._origin()
+        pid = os.getpid()
+        events = []
+        def _event(name, cat, start, duration, tid):
+            events.append({'name':name, 'cat':cat, 'ph':'X', 'pid':pid, 'tid':tid,
+                           'ts':(start - t0) * 1e6, 'dur':duration * 1e6})
+        for f in self.frames:
+            _event(f.name, 'frame', f.start, f.total, 0)
+            for name, start, duration in f.events:
+                _event(name, 'stage', start, duration, 0)
+        for name, start, duration in self.records:
+            _event(name, 'record', start, duration, 1)
+        return {'traceEvents':events, 'displayTimeUnit':'ms'}
+
+    def export(self, path, trace=False):
+        """
+        Writes the json (to_dict) or Chrome trace (to_trace) to path.
+        """
+        with open(path, 'w') as wf:
+            json.dump(self.to_trace() if trace else self.to_dict(), wf, indent=1)
+
+    def _origin(self):
+        # start of the first kept event
+        starts = [f.start for f in self.frames] + [r[1] for r in self.records]
+        return min(starts) if len(starts) > 0 else 0.0
@@ -0,0 +1,148 @@
+import collections
+import numpy as np
+from xrdPlanner import geometry
+
+#####################
+#       Q-MAP       #
+#  QT-INDEPENDENT   #
+#####################
+# Q-range and completeness across the distance/energy plane for the
+# current detector, offsets, rotation, tilt and beamstop, e.g. to
+# choose between a PDF and a PXRD setup.
+#
+#  q_max:        largest q on the modules (the corners) [1/A]
+#  q_min:        smallest q, the beamstop or the edge of the modules [1/A]
+#  completeness: mean ring coverage of the modules (gaps, central hole
+#                and beamstop excluded) over a target q-range, 1 if the
+#                full rings of the whole range land on the modules
+#
+# The ring coverage only depends on 2-theta at a given distance, not on
+# the energy. It is sampled once per distance (coverage_curves) and
+# mapped to q for all energies, the curves are cached per detector
+# layout and fixed geometry (settings_key). Changing the target
+# q-range or the energy limits is free.
+
+# number of distance and energy samples
+QMAP_NUM = 41
+# 2-theta samples of the coverage curves
+QMAP_TTH = 256
+# azimuthal samples per ring
+QMAP_AZI = 360
+# q samples of the completeness
+QMAP_Q = 256
+# number of cached coverage curves
+QMAP_CACHE = 8
+
+_curves = collections.OrderedDict()
+
+def calc_q(tth, ener):
+    """
+    Converts 2-theta [rad] to q [1/A] at energy ener [keV].
+    """
+    return 4 * np.pi * np.sin(np.asarray(tth)/2) / (12.398/np.asarray(ener))
+
+def settings_key(det, dist, voff, hoff, rota, tilt, bssz, bsdx, tth_num=QMAP_TTH, azi_num=QMAP_AZI):
+    """
+    Everything the coverage curves depend on, a hashable tuple
+    (the cache key, compared in full, not only its hash).
+    """
+    layout = tuple(float(getattr(det, k)) for k in geometry.DET_LAYOUT)
+    bssz = None if not bssz or (isinstance(bssz, str) and bssz.lower() == 'none') else float(bssz)
+    return (layout, tuple(np.asarray(dist, dtype=float).tolist()), float(voff), float(hoff),
+            float(rota), float(tilt), bssz, float(bsdx), int(tth_num), int(azi_num))
+
+def coverage_curves(det, dist, voff, hoff, rota, tilt, bssz, bsdx, tth_num=QMAP_TTH, azi_num=QMAP_AZI, workers=1):
+    """
+    Ring coverage of the modules as a function of 2-theta, per distance.
+
+    Parameters:
+    det (Container): Detector parameters, the module layout (see geometry.det_modules).
+    dist (array): Detector distances [mm].
+    voff, hoff (float): Detector offsets [mm].
+    rota, tilt (float): Detector rotation and tilt [deg].
+    bssz (float): Beamstop size [mm], None or 'None' for no beamstop.
+    bsdx (float): Beamstop distance [mm], limited to the detector distance.
+    tth_num (int, optional): 2-theta samples, default QMAP_TTH.
+    azi_num (int, optional): Azimuthal samples per ring, default QMAP_AZI.
+    workers (int, optional): Number of threads, the distances are
+                             evaluated in parallel, None or 0 uses all CPUs.
+
+    Returns:
+    tuple: tth (array, [rad]) from 0 to the largest 2-theta of the screen per
+           distance (n x tth_num) and the coverage [0-1] (n x tth_num).
+           The arrays are shared and read-only.
+    """
+    dist = np.atleast_1d(np.asarray(dist, dtype=float))
+    key = settings_key(det, dist, voff, hoff, rota, tilt, bssz, bsdx, tth_num, azi_num)
+    if key in _curves:
+        _curves.move_to_end(key)
+        return _curves[key]
+
+    omega = -np.deg2rad(tilt + rota)
+    xdim, ydim = geometry.calc_det_dims(det)
+    tth_max = geometry.calc_tth_max(xdim, ydim, dist, voff, hoff, rota, tilt)
+    bs_theta = geometry.calc_bs_theta(bssz, np.minimum(bsdx, dist))
+    tth = np.linspace(0, 1, tth_num)[None,:] * tth_max[:,None]
+    cov = np.zeros(tth.shape)
+    azi = np.linspace(-np.pi, np.pi, azi_num, endpoint=False)
+
+    def curve(n):
+        proj = geometry.project_angles(tth[n,:,None], azi[None,:], omega, dist[n], voff, hoff, tilt, det, bs_theta[n])
+        cov[n] = np.count_nonzero(proj['flag'] == geometry.PROJ_MODULE, axis=1) / azi_num
+
+    _, workers = geometry.overlay_blocks(len(dist), tth_num * azi_num, workers)
+    if workers > 1 and len(dist) > 1:
+        # numpy releases the GIL, every distance writes into its
+        # own row of cov, the pool is not shared with the overlays
+        list(geometry.overlay_pool(workers, name='qmap').map(curve, range(len(dist))))
+    else:
+        for n in range(len(dist)):
+            curve(n)
+    tth.flags.writeable = False
+    cov.flags.writeable = False
+    _curves[key] = (tth, cov)
+    while len(_curves) > QMAP_CACHE:
+        _curves.popitem(last=False)
+    return tth, cov
+
+def calc_qmap(det, dist, ener, voff, hoff, rota, tilt, bssz, bsdx, q_range, q_num=QMAP_Q, workers=1):
+    """
+    Q-range and completeness map across distance and energy.
+
+    Parameters:
+    det (Container): Detector parameters.
+    dist (array): Detector distances [mm], n.
+    ener (array): Energies [keV], m.
+    voff, hoff, rota, tilt, bssz, bsdx: The fixed geometry, see coverage_curves.
+    q_range (tuple): Target q-range (q_lo, q_hi) [1/A] of the completeness.
+    q_num (int, optional): q samples of the target range, default QMAP_Q.
+    workers (int, optional): Threads of the coverage curves, see coverage_curves.
+
+    Returns:
+    dict: 'dist' (n), 'ener' (m), 'q_range' and the n x m maps
+          'q_max', 'q_min' [1/A] and 'completeness' [0-1]
+    """
+    dist = np.atleast_1d(np.asarray(dist, dtype=float))
+    ener = np.atleast_1d(np.asarray(ener, dtype=float))
+    tth, cov = coverage_curves(det, dist, voff, hoff, rota, tilt, bssz, bsdx, workers=workers)
+    xdim, ydim = geometry.calc_det_dims(det)
+    tth_min = geometry.calc_tth_min(xdim, ydim, dist, voff, hoff, rota, tilt)
+    bs_theta = geometry.calc_bs_theta(bssz, np.minimum(bsdx, dist))
+    q_max = calc_q(tth[:,-1,None], ener[None,:])
+    q_min = calc_q(np.maximum(tth_min, bs_theta)[:,None], ener[None,:])
+    # 2-theta of the target q-range for every energy, m x q_num
+    q = np.linspace(q_range[0], q_range[1], q_num)
+    with np.errstate(invalid='ignore'):
+        tth_q = 2 * np.arcsin(q[None,:] * (12.398/ener[:,None]) / (4*np.pi))
+    completeness = np.empty((len(dist), len(ener)))
+    for n in range(len(dist)):
+        # beyond the screen and unreachable -> 0
+        c = np.interp(tth_q, tth[n], cov[n], right=0.0)
+        c[np.isnan(tth_q)] = 0.0
+        completeness[n] = c.mean(axis=1)
+    return {'dist':dist,
+            'ener':ener,
+            'q_range':tuple(q_range),
+            'q_max':q_max,
+            'q_min':q_min,
+            'completeness':completeness}
@@ -0,0 +1,354 @@
+import os
+import sys
+import csv
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from xrdPlanner import defaults
+
+#####################
+#      RENDER       #
+#####################
+# Render images (png/svg) of the detector screen for a settings file
+# and a list of geometries without showing a window.
+#
+#  - one MainWindow (and QApplication) renders all geometries of a
+#    process, the window is 'shown' with WA_DontShowOnScreen and the
+#    Qt offscreen platform is used unless QT_QPA_PLATFORM is set
+#  - the overlays are calculated synchronously (plo.overlay_async)
+#  - the plot scene is exported (png: pyqtgraph ImageExporter, svg:
+#    QSvgGenerator), the sliders and the menu are not part of the image
+#  - large lists are split into chunks rendered by separate processes
+#
+# Geometry lists are json files holding a list of dicts or csv files
+# with a header line (e.g. from xrdPlanner-sweep), the keys/columns
+# dist, ener, rota, tilt, voff, hoff and bsdx are used, missing ones
+# are taken from the settings file. An optional 'name' sets the file name.
+#
+# Animations (scans) are rendered along a parameter path (scan_path),
+# every frame is an incremental update of the same scene (apply_geometry
+# -> update_screen). The frames are streamed, either written as an image
+# sequence (render_batch) or piped to ffmpeg (render_movie, VideoWriter),
+# they are never held in memory all at once.
+
+# geometry parameters that can be set per image
+RENDER_PARAMS = ('ener', 'dist', 'voff', 'hoff', 'tilt', 'rota', 'bsdx')
+# supported image formats
+RENDER_FORMATS = ('png', 'svg')
+# default number of frames and frame rate of a scan
+RENDER_FRAMES = 50
+RENDER_FPS = 25
+
+def load_geometries(path):
+    """
+    Reads a geometry list (.json or .csv), returns a list of dicts.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', newline='') as rf:
+            rows = list(csv.DictReader(rf))
+    else:
+        with open(path, 'r') as rf:
+            rows = json.load(rf)
+        if isinstance(rows, dict):
+            rows = [rows]
+    geometries = []
+    for row in rows:
+        geo = {k:float(row[k]) for k in RENDER_PARAMS if row.get(k) not in (None, '')}
+        if row.get('name'):
+            geo['name'] = str(row['name'])
+        geometries.append(geo)
+    return geometries
+
+def scan_path(scans, frames=RENDER_FRAMES):
+    """
+    Linear parameter path, returns a list of geometries (dicts).
+
+    Parameters:
+    scans (list): (parameter, start, stop) tuples, see RENDER_PARAMS,
+                  all parameters are scanned simultaneously.
+    frames (int, optional): Number of frames, default RENDER_FRAMES.
+    """
+    return [{p:float(start + (stop - start) * t) for p, start, stop in scans}
+            for t in np.linspace(0, 1, frames)]
+
+class Renderer:
+    """
+    Renders the detector screen of a settings file for different geometries.
+
+    Parameters:
+    settings (str): Settings file (.json), it is not changed.
+    reference (str, optional): pyFAI calibrant name or cif file, default
+                               is the reference of the settings file.
+    width (int, optional): Image width [px], default is the plot size.
+    """
+    def __init__(self, settings, reference=None, width=None):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt6 import QtWidgets, QtCore
+        self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+        from xrdPlanner.classes import MainWindow
+        self.width = width
+        # the MainWindow works on a copy of the settings file
+        # and keeps the cif db of the user untouched
+        self.tmp = tempfile.TemporaryDirectory()
+        self.win = MainWindow()
+        self.win.setAttribute(QtCore.Qt.WidgetAttribute.WA_DontShowOnScreen, True)
+        self.win.path_cif_db = os.path.join(self.tmp.name, 'cif_db.json')
+        self.win.path_settings_current = shutil.copy(settings, os.path.join(self.tmp.name, os.path.basename(settings)))
+        # the window title shows the rendered settings file
+        self.active = self.win.active_settings
+        self.win.active_settings = os.path.basename(settings)
+        self.win.settings_reload()
+        self.win.plo.overlay_async = False
+        self.win.show()
+        if reference is not None:
+            if os.path.isfile(reference):
+                self.win.calc_ref_from_cif(reference, open_pxrd=False)
+            else:
+                self.win.change_reference(reference)
+        self.app.processEvents()
+
+    def render(self, geometry, target):
+        """
+        Renders the screen for the geometry (dict, see RENDER_PARAMS)
+        to target, the format follows the extension (.png or .svg).
+        """
+        from PyQt6 import QtCore, QtGui, QtSvg
+        if not target.lower().endswith('.svg'):
+            self.grab(geometry).save(target)
+            return target
+        self.win.apply_geometry(geometry)
+        self.app.processEvents()
+        # the pyqtgraph SVGExporter fails on paths holding
+        # gaps (NaN, connect='finite'), render the scene
+        source = self.win.ax.getPlotItem().sceneBoundingRect()
+        size = QtCore.QSize(int(source.width()), int(source.height()))
+        generator = QtSvg.QSvgGenerator()
+        generator.setFileName(target)
+        generator.setSize(size)
+        generator.setViewBox(QtCore.QRect(QtCore.QPoint(0, 0), size))
+        generator.setTitle(self.win.windowTitle())
+        painter = QtGui.QPainter(generator)
+        self.win.ax.scene().render(painter, QtCore.QRectF(generator.viewBoxF()), source)
+        painter.end()
+        return target
+
+    def grab(self, geometry):
+        """
+        Renders the screen for the geometry (dict, see RENDER_PARAMS), returns a QImage.
+        """
+        import pyqtgraph.exporters
+        self.win.apply_geometry(geometry)
+        self.app.processEvents()
+        exporter = pyqtgraph.exporters.ImageExporter(self.win.ax.getPlotItem())
+        if self.width is not None:
+            exporter.parameters()['width'] = int(self.width)
+        return exporter.export(toBytes=True)
+
+    def close(self):
+        self.win.overlay_worker.wait()
+        # the MainWindow removed the active settings token of the
+        # user on startup, put it back (as on a regular exit)
+        self.win.active_settings = self.active
+        self.win.settings_set_active()
+        self.win.deleteLater()
+        self.app.processEvents()
+        self.tmp.cleanup()
+
+def render_images(settings, jobs, reference=None, width=None):
+    """
+    Renders the (geometry, target) jobs with one Renderer,
+    returns the list of written files.
+    """
+    renderer = Renderer(settings, reference=reference, width=width)
+    try:
+        return [renderer.render(geo, target) for geo, target in jobs]
+    finally:
+        renderer.close()
+
+def _render_chunk(args):
+    # unpack for the process pool map
+    # the child renderers run in a private xrdPlanner home, the parent
+    # renderer removed the active settings token of the user (until it
+    # closes) and a MainWindow without a token resets the default settings
+    *args, home = args
+    with tempfile.TemporaryDirectory() as tmp:
+        detdb = os.path.join(home, 'detector_db.json')
+        if os.path.exists(detdb):
+            # custom detectors of the user
+            shutil.copy(detdb, tmp)
+        os.environ['XRDPLANNER'] = tmp
+        return render_images(*args)
+
+class VideoWriter:
+    """
+    Streams frames (QImage) to a video file, the raw frames are piped
+    to ffmpeg, the codec follows the extension (e.g. .mp4, .webm, .gif).
+
+    Parameters:
+    target (str): Video file, overwritten if it exists.
+    fps (float, optional): Frame rate, default RENDER_FPS.
+    ffmpeg (str, optional): ffmpeg executable, default 'ffmpeg' (PATH).
+
+    Raises:
+    RuntimeError: If ffmpeg is not found or fails.
+    """
+    def __init__(self, target, fps=RENDER_FPS, ffmpeg='ffmpeg'):
+        self.exe = shutil.which(ffmpeg)
+        if self.exe is None:
+            raise RuntimeError(f'{ffmpeg} not found, it is needed to write videos. Render an image sequence instead.')
+        self.target = target
+        self.fps = fps
+        self.size = None
+        self.proc = None
+
+    def write(self, image):
+        from PyQt6 import QtGui
+        image = image.convertToFormat(QtGui.QImage.Format.Format_RGBA8888)
+        if self.proc is None:
+            self.size = (image.width(), image.height())
+            self.proc = subprocess.Popen(self.command(*self.size), stdin=subprocess.PIPE)
+        elif (image.width(), image.height()) != self.size:
+            raise RuntimeError(f'Frame size changed from {self.size} to {(image.width(), image.height())}.')
+        # 4 bytes per pixel, the lines are not padded
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        self.proc.stdin.write(bits.asstring())
+
+    def command(self, width, height):
+        cmd = [self.exe, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-']
+        if self.target.lower().endswith('.gif'):
+            # generate a palette from the frames
+            cmd += ['-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse']
+        else:
+            # yuv420p (most compatible) needs even dimensions
+            cmd += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p']
+        return cmd + [self.target]
+
+    def close(self):
+        if self.proc is None:
+            return
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f'ffmpeg failed writing {self.target}.')
+
+def render_movie(settings, geometries, target, fps=RENDER_FPS, reference=None, width=None):
+    """
+    Renders the geometries (frames) to a video file, see VideoWriter.
+
+    The frames are rendered in order by one Renderer and streamed to
+    the writer, returns the number of frames.
+    """
+    writer = VideoWriter(target, fps=fps)
+    renderer = Renderer(settings, reference=reference, width=width)
+    frames = 0
+    try:
+        for geo in geometries:
+            writer.write(renderer.grab({k:v for k, v in geo.items() if k in RENDER_PARAMS}))
+            frames += 1
+    finally:
+        renderer.close()
+        writer.close()
+    return frames
+
+def render_batch(settings, geometries, outdir, fmt='png', reference=None, width=None, processes=1):
+    """
+    Renders a list of geometries to outdir.
+
+    Parameters:
+    settings (str): Settings file (.json).
+    geometries (list): Geometries (dicts), see RENDER_PARAMS, an entry
+                       'name' sets the file name (without extension).
+    outdir (str): Output folder, created if needed.
+    fmt (str, optional): 'png' or 'svg', default 'png'.
+    reference (str, optional): pyFAI calibrant name or cif file.
+    width (int, optional): Image width [px] (png only).
+    processes (int, optional): Number of processes, None uses all CPUs, default 1.
+
+    Returns:
+    list: The written files, in the order of geometries.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(settings))[0]
+    jobs = []
+    for i, geo in enumerate(geometries):
+        name = geo.get('name', f'{stem}_{i:04d}')
+        jobs.append(({k:v for k, v in geo.items() if k in RENDER_PARAMS}, os.path.join(outdir, f'{name}.{fmt}')))
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(min(processes, len(jobs)), 1)
+    if processes == 1:
+        return render_images(settings, jobs, reference, width)
+    # every process runs its own QApplication, Qt does not survive a fork
+    # the first chunk is rendered here, the renderer is created before
+    # the pool is started so a fresh xrdPlanner home folder (detector db,
+    # settings) is initialised only once, the others run in a private
+    # home (see _render_chunk)
+    size = -(-len(jobs) // processes)
+    home = defaults.get_path_home()
+    chunks = [(settings, jobs[c:c+size], reference, width, home) for c in range(0, len(jobs), size)]
+    renderer = Renderer(settings, reference=reference, width=width)
+    try:
+        with ProcessPoolExecutor(max_workers=len(chunks)-1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            parts = pool.map(_render_chunk, chunks[1:])
+            files = [renderer.render(geo, target) for geo, target in chunks[0][1]]
+            files.extend(target for part in parts for target in part)
+    finally:
+        renderer.close()
+    return files
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='xrdPlanner-render',
+                                     description='Render images of the detector screen without a GUI.')
+    parser.add_argument('settings', help='xrdPlanner settings file (.json)')
+    parser.add_argument('geometries', nargs='?', default=None,
+                        help='geometry list (.json or .csv), default the geometry of the settings file')
+    parser.add_argument('-o', '--outdir', default='.', help='output folder, default current folder')
+    parser.add_argument('-f', '--format', default='png', choices=RENDER_FORMATS, help='image format, default png')
+    parser.add_argument('--reference', default=None, help='pyFAI calibrant or cif file, default geo.reference')
+    parser.add_argument('--width', type=int, default=None, help='image width [px] (png), default plot size')
+    parser.add_argument('--processes', type=int, default=1, help='number of processes, 0 uses all CPUs, default 1')
+    parser.add_argument('--scan', nargs=3, action='append', metavar=('PAR', 'START', 'STOP'),
+                        help=f'render frames along a linear path, PAR: {", ".join(RENDER_PARAMS)}, can be repeated')
+    parser.add_argument('--frames', type=int, default=RENDER_FRAMES, help=f'number of frames of a scan, default {RENDER_FRAMES}')
+    parser.add_argument('--movie', default=None, help='write the frames to a video file (ffmpeg), e.g. scan.mp4 or scan.gif')
+    parser.add_argument('--fps', type=float, default=RENDER_FPS, help=f'video frame rate, default {RENDER_FPS}')
+    args = parser.parse_args(argv)
+
+    if args.scan is not None:
+        if args.geometries is not None:
+            parser.error('use either a geometry list or --scan')
+        scans = []
+        for p, start, stop in args.scan:
+            if p not in RENDER_PARAMS:
+                parser.error(f'--scan: unknown parameter {p}, choose from {", ".join(RENDER_PARAMS)}')
+            try:
+                scans.append((p, float(start), float(stop)))
+            except ValueError:
+                parser.error(f'--scan {p}: start and stop must be numbers')
+        geometries = scan_path(scans, args.frames)
+    else:
+        geometries = [{}] if args.geometries is None else load_geometries(args.geometries)
+
+    if args.movie is not None:
+        try:
+            frames = render_movie(args.settings, geometries, args.movie, fps=args.fps,
+                                  reference=args.reference, width=args.width)
+        except RuntimeError as e:
+            sys.exit(f'xrdPlanner-render: {e}')
+        print(f'{args.movie}: {frames} frames')
+        return
+
+    files = render_batch(args.settings, geometries, args.outdir, fmt=args.format, reference=args.reference,
+                         width=args.width, processes=args.processes or None)
+    for f in files:
+        print(f)
+
+if __name__ == '__main__':
+    main()
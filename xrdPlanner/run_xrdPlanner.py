@@ -6,6 +6,18 @@ def main():
     main = MainWindow()
     main.show()
     sys.exit(app.exec())
+
+def sweep():
+    from xrdPlanner.sweep import main
+    main()
+
+def render():
+    from xrdPlanner.render import main
+    main()
+
+def service():
+    from xrdPlanner.service import main
+    main()
     
 if __name__ == '__main__':
     main()
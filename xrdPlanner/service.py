@@ -0,0 +1,392 @@
+import sys
+import copy
+import json
+import queue
+import argparse
+import threading
+import contextlib
+import urllib.request
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import xrdPlanner
+from xrdPlanner import geometry, planner
+
+#####################
+#      SERVICE      #
+#  QT-INDEPENDENT   #
+#####################
+# Answers geometry queries over local HTTP (JSON-RPC 2.0), other tools
+# (sample changer, proposal system, LIMS) don't pay the startup and
+# import cost per query.
+#
+#  xrdPlanner-service settings/DanMAX_PXRD.json --port 8765
+#  curl -d '{"jsonrpc":"2.0","id":1,"method":"dmin","params":{"dist":150}}' localhost:8765
+#
+# The service keeps warm engines (Planner) with the settings file as
+# the base state. The params of a query override the base state:
+#  - geometry: ener, dist, voff, hoff, rota, tilt, bssz, bsdx
+#  - det_type, det_size: the detector
+#  - reference: pyFAI calibrant, cif file or cif known to the GUI
+# The other keys are the arguments of the method, see SERVICE_ARGS.
+#
+# Every engine answers one query at a time, concurrent queries use
+# the other engines and wait if all are busy. References are loaded
+# once and shared by the engines, the results of an engine are cached
+# (see Planner). The requests of a batch (JSON array) are answered in
+# order.
+
+# default port
+SERVICE_PORT = 8765
+# number of engines, i.e. queries answered in parallel
+SERVICE_ENGINES = 4
+# largest accepted request [bytes]
+SERVICE_MAX_BODY = 1 << 20
+# query keys that set the state of the engine
+SERVICE_STATE = planner.PLANNER_GEO + ('det_type', 'det_size', 'reference')
+# arguments of the methods, besides the state
+SERVICE_ARGS = {'ping':(),
+                'info':(),
+                'dmin':(),
+                'on_detector':('dsp', 'hkl', 'cell'),
+                'fwhm':('dsp', 'hkl', 'cell', 'tth')}
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+def _jsonable(obj):
+    # numpy to python, non-finite numbers to null (strict json)
+    if isinstance(obj, dict):
+        return {k:_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in obj]
+    if isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if np.isfinite(obj) else None
+    return obj
+
+class Service(object):
+    """
+    Warm engines that answer JSON-RPC queries, thread safe.
+
+    Parameters:
+    settings (str, optional): Settings file (.json), the base state. Default None uses the defaults.
+    detdb (str, optional): Detector db (.json), see Planner.
+    engines (int, optional): Number of engines. Default SERVICE_ENGINES.
+    references (list, optional): References to load on start.
+    """
+    def __init__(self, settings=None, detdb=None, engines=SERVICE_ENGINES, references=()):
+        first = planner.Planner(settings, detdb)
+        # a loaded cif is named by its file
+        self.base = {key:getattr(first.geo, key) for key in SERVICE_STATE}
+        self._plo = copy.deepcopy(first.plo)
+        self._references = {first.ref_name:(first.ref_name, first.ref_dsp, first.ref_hkl)}
+        self._cells = {}
+        self._ref_lock = threading.Lock()
+        for reference in references:
+            self.reference(reference)
+        # reference (query) of the engines, one query at a time
+        self._ref_keys = {}
+        self._engines = queue.Queue()
+        for n in range(max(int(engines), 1)):
+            engine = first if n == 0 else copy.deepcopy(first)
+            self._ref_keys[id(engine)] = first.ref_name
+            self._engines.put(engine)
+        self.methods = {'ping':self.ping,
+                        'info':self.info,
+                        'dmin':self.dmin,
+                        'on_detector':self.on_detector,
+                        'fwhm':self.fwhm}
+
+    def reference(self, reference):
+        """
+        Returns (name, dsp, hkl) of a reference, loaded once.
+
+        Raises:
+        ValueError: If the reference is unknown.
+        """
+        with self._ref_lock:
+            if reference not in self._references:
+                self._references[reference] = planner.load_reference(reference, self._plo)
+            return self._references[reference]
+
+    def cell(self, reference):
+        """
+        Returns the unit cell [a, b, c, alpha, beta, gamma] of a cif reference, loaded once.
+
+        Raises:
+        ValueError: If the reference is not a cif.
+        """
+        with self._ref_lock:
+            if reference not in self._cells:
+                path = planner.reference_path(str(reference))
+                if path is None:
+                    raise ValueError(f'hkl needs the cell or a cif reference, reference is {reference}.')
+                import Dans_Diffraction as dif
+                self._cells[reference] = list(dif.Crystal(path).Cell.lp())
+            return self._cells[reference]
+
+    @contextlib.contextmanager
+    def engine(self, params):
+        """
+        An idle engine in the state of the query, blocks if all are busy.
+
+        Raises:
+        KeyError, ValueError: If the state is invalid.
+        """
+        engine = self._engines.get()
+        try:
+            state = {key:params.get(key, val) for key, val in self.base.items()}
+            engine.set_geometry(**{key:state[key] for key in planner.PLANNER_GEO})
+            if (state['det_type'], state['det_size']) != (engine.geo.det_type, engine.geo.det_size):
+                engine.set_detector(state['det_type'], state['det_size'])
+            if state['reference'] != self._ref_keys[id(engine)]:
+                if state['reference'] is None or str(state['reference']).lower() == 'none':
+                    engine.set_reference(None)
+                else:
+                    engine.set_reference(*self.reference(state['reference']))
+                self._ref_keys[id(engine)] = state['reference']
+            yield engine
+        finally:
+            self._engines.put(engine)
+
+    #############
+    #  METHODS  #
+    #############
+    def ping(self, engine, params):
+        return {'version':xrdPlanner.__version__}
+
+    def info(self, engine, params):
+        """
+        The base state, the detectors and the loaded references.
+        """
+        with self._ref_lock:
+            references = list(self._references)
+        return {'version':xrdPlanner.__version__,
+                'base':self.base,
+                'detectors':{k:list(v['size']) for k, v in engine.detector_db.items()},
+                'references':references}
+
+    def dmin(self, engine, params):
+        """
+        d-spacing range [A] and 2-theta range [deg] of the detector,
+        dmax is limited by the beamstop, null if unlimited.
+        """
+        extent = engine.extent()
+        tth_low = max(extent.tth_min, extent.bs_theta)
+        with np.errstate(divide='ignore'):
+            dmax = geometry.calc_dsp(tth_low, engine.geo.ener)
+        return {'dmin':geometry.calc_dsp(extent.tth_max, engine.geo.ener),
+                'dmax':dmax,
+                'tth_min':np.rad2deg(extent.tth_min),
+                'tth_max':np.rad2deg(extent.tth_max),
+                'bs_tth':np.rad2deg(extent.bs_theta)}
+
+    def _dsp(self, engine, params):
+        # d-spacings of a query: dsp, hkl of a cell or of the reference
+        if 'dsp' in params:
+            return np.atleast_1d(np.asarray(params['dsp'], dtype=float))
+        if 'hkl' in params:
+            hkl = np.atleast_2d(np.asarray(params['hkl'], dtype=float))
+            if hkl.ndim != 2 or hkl.shape[1] != 3:
+                raise ValueError('hkl must be [h, k, l] or a list of them.')
+            cell = params['cell'] if 'cell' in params else self.cell(self._ref_keys[id(engine)])
+            if len(cell) != 6:
+                raise ValueError('cell must be [a, b, c, alpha, beta, gamma].')
+            return geometry.cell_dsp(cell, hkl)
+        return np.asarray(engine.ref_dsp, dtype=float)
+
+    def _tth(self, engine, dsp):
+        # 2-theta [rad], NaN if not reachable
+        tth = np.full(dsp.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lambda_2d = (12.398/engine.geo.ener) / (2*dsp)
+        valid = (dsp > 0) & (lambda_2d < 1)
+        tth[valid] = 2 * np.arcsin(lambda_2d[valid])
+        return tth
+
+    def on_detector(self, engine, params):
+        """
+        Whether the rings of the reflections hit the detector screen.
+
+        Params:
+        dsp (list): d-spacings [A], or
+        hkl (list): [h, k, l] or a list of them, with the unit cell
+                    cell [a, b, c, alpha, beta, gamma] or of the (cif) reference.
+        Default: the reference.
+
+        Returns:
+        dict: per reflection 'dsp' [A], 'tth' [deg], 'on_detector' (bool),
+              'reason' ('' on the detector, 'unreachable', 'beamstop', 'below', 'above')
+              and 'coverage', the fraction of the ring on the modules.
+        """
+        dsp = self._dsp(engine, params)
+        tth = self._tth(engine, dsp)
+        extent = engine.extent()
+        reason = np.full(dsp.shape, '', dtype=object)
+        with np.errstate(invalid='ignore'):
+            reason[tth > extent.tth_max] = 'above'
+            reason[tth < extent.tth_min] = 'below'
+            reason[tth <= extent.bs_theta] = 'beamstop'
+        reason[np.isnan(tth)] = 'unreachable'
+        coverage = geometry.ring_coverage(dsp, engine.geo.ener, -np.deg2rad(engine.geo.tilt + engine.geo.rota),
+                                          engine.geo.dist, engine.geo.voff, engine.geo.hoff, engine.geo.tilt,
+                                          engine.det, extent.bs_theta)
+        return {'dsp':dsp,
+                'tth':np.rad2deg(tth),
+                'on_detector':reason == '',
+                'reason':reason.tolist(),
+                'coverage':coverage}
+
+    def fwhm(self, engine, params):
+        """
+        Estimated FWHM [deg] of d-spacings (dsp, hkl, see on_detector)
+        or 2-theta (tth [deg]), default the reference.
+        """
+        if 'tth' in params:
+            tth = np.deg2rad(np.atleast_1d(np.asarray(params['tth'], dtype=float)))
+        else:
+            tth = self._tth(engine, self._dsp(engine, params))
+        return {'tth':np.rad2deg(tth), 'fwhm':engine.fwhm(tth)}
+
+    #############
+    #  JSONRPC  #
+    #############
+    def _call(self, request):
+        # answers a single request
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or not isinstance(request.get('method'), str):
+            return {'jsonrpc':'2.0', 'id':None, 'error':{'code':INVALID_REQUEST, 'message':'Invalid Request'}}
+        rid = request.get('id')
+        params = request.get('params', {})
+        try:
+            if request['method'] not in self.methods:
+                response = {'jsonrpc':'2.0', 'id':rid, 'error':{'code':METHOD_NOT_FOUND, 'message':f'Method not found: {request["method"]}'}}
+            elif not isinstance(params, dict):
+                response = {'jsonrpc':'2.0', 'id':rid, 'error':{'code':INVALID_PARAMS, 'message':'params must be an object.'}}
+            elif set(params) - set(SERVICE_STATE) - set(SERVICE_ARGS[request['method']]):
+                # a typo must not silently fall back to the base state
+                unknown = ', '.join(sorted(set(params) - set(SERVICE_STATE) - set(SERVICE_ARGS[request['method']])))
+                response = {'jsonrpc':'2.0', 'id':rid, 'error':{'code':INVALID_PARAMS, 'message':f'Unknown params: {unknown}.'}}
+            else:
+                with self.engine(params) as engine:
+                    result = self.methods[request['method']](engine, params)
+                response = {'jsonrpc':'2.0', 'id':rid, 'result':_jsonable(result)}
+        except (KeyError, TypeError, ValueError) as e:
+            response = {'jsonrpc':'2.0', 'id':rid, 'error':{'code':INVALID_PARAMS, 'message':str(e.args[0]) if e.args else type(e).__name__}}
+        except Exception as e:
+            response = {'jsonrpc':'2.0', 'id':rid, 'error':{'code':INTERNAL_ERROR, 'message':f'{type(e).__name__}: {e}'}}
+        # notifications are not answered
+        return None if 'id' not in request else response
+
+    def handle(self, text):
+        """
+        Answers a JSON-RPC request or batch.
+
+        Parameters:
+        text (str or bytes): The request.
+
+        Returns:
+        str or None: The response, None if there is nothing to answer (notifications).
+        """
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            return json.dumps({'jsonrpc':'2.0', 'id':None, 'error':{'code':PARSE_ERROR, 'message':'Parse error'}})
+        if isinstance(payload, list):
+            if not payload:
+                return json.dumps({'jsonrpc':'2.0', 'id':None, 'error':{'code':INVALID_REQUEST, 'message':'Invalid Request'}})
+            responses = [self._call(request) for request in payload]
+            responses = [r for r in responses if r is not None]
+            return json.dumps(responses) if responses else None
+        response = self._call(payload)
+        return None if response is None else json.dumps(response)
+
+class _Handler(BaseHTTPRequestHandler):
+    # the service is set by serve()
+    service = None
+    verbose = False
+
+    def _send(self, code, body=None):
+        data = b'' if body is None else body.encode()
+        self.send_response(code)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= SERVICE_MAX_BODY:
+            self._send(413 if length > SERVICE_MAX_BODY else 411)
+            return
+        response = self.service.handle(self.rfile.read(length))
+        self._send(200 if response is not None else 204, response)
+
+    def do_GET(self):
+        # health check
+        self._send(200, self.service.handle('{"jsonrpc":"2.0","id":0,"method":"ping"}'))
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+def serve(service, host='127.0.0.1', port=SERVICE_PORT, verbose=False):
+    """
+    Serves a Service over HTTP until interrupted, POST a JSON-RPC request to /.
+    """
+    handler = type('Handler', (_Handler,), {'service':service, 'verbose':verbose})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        server.daemon_threads = True
+        print(f'xrdPlanner service listening on http://{host}:{server.server_address[1]}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+def call(method, url=f'http://127.0.0.1:{SERVICE_PORT}', **params):
+    """
+    Client side, calls a method of a running service.
+
+    Returns:
+    The result.
+
+    Raises:
+    RuntimeError: If the service returns an error.
+    """
+    data = json.dumps({'jsonrpc':'2.0', 'id':1, 'method':method, 'params':params}).encode()
+    req = urllib.request.Request(url, data=data, headers={'Content-Type':'application/json'})
+    with urllib.request.urlopen(req) as res:
+        response = json.load(res)
+    if 'error' in response:
+        raise RuntimeError(f'{method}: {response["error"]["message"]} ({response["error"]["code"]})')
+    return response['result']
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='xrdPlanner-service',
+                                     description='Answer geometry queries over local HTTP (JSON-RPC 2.0).')
+    parser.add_argument('settings', nargs='?', default=None, help='settings file (.json), the base state, default: the defaults')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on, default 127.0.0.1 (local only)')
+    parser.add_argument('--port', type=int, default=SERVICE_PORT, help=f'port, default {SERVICE_PORT}')
+    parser.add_argument('--engines', type=int, default=SERVICE_ENGINES, help=f'number of engines (parallel queries), default {SERVICE_ENGINES}')
+    parser.add_argument('--reference', action='append', default=[], help='load a reference on start, can be repeated')
+    parser.add_argument('--detdb', default=None, help='detector db (.json), default: the one of the GUI')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log the requests')
+    args = parser.parse_args(argv)
+    try:
+        service = Service(args.settings, args.detdb, args.engines, args.reference)
+    except ValueError as e:
+        parser.error(str(e))
+    serve(service, args.host, args.port, args.verbose)
+
+if __name__ == '__main__':
+    main()
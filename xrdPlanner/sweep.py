@@ -0,0 +1,216 @@
+import os
+import sys
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from xrdPlanner import geometry, defaults, planner
+
+#####################
+#   BATCH  SWEEP    #
+#  QT-INDEPENDENT   #
+#####################
+# Evaluate a settings file over a grid of geometries without a GUI
+# and report per geometry:
+#  - the maximum 2-theta and the corresponding d-min
+#  - the beamstop cut-off (2-theta and d-spacing)
+#  - the mean and max FWHM within the visible 2-theta range
+#  - the number of visible reference rings
+#
+# Large grids are split into chunks that are evaluated in parallel.
+
+# parameters that can be swept, in this order
+SWEEP_PARAMS = ('dist', 'ener', 'rota', 'tilt', 'voff', 'hoff')
+# reported columns, in this order
+SWEEP_COLUMNS = SWEEP_PARAMS + ('tth_max', 'dmin', 'tth_min', 'bs_tth', 'bs_dsp', 'fwhm_mean', 'fwhm_max', 'rings')
+# number of geometries per chunk
+SWEEP_CHUNK = 20000
+# number of 2-theta samples for the FWHM statistics
+SWEEP_FWHM_SAMPLES = 64
+
+def evaluate_sweep(par, static):
+    """
+    Evaluate geometries, vectorized over the parameter arrays.
+
+    Parameters:
+    par (dict): 'dist', 'ener', 'rota', 'tilt', 'voff', 'hoff' and 'bsdx', 1d arrays.
+    static (dict): Geometry independent parameters
+                   - xdim, ydim: detector screen half width/height [mm]
+                   - pxs: pixel size [mm]
+                   - bssz: beamstop size [mm] or None
+                   - dsp_ref: reference d-spacings [A]
+                   - fwhm: dict, sensor thickness (thk) and material (mat),
+                           scattering diameter (dia), beam divergence (div)
+                           and energy resolution (dEE)
+
+    Returns:
+    dict: columns, see SWEEP_COLUMNS, angles in degrees
+    """
+    dist, ener, rota, tilt, voff, hoff, bsdx = np.broadcast_arrays(*[np.atleast_1d(np.asarray(par[k], dtype=float)) for k in SWEEP_PARAMS + ('bsdx',)])
+    xdim, ydim = static['xdim'], static['ydim']
+    fpar = static['fwhm']
+    # visible 2-theta range
+    tth_max = geometry.calc_tth_max(xdim, ydim, dist, voff, hoff, rota, tilt)
+    tth_min = geometry.calc_tth_min(xdim, ydim, dist, voff, hoff, rota, tilt)
+    # the beamstop can't be further away than the detector
+    bs_theta = geometry.calc_bs_theta(static['bssz'], np.minimum(bsdx, dist))
+    with np.errstate(divide='ignore'):
+        bs_dsp = np.where(bs_theta > 0, geometry.calc_dsp(bs_theta, ener), np.inf)
+
+    # FWHM within the visible range (not shadowed by the beamstop)
+    lo = np.maximum(tth_min, bs_theta)
+    hi = np.maximum(tth_max, lo)
+    tth = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, SWEEP_FWHM_SAMPLES)
+    with np.errstate(invalid='ignore'):
+        fwhm = geometry.calc_FWHM(dist[:, None]*1e-3, fpar['dia'], fpar['thk'], fpar['mat'], static['pxs']*1e-3,
+                                  tth, ener[:, None], fpar['div'], fpar['dEE'], deg=True)
+
+    # visible reference rings
+    rings = np.zeros(dist.shape, dtype=int)
+    dsp = static['dsp_ref']
+    if len(dsp) > 0:
+        lambda_2d = (12.398/ener)[:, None] / (2*dsp)
+        ring_tth = 2 * np.arcsin(np.clip(lambda_2d, 0, 1))
+        visible = (lambda_2d < 1) & (ring_tth > bs_theta[:, None]) & (ring_tth >= tth_min[:, None]) & (ring_tth <= tth_max[:, None])
+        rings = visible.sum(axis=1)
+
+    return {'dist':dist,
+            'ener':ener,
+            'rota':rota,
+            'tilt':tilt,
+            'voff':voff,
+            'hoff':hoff,
+            'tth_max':np.rad2deg(tth_max),
+            'dmin':geometry.calc_dsp(tth_max, ener),
+            'tth_min':np.rad2deg(tth_min),
+            'bs_tth':np.rad2deg(bs_theta),
+            'bs_dsp':bs_dsp,
+            'fwhm_mean':np.nanmean(fwhm, axis=1),
+            'fwhm_max':np.nanmax(fwhm, axis=1),
+            'rings':rings}
+
+def _evaluate_chunk(args):
+    # unpack for the process pool map
+    return evaluate_sweep(*args)
+
+def run_sweep(geo, plo, det, ranges, dsp_ref=None, processes=None):
+    """
+    Evaluate the full grid of the given parameter ranges.
+
+    Parameters:
+    geo (Container): Geometry, provides the parameters that are not swept.
+    plo (Container): Plot settings, provides the FWHM parameters and the screen padding.
+    det (Container): Detector parameters.
+    ranges (dict): Parameter name: array of values, see SWEEP_PARAMS.
+    dsp_ref (array, optional): Reference d-spacings [A], default None.
+    processes (int, optional): Number of processes, None uses all CPUs, 0 or 1 runs serially.
+
+    Returns:
+    dict: columns, see SWEEP_COLUMNS
+    """
+    xdim, ydim = geometry.calc_det_dims(det, plo.plot_padding)
+    bssz = geo.bssz if not (isinstance(geo.bssz, str) and geo.bssz.lower() == 'none') else None
+    static = {'xdim':xdim, 'ydim':ydim, 'pxs':det.pxs, 'bssz':bssz,
+              'dsp_ref':np.asarray([] if dsp_ref is None else dsp_ref, dtype=float),
+              'fwhm':{'thk':plo.sensor_thickness,
+                      'mat':plo.sensor_material,
+                      'dia':plo.scattering_diameter,
+                      'div':plo.beam_divergence,
+                      'dEE':plo.energy_resolution}}
+    # full grid, parameters not swept are taken from geo
+    axes = [np.atleast_1d(ranges.get(p, getattr(geo, p))).astype(float) for p in SWEEP_PARAMS]
+    mesh = [m.ravel() for m in np.meshgrid(*axes, indexing='ij')]
+    size = mesh[0].size
+    jobs = []
+    for c in range(0, size, SWEEP_CHUNK):
+        par = {p:m[c:c+SWEEP_CHUNK] for p, m in zip(SWEEP_PARAMS, mesh)}
+        par['bsdx'] = geo.bsdx
+        jobs.append((par, static))
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+            parts = list(pool.map(_evaluate_chunk, jobs))
+    else:
+        parts = [_evaluate_chunk(job) for job in jobs]
+    return {k:np.concatenate([part[k] for part in parts]) for k in SWEEP_COLUMNS}
+
+def get_reference_dsp(name, plo):
+    """
+    Returns the d-spacings of a reference, a pyFAI calibrant, a cif file
+    or the name of a cif known to the GUI (see planner.load_reference),
+    None if the name is 'None' or unknown.
+    """
+    if name is None or name.lower() == 'none':
+        return None
+    try:
+        _, dsp, _ = planner.load_reference(name, plo)
+    except ValueError as e:
+        print(f'WARNING: {e}')
+        return None
+    return dsp
+
+def write_csv(target, columns):
+    """
+    Writes the columns to a comma separated file, '-' writes to stdout.
+    """
+    data = np.column_stack([columns[k] for k in SWEEP_COLUMNS])
+    fmt = ['%.6g'] * (len(SWEEP_COLUMNS) - 1) + ['%d']
+    np.savetxt(sys.stdout if target == '-' else target, data, delimiter=',', fmt=fmt,
+               header=','.join(SWEEP_COLUMNS), comments='')
+
+def write_npz(target, columns):
+    """
+    Writes the columns to a compressed numpy file (one array per column).
+    """
+    np.savez_compressed(target, **{k:columns[k] for k in SWEEP_COLUMNS})
+
+def parse_range(values):
+    """
+    Converts 'value' or 'start stop step' (inclusive) to an array.
+    """
+    if len(values) == 1:
+        return np.array(values, dtype=float)
+    if len(values) == 3:
+        start, stop, step = values
+        if step <= 0:
+            raise argparse.ArgumentTypeError('step must be positive')
+        return np.arange(start, stop + step/2, step)
+    raise argparse.ArgumentTypeError('expected "value" or "start stop step"')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='xrdPlanner-sweep',
+                                     description='Evaluate xrdPlanner geometries over a parameter grid without a GUI.')
+    parser.add_argument('settings', help='xrdPlanner settings file (.json)')
+    for p, desc in [('dist', 'Detector distance [mm]'), ('ener', 'Beam energy [keV]'),
+                    ('rota', 'Detector rotation [deg]'), ('tilt', 'Detector tilt [deg]'),
+                    ('voff', 'Detector offset (vertical) [mm]'), ('hoff', 'Detector offset (horizontal) [mm]')]:
+        parser.add_argument(f'--{p}', nargs='+', type=float, metavar='V',
+                            help=f'{desc}: "value" or "start stop step", default from the settings file')
+    parser.add_argument('--reference', default=None, help='pyFAI calibrant or cif file to count visible rings, default geo.reference')
+    parser.add_argument('--detdb', default=None, help='detector db file (.json), default detector_db.json in the xrdPlanner home path')
+    parser.add_argument('--processes', type=int, default=None, help='number of processes, default all CPUs')
+    parser.add_argument('-o', '--output', default='-', help='output file, .csv or .npz (columnar), default stdout (csv)')
+    args = parser.parse_args(argv)
+
+    geo, plo, thm, lmt = defaults.load_settings(args.settings)
+    det = defaults.get_det_params(defaults.load_det_library(args.detdb), geo.det_type, geo.det_size)
+    ranges = {}
+    for p in SWEEP_PARAMS:
+        values = getattr(args, p)
+        if values is not None:
+            try:
+                ranges[p] = parse_range(values)
+            except argparse.ArgumentTypeError as e:
+                parser.error(f'--{p}: {e}')
+    reference = args.reference if args.reference is not None else geo.reference
+    dsp_ref = get_reference_dsp(reference, plo)
+
+    columns = run_sweep(geo, plo, det, ranges, dsp_ref=dsp_ref, processes=args.processes)
+    if args.output.lower().endswith('.npz'):
+        write_npz(args.output, columns)
+    else:
+        write_csv(args.output, columns)
+
+if __name__ == '__main__':
+    main()